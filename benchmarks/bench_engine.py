@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the pricing engine.
+
+Run from the root of the repository:
+
+    python benchmarks/bench_engine.py --save benchmarks/baseline.json
+    python benchmarks/bench_engine.py --compare benchmarks/baseline.json
+
+Every benchmark reports the fastest of several runs in seconds, the least
+noisy estimate on a shared machine. With ``--compare``, the run fails if a
+benchmark got slower than its baseline by more than ``--tolerance`` (a
+fraction, 1.0 by default). Baselines are machine specific, record them again
+when changing hardware.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'src'))
+
+from honorary_gui import engine, kernel, workload  # noqa: E402
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+BATCH_SIZES = (1000, 100000, 1000000)
+
+
+def timeit(func, repeat=7, number=1):
+    """Fastest duration of ``func`` in seconds
+
+    Args:
+      func (callable): function without arguments
+      repeat (int): number of measures
+      number (int): calls per measure
+
+    Returns:
+      float: duration of one call
+    """
+    func()  # warm-up, e.g. numba compilation or table construction
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        durations.append((time.perf_counter() - start) / number)
+    return min(durations)
+
+
+def bench_import(module):
+    """Time to import a module in a fresh interpreter"""
+    code = ('import time; start = time.perf_counter(); '
+            'import {}; '
+            'print(time.perf_counter() - start)').format(module)
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [p for p in [os.path.join(os.path.dirname(__file__), os.pardir,
+                                  'src'), env.get('PYTHONPATH')] if p])
+    durations = [float(subprocess.check_output([sys.executable, '-c', code],
+                                               env=env))
+                 for _ in range(3)]
+    return min(durations)
+
+
+def single(start, end):
+    return lambda: engine.price_missions([start], [end])
+
+
+def run_benchmarks(sizes=BATCH_SIZES, backends=kernel.BACKENDS):
+    """Run all benchmarks
+
+    Args:
+      sizes ([int]): batch sizes of the throughput benchmarks
+      backends ([str]): kernel backends of the throughput benchmarks
+
+    Returns:
+      dict: duration in seconds of every benchmark
+    """
+    results = {}
+    results['import_engine'] = bench_import('honorary_gui.engine')
+    # What the calculator window imports before its first paint
+    results['import_gui'] = bench_import('tkinter, honorary_gui.tasks')
+    results['build_table'] = timeit(engine.BusinessDayTable, repeat=3)
+    results['single_same_day'] = timeit(
+        single('2020-06-02 08:00:00', '2020-06-02 18:00:00'), number=100)
+    results['single_overnight'] = timeit(
+        single('2020-06-02 21:00:00', '2020-06-03 06:00:00'), number=100)
+    results['single_long'] = timeit(
+        single('2020-06-02 08:00:00', '2020-07-15 08:00:00'), number=100)
+    results['calculate_honorary'] = timeit(
+        lambda: engine.calculate_honorary('2020-06-02 21:00:00',
+                                          '2020-06-03 06:00:00'),
+        number=100)
+    dates = workload.generate_missions(100000).start_date.values
+    table = engine.default_table()
+    results['holiday_lookup_100000'] = timeit(
+        lambda: table.is_holiday(dates))
+    for n in sizes:
+        missions = workload.generate_missions(n)
+        start, end = missions.start_date.values, missions.end_date.values
+        first_hour = missions.first_hour.values
+        for backend in backends:
+            results['batch_{}_{}'.format(backend, n)] = timeit(
+                lambda: engine.price_missions(start, end, first_hour,
+                                              backend=backend),
+                repeat=3 if n >= 1000000 else 5)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Benchmarks slower than their baseline
+
+    Args:
+      results (dict): durations of the current run
+      baseline (dict): durations of the baseline
+      tolerance (float): accepted slowdown, as a fraction of the baseline
+
+    Returns:
+      dict: ratio of current and baseline durations of every regression
+    """
+    regressions = {}
+    for name, duration in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            _logger.info("No baseline for %s", name)
+            continue
+        ratio = duration / reference
+        if ratio > 1 + tolerance:
+            regressions[name] = ratio
+    return regressions
+
+
+def parse_args(args):
+    """Parse command line parameters
+
+    Args:
+      args ([str]): command line parameters as list of strings
+
+    Returns:
+      :obj:`argparse.Namespace`: command line parameters namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmarks of the pricing engine")
+    parser.add_argument(
+        "--save",
+        help="write the results as a baseline to this JSON file",
+        metavar="PATH")
+    parser.add_argument(
+        "--compare",
+        help="compare the results to the baseline in this JSON file",
+        metavar="PATH")
+    parser.add_argument(
+        "--tolerance",
+        help="accepted slowdown relative to the baseline (default: 1.0)",
+        type=float,
+        default=1.0)
+    parser.add_argument(
+        "--sizes",
+        help="batch sizes of the throughput benchmarks",
+        type=int,
+        nargs="+",
+        default=list(BATCH_SIZES))
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        dest="loglevel",
+        help="set loglevel to INFO",
+        action="store_const",
+        const=logging.INFO)
+    return parser.parse_args(args)
+
+
+def main(args):
+    """Main entry point allowing external calls
+
+    Args:
+      args ([str]): command line parameter list
+
+    Returns:
+      int: exit code, 1 if a regression was found
+    """
+    args = parse_args(args)
+    logging.basicConfig(level=args.loglevel, stream=sys.stdout)
+    results = run_benchmarks(sizes=args.sizes)
+    for name, duration in sorted(results.items()):
+        print('{:<28} {:>12.6f} s'.format(name, duration))
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'python': platform.python_version(),
+                       'machine': platform.machine(),
+                       'backends': list(kernel.BACKENDS),
+                       'results': results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        for name, ratio in sorted(regressions.items()):
+            print('REGRESSION {}: {:.2f}x the baseline'.format(name, ratio))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
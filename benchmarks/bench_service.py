@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Throughput and latency of the HTTP pricing service.
+
+Starts the service in a background thread and prices single missions from
+concurrent keep-alive connections:
+
+    python benchmarks/bench_service.py --connections 64 --requests 200
+
+Pass ``--window 0`` to measure the service without micro-batching.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'src'))
+
+from honorary_gui import service  # noqa: E402
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+BODY = json.dumps({'start_date': '2020-06-02 21:00:00',
+                   'end_date': '2020-06-03 06:00:00'}).encode('utf-8')
+REQUEST = ('POST /price HTTP/1.1\r\nHost: localhost\r\n'
+           'Content-Length: {}\r\n\r\n'.format(len(BODY))
+           .encode('latin-1') + BODY)
+
+
+def start_server(window):
+    """Run the service on a free port in a daemon thread, return the port"""
+    ready = threading.Event()
+    state = {}
+
+    def serve():
+        async def main():
+            pricing = service.PricingService(
+                batcher=service.MicroBatcher(window=window))
+            server = await pricing.start('127.0.0.1', 0)
+            state['port'] = server.sockets[0].getsockname()[1]
+            ready.set()
+            async with server:
+                await server.serve_forever()
+        asyncio.run(main())
+
+    threading.Thread(target=serve, daemon=True).start()
+    ready.wait()
+    return state['port']
+
+
+async def client(port, n_requests, latencies):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for _ in range(n_requests):
+        start = time.perf_counter()
+        writer.write(REQUEST)
+        await writer.drain()
+        await reader.readline()
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line == b'\r\n':
+                break
+            if line.lower().startswith(b'content-length'):
+                length = int(line.split(b':')[1])
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+async def load(port, connections, n_requests):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*[client(port, n_requests, latencies)
+                           for _ in range(connections)])
+    return time.perf_counter() - start, np.array(latencies)
+
+
+def main(args):
+    parser = argparse.ArgumentParser(
+        description="Benchmark of the HTTP pricing service")
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=100,
+                        help="requests per connection")
+    parser.add_argument("--window", type=float,
+                        default=service.BATCH_WINDOW * 1000,
+                        help="micro-batching window in milliseconds")
+    args = parser.parse_args(args)
+    port = start_server(args.window / 1000)
+    asyncio.run(load(port, 4, 10))  # warm-up
+    seconds, latencies = asyncio.run(
+        load(port, args.connections, args.requests))
+    print('requests        {}'.format(latencies.shape[0]))
+    print('throughput      {:.0f} requests/s'.format(
+        latencies.shape[0] / seconds))
+    for q in (50, 90, 99):
+        print('p{:<14} {:.2f} ms'.format(
+            q, np.percentile(latencies, q) * 1000))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,11 +1,20 @@
 # -*- coding: utf-8 -*-
-from pkg_resources import get_distribution, DistributionNotFound
+# importlib.metadata is much faster to import than pkg_resources, which
+# matters for the start-up time of the calculator window
+try:
+    from importlib.metadata import version as get_version, \
+        PackageNotFoundError as DistributionNotFound
+except ImportError:  # Python < 3.8
+    from pkg_resources import DistributionNotFound, get_distribution
+
+    def get_version(dist_name):
+        return get_distribution(dist_name).version
 
 try:
     # Change here if project is renamed and does not equal the package name
     dist_name = __name__
-    __version__ = get_distribution(dist_name).version
+    __version__ = get_version(dist_name)
 except DistributionNotFound:
     __version__ = 'unknown'
 finally:
-    del get_distribution, DistributionNotFound
+    del get_version, DistributionNotFound
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Asyncio pricing API.
+
+Pricing is CPU work on numpy arrays: awaiting it directly would block the
+event loop. :class:`AsyncPricer` runs the engine on an executor and limits
+the number of batches in flight:
+
+    pricer = AsyncPricer(max_in_flight=4)
+    priced = await pricer.price(start_dates, end_dates)
+
+    async for priced in pricer.stream(missions, chunk_size=1000):
+        ...
+
+:meth:`AsyncPricer.stream` prices an (async) iterable of missions by chunks
+and yields the results in input order. It stops reading the source while
+``max_in_flight`` chunks wait to be consumed.
+"""
+
+import asyncio
+import logging
+
+from honorary_gui import engine
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+MAX_IN_FLIGHT = 4
+CHUNK_SIZE = 1000
+# Seconds a partial chunk waits for more missions from a slow source
+MAX_DELAY = 0.05
+
+
+async def _aiter(missions):
+    if hasattr(missions, '__aiter__'):
+        async for mission in missions:
+            yield mission
+    else:
+        for mission in missions:
+            yield mission
+
+
+def _columns(chunk):
+    """Start dates, end dates and first hour flags of mission records"""
+    start, end, first_hour = [], [], []
+    for mission in chunk:
+        if isinstance(mission, dict):
+            start.append(mission['start_date'])
+            end.append(mission['end_date'])
+            first_hour.append(engine.check_first_hour(
+                mission.get('first_hour', True)))
+        else:
+            start.append(mission[0])
+            end.append(mission[1])
+            first_hour.append(engine.check_first_hour(mission[2])
+                              if len(mission) > 2 else True)
+    return start, end, first_hour
+
+
+class AsyncPricer(object):
+    """Price missions from coroutines without blocking the event loop
+
+    Args:
+      executor (:obj:`concurrent.futures.Executor`): runs the engine,
+        defaults to the loop's default executor
+      max_in_flight (int): batches priced or waiting to be consumed at once
+      **kwargs: passed to :func:`~honorary_gui.engine.price_missions`, e.g.
+        ``fares`` or ``backend``
+    """
+
+    def __init__(self, executor=None, max_in_flight=MAX_IN_FLIGHT, **kwargs):
+        self.executor = executor
+        self.max_in_flight = max_in_flight
+        self.kwargs = kwargs
+        self._semaphore = None
+
+    @property
+    def semaphore(self):
+        # Created lazily, inside the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        return self._semaphore
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        async with self.semaphore:
+            return await loop.run_in_executor(
+                self.executor, lambda: func(*args, **kwargs))
+
+    async def price(self, start_dates, end_dates, first_hour=True):
+        """Price a batch, see :func:`~honorary_gui.engine.price_missions`
+
+        Returns:
+          :obj:`~honorary_gui.engine.PricedMissions`
+        """
+        return await self._run(engine.price_missions, start_dates, end_dates,
+                               first_hour, **self.kwargs)
+
+    async def calculate_honorary(self, start_date, end_date, first_hour=True):
+        """See :func:`~honorary_gui.engine.calculate_honorary`"""
+        return await self._run(engine.calculate_honorary, start_date,
+                               end_date, first_hour)
+
+    async def price_chunk(self, chunk):
+        """Price mission records, see :meth:`stream` for their format"""
+        return await self.price(*_columns(chunk))
+
+    async def stream(self, missions, chunk_size=CHUNK_SIZE,
+                     max_delay=MAX_DELAY):
+        """Price a stream of missions by chunks, in order
+
+        Args:
+          missions: iterable or async iterable of mission records, either
+            ``(start_date, end_date[, first_hour])`` tuples or dicts with
+            ``start_date``, ``end_date`` and optionally ``first_hour``
+          chunk_size (int): missions priced together
+          max_delay (float): seconds before a partial chunk is priced when
+            the source is slow
+
+        Yields:
+          :obj:`~honorary_gui.engine.PricedMissions`: results of each chunk,
+          in the order of the missions
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.max_in_flight)
+
+        async def put(chunk):
+            await queue.put(asyncio.ensure_future(self.price_chunk(chunk)))
+
+        async def produce():
+            source = _aiter(missions)
+            chunk = []
+            deadline = None
+            pending = None
+            try:
+                while True:
+                    if pending is None:
+                        pending = asyncio.ensure_future(source.__anext__())
+                    timeout = None if not chunk else \
+                        max(deadline - loop.time(), 0)
+                    done, _ = await asyncio.wait({pending}, timeout=timeout)
+                    if not done:
+                        await put(chunk)
+                        chunk = []
+                        continue
+                    next_mission, pending = pending, None
+                    try:
+                        mission = next_mission.result()
+                    except StopAsyncIteration:
+                        break
+                    if not chunk:
+                        deadline = loop.time() + max_delay
+                    chunk.append(mission)
+                    if len(chunk) >= chunk_size:
+                        await put(chunk)
+                        chunk = []
+                if chunk:
+                    await put(chunk)
+            finally:
+                if pending is not None:
+                    # The source cannot be closed while it is being read
+                    pending.cancel()
+                    try:
+                        await pending
+                    except (asyncio.CancelledError, Exception):
+                        pass
+                await source.aclose()
+            await queue.put(None)
+
+        producer = asyncio.ensure_future(produce())
+        try:
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait({getter, producer},
+                                   return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done() and producer.exception() is not None:
+                    # The producer failed before queuing its sentinel
+                    getter.cancel()
+                    producer.result()
+                task = await getter
+                if task is None:
+                    break
+                yield await task
+            await producer
+        finally:
+            producer.cancel()
+            while not queue.empty():
+                task = queue.get_nowait()
+                if task is not None:
+                    task.cancel()
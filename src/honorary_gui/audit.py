@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Hour by hour audit of priced missions.
+
+Pricing keeps four hour counts and an amount per mission. When a mission
+is disputed, :attr:`~honorary_gui.engine.PricedMissions.audit` lists which
+hour was paid at which rate. The listing is generated on request from the
+mission dates and the calendar and fares it was priced with, so pricing
+itself does no extra work:
+
+    priced = engine.price_missions(start_dates, end_dates)
+    priced.audit[123456]
+
+Each row is one hour worked; their honorary adds up to the mission's.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from honorary_gui import dst, engine, kernel
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+AUDIT_COLUMNS = ['hour', 'day_type', 'shift', 'hour_class', 'first_hour',
+                 'honorary']
+
+
+def audit_mission(start, end, first_hour, fares, table, tz=None):
+    """Hours of one mission and their rates
+
+    Args:
+      start (int): start of the mission, seconds since 1970-01-01
+      end (int): end of the mission, seconds since 1970-01-01
+      first_hour (bool): whether the first hour counts extra
+      fares (:obj:`~honorary_gui.engine.FareSchedule`)
+      table (:obj:`~honorary_gui.engine.BusinessDayTable`)
+      tz (str): time zone the mission was priced in, the hour skipped in
+        spring is left out and the hour repeated in autumn listed twice
+
+    Returns:
+      :obj:`pandas.DataFrame`: one row per hour, see :data:`AUDIT_COLUMNS`
+    """
+    start_hour = int(start) // 3600
+    hour = np.arange(start_hour, start_hour + max(int(end - start), 0)
+                     // 3600, dtype=np.int64)
+    if tz is not None:
+        transitions = dst.table_for(tz)
+        keep = ~np.isin(hour, transitions.skipped)
+        repeat = np.where(np.isin(hour, transitions.repeated), 2, 1)
+        hour = np.repeat(hour[keep], repeat[keep])
+    # The first hour that exists, once clock changes are applied
+    first = np.zeros(hour.shape[0], dtype=np.bool_)
+    first[:1] = bool(first_hour)
+    t = table.day_type[hour // 24 - table.origin].astype(np.int64)
+    c = kernel.first_hour_class(hour, table.day_type, table.origin)
+    cents = np.where(first, fares.first[c], fares.subsequent[c])
+    return pd.DataFrame({
+        'hour': (hour * 3600).astype('datetime64[s]'),
+        'day_type': np.where(t == engine.HOLIDAY, 'holiday', 'business'),
+        'shift': np.where(c % 2 == 1, 'night', 'day'),
+        'hour_class': np.array(engine.CLASS_LABELS)[c],
+        'first_hour': first,
+        'honorary': cents / 100}, columns=AUDIT_COLUMNS)
+
+
+class AuditTrail(object):
+    """Lazy per-hour view of priced missions
+
+    Args:
+      priced (:obj:`~honorary_gui.engine.PricedMissions`): missions priced
+        with their calendar and fares attached
+    """
+
+    def __init__(self, priced):
+        if priced.fares is None or priced.table is None:
+            raise ValueError("Missions priced without their calendar and "
+                             "fares cannot be audited")
+        self.priced = priced
+
+    def __len__(self):
+        return len(self.priced)
+
+    def __getitem__(self, index):
+        """Hours of mission ``index``, see :func:`audit_mission`"""
+        priced = self.priced
+        index = range(len(priced))[index]
+        first_hour = True if priced.first_hour is None else \
+            bool(np.broadcast_to(priced.first_hour, (len(priced),))[index])
+        return audit_mission(priced.start[index].astype(np.int64),
+                             priced.end[index].astype(np.int64), first_hour,
+                             priced.fares, priced.table_of(index),
+                             priced.tz)
+
+    def frame(self, indices):
+        """Hours of several missions, with a ``mission`` column"""
+        frames = [self[i].assign(mission=i) for i in indices]
+        if not frames:
+            return pd.DataFrame(columns=['mission'] + AUDIT_COLUMNS)
+        return pd.concat(frames, ignore_index=True)[['mission']
+                                                    + AUDIT_COLUMNS]
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+Memory-budgeted batch pricing.
+
+Pricing a batch at once allocates temporary arrays proportional to its
+size. :func:`price_batch` measures the footprint of one mission on a probe
+chunk with :mod:`tracemalloc`, then prices the batch by chunks small enough
+for the temporary arrays of a chunk to stay within the budget:
+
+    >>> from honorary_gui.batch import price_batch
+    >>> from honorary_gui.workload import generate_missions
+    >>> missions = generate_missions(100000)
+    >>> priced, report = price_batch(missions.start_date, missions.end_date,
+    ...                              missions.first_hour,
+    ...                              memory_budget=2 * 2 ** 20)
+    >>> report.peak_bytes <= 2 * 2 ** 20
+    True
+
+The budget covers the working memory of the engine, not the inputs nor the
+results, which are allocated once for the whole batch.
+"""
+
+import logging
+import time
+import tracemalloc
+
+import numpy as np
+
+from honorary_gui import engine, kernel
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+PROBE_SIZE = 10000
+# Headroom on the measured footprint, the probe is not always representative
+SAFETY_FACTOR = 1.25
+
+
+class BatchReport(object):
+    """Statistics of a :func:`price_batch` run
+
+    Attributes:
+      n_missions (int): missions priced
+      chunk_size (int): missions priced at once
+      n_chunks (int): number of chunks
+      bytes_per_mission (float): measured working memory per mission
+      peak_bytes (int): peak working memory of the run, 0 if not traced
+      seconds (float): duration of the run
+      memory_budget (int): working memory allowed, None if not given
+      over_budget (bool): whether the budget could not be met, even by
+        chunks of one mission or as traced
+    """
+
+    def __init__(self, n_missions, chunk_size, n_chunks, bytes_per_mission,
+                 peak_bytes, seconds, memory_budget=None, over_budget=False):
+        self.n_missions = n_missions
+        self.chunk_size = chunk_size
+        self.n_chunks = n_chunks
+        self.bytes_per_mission = bytes_per_mission
+        self.peak_bytes = peak_bytes
+        self.seconds = seconds
+        self.memory_budget = memory_budget
+        self.over_budget = over_budget
+
+    def __repr__(self):
+        return ('BatchReport(n_missions={}, chunk_size={}, n_chunks={}, '
+                'bytes_per_mission={:.0f}, peak_bytes={}, seconds={:.3f}, '
+                'over_budget={})'
+                .format(self.n_missions, self.chunk_size, self.n_chunks,
+                        self.bytes_per_mission, self.peak_bytes,
+                        self.seconds, self.over_budget))
+
+
+def _as_array(values):
+    values = np.asarray(values)
+    return values.reshape(-1) if values.ndim else values.reshape(1)
+
+
+def _traced(func):
+    """Result and peak traced memory of ``func()``, in bytes"""
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        result = func()
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        if started:
+            tracemalloc.stop()
+    return result, peak
+
+
+def measure_footprint(start_dates, end_dates, first_hour=True, **kwargs):
+    """Working memory of the engine per mission, in bytes
+
+    Args:
+      start_dates: start of each mission of the probe
+      end_dates: end of each mission of the probe
+      first_hour (bool or sequence of bool): see
+        :func:`~honorary_gui.engine.price_missions`
+      **kwargs: passed to :func:`~honorary_gui.engine.price_missions`
+
+    Returns:
+      float: peak traced memory divided by the number of missions
+    """
+    start_dates = _as_array(start_dates)
+    end_dates = _as_array(end_dates)
+    # Build lazily initialized tables outside of the measure
+    engine.price_missions(start_dates[:1], end_dates[:1],
+                          _as_array(first_hour)[:1], **kwargs)
+    _, peak = _traced(lambda: engine.price_missions(
+        start_dates, end_dates, first_hour, **kwargs))
+    return peak / max(start_dates.shape[0], 1)
+
+
+def chunk_size_for(memory_budget, bytes_per_mission):
+    """Missions priced at once to stay within ``memory_budget`` bytes
+
+    The estimate only covers the memory growing with the chunk: the fixed
+    overhead of each call to the engine is not included, so that a tiny
+    budget may still be exceeded.
+
+    Returns:
+      int: 0 when even one mission does not fit
+    """
+    return int(memory_budget // (bytes_per_mission * SAFETY_FACTOR))
+
+
+def price_batch(start_dates, end_dates, first_hour=True, memory_budget=None,
+                chunk_size=None, trace=True, progress=None, **kwargs):
+    """Price a batch by chunks sized for a memory budget
+
+    Args:
+      start_dates: start of each mission, see
+        :func:`~honorary_gui.engine.price_missions`
+      end_dates: end of each mission
+      first_hour (bool or sequence of bool): whether the first hour counts
+        extra, for all or for each mission
+      memory_budget (int): working memory allowed, in bytes; when not given
+        the batch is priced in one chunk unless ``chunk_size`` is set
+      chunk_size (int): missions priced at once, overrides the budget
+      trace (bool): measure the peak working memory of the run, which
+        slows down pricing slightly
+      progress (callable): called with the number of missions priced and
+        the size of the batch after every chunk, may raise to abort
+      **kwargs: passed to :func:`~honorary_gui.engine.price_missions`
+
+    Returns:
+      tuple: the :obj:`~honorary_gui.engine.PricedMissions` of the whole
+      batch and a :obj:`BatchReport`
+    """
+    begin = time.perf_counter()
+    start_dates = _as_array(start_dates)
+    end_dates = _as_array(end_dates)
+    n = start_dates.shape[0]
+    if end_dates.shape[0] != n:
+        raise ValueError("As many start dates as end dates are required")
+    if chunk_size is not None and chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+    first_hour = np.broadcast_to(np.asarray(first_hour, dtype=np.bool_), (n,))
+
+    bytes_per_mission = float('nan')
+    over_budget = False
+    if chunk_size is None:
+        if memory_budget is None or n == 0:
+            chunk_size = max(n, 1)
+        else:
+            probe = slice(0, min(n, PROBE_SIZE))
+            bytes_per_mission = measure_footprint(
+                start_dates[probe], end_dates[probe], first_hour[probe],
+                **kwargs)
+            chunk_size = chunk_size_for(memory_budget, bytes_per_mission)
+            if chunk_size == 0:
+                _logger.warning("A budget of %d bytes cannot fit one "
+                                "mission", memory_budget)
+                over_budget = True
+                chunk_size = 1
+    n_chunks = -(-n // chunk_size)
+    _logger.info("Pricing %d missions in %d chunks of %d", n, n_chunks,
+                 chunk_size)
+
+    start = np.empty(n, dtype='datetime64[s]')
+    end = np.empty(n, dtype='datetime64[s]')
+    hours = np.empty((n, kernel.N_CLASSES), dtype=np.int64)
+    cents = np.empty(n, dtype=np.int64)
+
+    def run():
+        for i in range(0, n, chunk_size):
+            chunk = slice(i, i + chunk_size)
+            priced = engine.price_missions(
+                start_dates[chunk], end_dates[chunk], first_hour[chunk],
+                **kwargs)
+            start[chunk] = priced.start
+            end[chunk] = priced.end
+            hours[chunk] = priced.hours
+            cents[chunk] = priced.cents
+            # Release the chunk before pricing the next one
+            del priced
+            if progress is not None:
+                progress(min(i + chunk_size, n), n)
+
+    if trace:
+        _, peak_bytes = _traced(run)
+    else:
+        run()
+        peak_bytes = 0
+    if memory_budget is not None and peak_bytes > memory_budget:
+        _logger.warning("Peak of %d bytes over the budget of %d bytes",
+                        peak_bytes, memory_budget)
+        over_budget = True
+    report = BatchReport(n, chunk_size, n_chunks, bytes_per_mission,
+                         peak_bytes, time.perf_counter() - begin,
+                         memory_budget, over_budget)
+    _logger.info("%r", report)
+    fares = kwargs.get('fares')
+    table = kwargs.get('table')
+    return engine.PricedMissions(
+        start, end, hours, cents, first_hour,
+        fares if fares is not None else engine.default_fares(),
+        table if table is not None else engine.default_table(),
+        kwargs.get('tz')), report
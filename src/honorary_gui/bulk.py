@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""
+Bulk import of missions into the Tk calculator.
+
+:class:`BulkImportWindow` reads a CSV file of missions (see
+:func:`~honorary_gui.engine.read_missions`), prices it in the background
+with a progress bar and shows the results in a :class:`VirtualTable`.
+
+The table keeps as many ``ttk.Treeview`` rows as fit on screen and refills
+them from the result arrays when scrolling, so that 100k missions scroll as
+smoothly as ten.
+"""
+
+import logging
+from tkinter import BOTH, BOTTOM, DISABLED, LEFT, NORMAL, RIGHT, X, Y, \
+    Button, Frame, Label, StringVar, Toplevel, filedialog, messagebox, ttk
+
+import numpy as np
+
+from honorary_gui import engine
+from honorary_gui.batch import price_batch
+from honorary_gui.tasks import TkWorker
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+COLUMNS = ['start_date', 'end_date'] + engine.CLASS_LABELS + \
+    ['hours_worked', 'honorary']
+CHUNK_SIZE = 10000
+
+
+class RowWindow(object):
+    """Rows of a long table visible in a fixed number of lines
+
+    Keeps the scrolling arithmetic of :class:`VirtualTable` apart from Tk.
+
+    Args:
+      height (int): number of visible rows
+    """
+
+    def __init__(self, height):
+        self.height = height
+        self.n_rows = 0
+        self.offset = 0
+
+    def reset(self, n_rows):
+        self.n_rows = n_rows
+        self.offset = 0
+
+    def max_offset(self):
+        return max(self.n_rows - self.height, 0)
+
+    def scroll(self, *args):
+        """Move the window, arguments of a scrollbar command
+
+        Returns:
+          bool: whether the visible rows changed
+        """
+        if args[0] == 'moveto':
+            offset = int(round(float(args[1]) * self.n_rows))
+        elif args[0] == 'scroll':
+            step = self.height if args[2] == 'pages' else 1
+            offset = self.offset + int(args[1]) * step
+        else:
+            return False
+        offset = min(max(offset, 0), self.max_offset())
+        changed = offset != self.offset
+        self.offset = offset
+        return changed
+
+    def values(self, data, columns):
+        """Values of the ``height`` visible rows, blank past the end"""
+        stop = min(self.offset + self.height, self.n_rows)
+        rows = [[data[column][row] for column in columns]
+                for row in range(self.offset, stop)]
+        return rows + [[''] * len(columns)] * (self.height - len(rows))
+
+    def fractions(self):
+        """First and last visible fractions, see ``Scrollbar.set``"""
+        if not self.n_rows:
+            return 0, 1
+        return (self.offset / self.n_rows,
+                min(self.offset + self.height, self.n_rows) / self.n_rows)
+
+
+class VirtualTable(Frame):
+    """Treeview showing only the visible rows of large columns
+
+    Args:
+      master (:obj:`tkinter.Misc`): parent widget
+      columns ([str]): column names
+      height (int): number of visible rows
+    """
+
+    def __init__(self, master, columns, height=20, **kwargs):
+        Frame.__init__(self, master, **kwargs)
+        self.columns = list(columns)
+        self.window = RowWindow(height)
+        self.data = {}
+        self.tree = ttk.Treeview(self, columns=self.columns, show='headings',
+                                 height=height, selectmode='browse')
+        for column in self.columns:
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=110, anchor='e')
+        self.scrollbar = ttk.Scrollbar(self, orient='vertical',
+                                       command=self.yview)
+        self.tree.pack(side=LEFT, fill=BOTH, expand=True)
+        self.scrollbar.pack(side=RIGHT, fill=Y)
+        self.items = [self.tree.insert('', 'end', values=())
+                      for _ in range(height)]
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.tree.bind(sequence, self._on_wheel)
+        self.tree.bind('<Prior>', lambda e: self.yview('scroll', -1, 'pages'))
+        self.tree.bind('<Next>', lambda e: self.yview('scroll', 1, 'pages'))
+        self.refresh()
+
+    @property
+    def height(self):
+        return self.window.height
+
+    @property
+    def n_rows(self):
+        return self.window.n_rows
+
+    @property
+    def offset(self):
+        return self.window.offset
+
+    def set_data(self, data):
+        """Show new columns
+
+        Args:
+          data (dict): one sequence per column name, all of the same length
+        """
+        self.data = {column: data[column] for column in self.columns}
+        self.window.reset(len(data[self.columns[0]]) if self.columns else 0)
+        self.refresh()
+
+    def max_offset(self):
+        return self.window.max_offset()
+
+    def yview(self, *args):
+        """Scrollbar command, see ``Scrollbar.set``"""
+        if self.window.scroll(*args):
+            self.refresh()
+
+    def _on_wheel(self, event):
+        if getattr(event, 'num', None) == 4 or getattr(event, 'delta', 0) > 0:
+            self.yview('scroll', -3, 'units')
+        else:
+            self.yview('scroll', 3, 'units')
+        return 'break'
+
+    def refresh(self):
+        """Fill the visible rows from the data at the current offset"""
+        for item, values in zip(self.items,
+                                self.window.values(self.data, self.columns)):
+            self.tree.item(item, values=values)
+        self.scrollbar.set(*self.window.fractions())
+
+
+def price_file(job, path):
+    """Read and price a mission file, reporting progress to ``job``
+
+    Returns:
+      :obj:`~honorary_gui.engine.PricedMissions`
+    """
+    missions = engine.read_missions(path)
+    priced, report = price_batch(
+        missions.start_date, missions.end_date, missions.first_hour,
+        chunk_size=CHUNK_SIZE, trace=False,
+        progress=lambda done, total: job.set_progress(done / total))
+    _logger.info("Priced %s: %r", path, report)
+    return priced
+
+
+class BulkImportWindow(Toplevel):
+    """Window pricing a CSV file of missions
+
+    Args:
+      master (:obj:`tkinter.Misc`): parent widget
+      worker (:obj:`~honorary_gui.tasks.TkWorker`): runs the pricing,
+        a new one is created when not given
+    """
+
+    def __init__(self, master, worker=None, **kwargs):
+        Toplevel.__init__(self, master, **kwargs)
+        self.title("Bulk Import")
+        # A shared worker is left running, one of our own is stopped on
+        # close
+        self._own_worker = worker is None
+        self.worker = worker if worker is not None else TkWorker(self)
+        self.job = None
+        self.protocol('WM_DELETE_WINDOW', self.close)
+
+        controls = Frame(self)
+        controls.pack(side=BOTTOM, fill=X, padx=10, pady=10)
+        self.button_open = Button(controls, text='Open CSV...',
+                                  command=self.open)
+        self.button_open.pack(side=LEFT)
+        self.button_cancel = Button(controls, text='Cancel',
+                                    command=self.cancel, state=DISABLED)
+        self.button_cancel.pack(side=LEFT, padx=10)
+        self.progress = ttk.Progressbar(controls, mode='determinate',
+                                        maximum=1.0, length=250)
+        self.progress.pack(side=LEFT, padx=10)
+        self.status = StringVar()
+        Label(controls, textvariable=self.status).pack(side=LEFT)
+        self.table = VirtualTable(self, COLUMNS)
+        self.table.pack(fill=BOTH, expand=True, padx=10, pady=10)
+
+    def open(self):
+        path = filedialog.askopenfilename(
+            parent=self, title='Missions',
+            filetypes=[('CSV files', '*.csv'), ('All files', '*')])
+        if path:
+            self.load(path)
+
+    def load(self, path):
+        """Price ``path`` in the background"""
+        self.cancel()
+        self.button_open.config(state=DISABLED)
+        self.button_cancel.config(state=NORMAL)
+        self.progress['value'] = 0
+        self.status.set('Pricing ' + path)
+        self.job = self.worker.submit(price_file, path, pass_job=True,
+                                      on_done=self.show,
+                                      on_error=self.show_error,
+                                      on_progress=self.set_progress)
+
+    def cancel(self):
+        if self.job is not None:
+            self.job.cancel()
+            self.job = None
+            self.status.set('Cancelled')
+        self.button_open.config(state=NORMAL)
+        self.button_cancel.config(state=DISABLED)
+
+    def close(self):
+        """Cancel the import and destroy the window"""
+        self.cancel()
+        if self._own_worker:
+            self.worker.shutdown()
+        self.destroy()
+
+    def set_progress(self, value):
+        self.progress['value'] = value
+
+    def show(self, priced):
+        self.job = None
+        self.button_open.config(state=NORMAL)
+        self.button_cancel.config(state=DISABLED)
+        self.progress['value'] = 1.0
+        self.status.set('{} missions, {:.2f} euros'.format(
+            len(priced), priced.cents.sum() / 100))
+        data = {column: priced.hours[:, i]
+                for i, column in enumerate(engine.CLASS_LABELS)}
+        data['start_date'] = np.datetime_as_string(priced.start, unit='m')
+        data['end_date'] = np.datetime_as_string(priced.end, unit='m')
+        data['hours_worked'] = priced.hours_worked
+        data['honorary'] = priced.honorary
+        self.table.set_data(data)
+
+    def show_error(self, error):
+        self.cancel()
+        self.status.set('')
+        messagebox.showerror('Bulk Import', str(error), parent=self)
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+Holiday calendars of several regions.
+
+Each mission, or each worker, refers to a calendar by id (see
+:data:`CALENDARS`). A :class:`CalendarRegistry` compiles all its calendars
+once into one :class:`RegionTables`: the day tables of the calendars laid
+end to end in a single array. A mission of calendar ``k`` is moved ``k``
+table lengths forward before it reaches the kernel, so that a batch mixing
+regions is classified by the same gather as a single region batch, with no
+branching per mission:
+
+    priced = price_regions(missions.start_date, missions.end_date,
+                           missions.calendar, missions.first_hour)
+
+Clients closing on extra days, or working on some holidays, get a
+:class:`ClosureOverlay` of a base calendar. It is compiled with two bitwise
+operations on the base day table, not with a new holiday calendar, and is
+priced from the shared tables like any other calendar:
+
+    registry.register('client-42', ClosureOverlay('fr', added=['2021-06-21']))
+"""
+
+import logging
+
+import numpy as np
+from pandas.tseries.holiday import (AbstractHolidayCalendar, EasterMonday,
+                                    GoodFriday, Holiday)
+from pandas.tseries.offsets import Day, Easter
+
+from honorary_gui import engine, kernel, timing
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+
+class AlsaceMoselleBusinessCalendar(AbstractHolidayCalendar):
+    rules = engine.FrenchBusinessCalendar.rules + [
+        GoodFriday,
+        Holiday('St Stephens Day', month=12, day=26)
+    ]
+
+
+class BelgianBusinessCalendar(AbstractHolidayCalendar):
+    rules = [
+        Holiday('New Years Day', month=1, day=1),
+        EasterMonday,
+        Holiday('Labour Day', month=5, day=1),
+        Holiday('Ascension Day', month=1, day=1, offset=[Easter(), Day(39)]),
+        Holiday('Whit Monday', month=1, day=1, offset=[Easter(), Day(50)]),
+        Holiday('Belgian National Day', month=7, day=21),
+        Holiday('Assumption of Mary to Heaven', month=8, day=15),
+        Holiday('All Saints Day', month=11, day=1),
+        Holiday('Armistice Day', month=11, day=11),
+        Holiday('Christmas Day', month=12, day=25)
+    ]
+
+
+# Calendars of the default registry, the first one is the default
+CALENDARS = {'fr': engine.FrenchBusinessCalendar,
+             'fr-alsace-moselle': AlsaceMoselleBusinessCalendar,
+             'be': BelgianBusinessCalendar}
+DEFAULT_CALENDAR = 'fr'
+
+
+class ClosureOverlay(object):
+    """Days added to or removed from the holidays of a base calendar
+
+    Days outside the tables are ignored.
+
+    Args:
+      base (str): id of the base calendar
+      added: days paid as holidays, anything
+        :func:`~honorary_gui.engine.to_seconds` understands
+      removed: days paid as business days, even weekends or holidays
+    """
+
+    def __init__(self, base=DEFAULT_CALENDAR, added=(), removed=()):
+        self.base = base
+        self.added = self._days(added)
+        self.removed = self._days(removed)
+
+    @staticmethod
+    def _days(days):
+        if len(days) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(engine.to_seconds(days) // 86400)
+
+    def _mask(self, days, origin, n_days):
+        mask = np.zeros(n_days, dtype=np.uint8)
+        days = days - origin
+        mask[days[(days >= 0) & (days < n_days)]] = engine.HOLIDAY
+        return mask
+
+    def apply(self, day_type, origin):
+        """Day types of the overlay over those of its base
+
+        Args:
+          day_type (:obj:`numpy.ndarray`): uint8 day types of the base
+          origin (int): day number of ``day_type[0]``
+
+        Returns:
+          :obj:`numpy.ndarray`: uint8, a new array
+        """
+        added = self._mask(self.added, origin, day_type.shape[0])
+        removed = self._mask(self.removed, origin, day_type.shape[0])
+        return (day_type | added) & ~removed
+
+
+class RegionTables(object):
+    """Business day tables of several calendars, in one array
+
+    Args:
+      tables (dict): :obj:`~honorary_gui.engine.BusinessDayTable` of every
+        calendar id, all covering the same days
+
+    Attributes:
+      ids ([str]): calendar ids, in the order of the tables
+      day_type (:obj:`numpy.ndarray`): uint8, the day types of every
+        calendar end to end
+      cumulative (:obj:`numpy.ndarray`): prefix sums over ``day_type``
+      origin (int): day number of the first day of every table
+      n_days (int): days of each table
+    """
+
+    def __init__(self, tables):
+        self.ids = list(tables)
+        first = tables[self.ids[0]]
+        for table in tables.values():
+            if table.origin != first.origin or len(table) != len(first):
+                raise ValueError("Calendars must cover the same days")
+        self.origin = first.origin
+        self.n_days = len(first)
+        self.day_type = np.concatenate([tables[i].day_type
+                                        for i in self.ids])
+        self.cumulative = kernel._cumulative_hours(self.day_type)
+        self.index = {calendar: k for k, calendar in enumerate(self.ids)}
+
+    def table(self, calendar):
+        """Business day table of one calendar, a view of the shared one"""
+        k = self.index[calendar]
+        return engine.BusinessDayTable.from_arrays(
+            self.day_type[k * self.n_days:(k + 1) * self.n_days],
+            self.origin,
+            self.cumulative[k * self.n_days:(k + 1) * self.n_days + 1])
+
+    def codes(self, calendars, n):
+        """Table index of every mission
+
+        Args:
+          calendars: calendar id of each mission, or one id for all
+          n (int): number of missions
+
+        Returns:
+          :obj:`numpy.ndarray`: int64
+        """
+        calendars = np.asarray(calendars, dtype=object)
+        if calendars.ndim == 0:
+            return np.full(n, self._code(calendars.item()), dtype=np.int64)
+        ids, inverse = np.unique(calendars.astype(str), return_inverse=True)
+        return np.array([self._code(i) for i in ids],
+                        dtype=np.int64)[inverse.ravel()]
+
+    def _code(self, calendar):
+        try:
+            return self.index[calendar]
+        except KeyError:
+            raise ValueError("Unknown calendar: " + str(calendar))
+
+
+class RegionPricedMissions(engine.PricedMissions):
+    """Result of :func:`price_regions`
+
+    Attributes:
+      table (:obj:`RegionTables`): tables of every calendar
+      codes (:obj:`numpy.ndarray`): int64, table index of each mission
+    """
+
+    def __init__(self, start, end, hours, cents, first_hour, fares, tables,
+                 codes):
+        engine.PricedMissions.__init__(self, start, end, hours, cents,
+                                       first_hour, fares, tables)
+        self.codes = codes
+
+    @property
+    def calendars(self):
+        """Calendar id of each mission"""
+        return np.array(self.table.ids, dtype=object)[self.codes]
+
+    def table_of(self, index):
+        """Table of the calendar of mission ``index``, for the audit"""
+        return self.table.table(self.table.ids[self.codes[index]])
+
+
+class CalendarRegistry(object):
+    """Calendars by id, compiled together on first use
+
+    Args:
+      calendars (dict): calendar class or instance of every id
+      start (str): first day of the tables
+      end (str): last day of the tables
+    """
+
+    def __init__(self, calendars=None, start=engine.TABLE_START,
+                 end=engine.TABLE_END):
+        self.calendars = {}
+        self.start = start
+        self.end = end
+        self._tables = None
+        # Tables of the holiday calendars, kept when overlays change
+        self._holiday_tables = {}
+        for calendar_id, calendar in (calendars or {}).items():
+            self.register(calendar_id, calendar)
+
+    def register(self, calendar_id, calendar):
+        """Add or replace a calendar, the tables are compiled again
+
+        Args:
+          calendar_id (str): id the missions refer to
+          calendar: :obj:`AbstractHolidayCalendar` class or instance, or a
+            :obj:`ClosureOverlay` of a calendar registered before
+        """
+        if isinstance(calendar, ClosureOverlay) and \
+                calendar.base not in self.calendars:
+            raise ValueError("Unknown base calendar: " + str(calendar.base))
+        if isinstance(calendar, type):
+            calendar = calendar()
+        self.calendars[calendar_id] = calendar
+        self._holiday_tables.pop(calendar_id, None)
+        self._tables = None
+
+    @property
+    def ids(self):
+        return list(self.calendars)
+
+    def tables(self):
+        """:obj:`RegionTables` of all the calendars, compiled once"""
+        tables = self._tables
+        if tables is None:
+            compiled = {}
+            for calendar_id, calendar in self.calendars.items():
+                if isinstance(calendar, ClosureOverlay):
+                    base = compiled[calendar.base]
+                    compiled[calendar_id] = engine.BusinessDayTable \
+                        .from_arrays(calendar.apply(base.day_type,
+                                                    base.origin),
+                                     base.origin)
+                    continue
+                if calendar_id not in self._holiday_tables:
+                    self._holiday_tables[calendar_id] = \
+                        engine.BusinessDayTable(calendar, self.start,
+                                                self.end)
+                compiled[calendar_id] = self._holiday_tables[calendar_id]
+            tables = self._tables = RegionTables(compiled)
+        return tables
+
+
+_default_registry = None
+
+
+def default_registry():
+    """Registry of :data:`CALENDARS`, built once"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = CalendarRegistry(CALENDARS)
+    return _default_registry
+
+
+def price_regions(start_dates, end_dates, calendars=DEFAULT_CALENDAR,
+                  first_hour=True, fares=None, registry=None, backend=None):
+    """Price missions of several regions in one batch
+
+    Args:
+      start_dates: start of each mission, see
+        :func:`~honorary_gui.engine.price_missions`
+      end_dates: end of each mission
+      calendars: calendar id of each mission, or one id for all; map the
+        workers to their calendar beforehand to price per worker
+      first_hour (bool or sequence of bool): whether the first hour counts
+        extra
+      fares (:obj:`~honorary_gui.engine.FareSchedule`): defaults to
+        :func:`~honorary_gui.engine.default_fares`
+      registry (:obj:`CalendarRegistry`): defaults to
+        :func:`default_registry`
+      backend (str): kernel backend
+
+    Returns:
+      :obj:`RegionPricedMissions`
+    """
+    fares = fares if fares is not None else engine.default_fares()
+    registry = registry if registry is not None else default_registry()
+    tables = registry.tables()
+    with timing.stage('parse'):
+        start = engine.to_seconds(start_dates)
+        end = engine.to_seconds(end_dates)
+    with timing.stage('validate'):
+        # Every mission must fit in the table of its own calendar
+        start_hour, n_hours = engine.mission_hours(
+            start, end, tables.table(tables.ids[0]))
+        codes = tables.codes(calendars, start_hour.shape[0])
+        first_hour = np.broadcast_to(np.asarray(first_hour, dtype=np.bool_),
+                                     start.shape)
+    with timing.stage('kernel'):
+        hours, cents = kernel.segment_and_price(
+            start_hour + codes * (tables.n_days * 24), n_hours, first_hour,
+            tables.day_type, tables.origin, fares.subsequent, fares.first,
+            backend=backend, cumulative=tables.cumulative)
+    with timing.stage('result'):
+        return RegionPricedMissions(start.astype('datetime64[s]'),
+                                    end.astype('datetime64[s]'), hours,
+                                    cents, first_hour, fares, tables, codes)
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Daylight saving time of local mission dates.
+
+Missions are entered in local wall-clock time. The night French clocks go
+forward, 02:00 to 03:00 does not exist and an overnight mission lasts one
+hour less than its dates say; the night they go back, 02:00 to 03:00 happens
+twice and it lasts one hour more. Rather than expanding every mission into
+time zone aware hours, :class:`DstTable` precomputes the wall-clock hours of
+the transitions and :func:`adjust` corrects the hours and cents of a whole
+batch with a few binary searches:
+
+    engine.price_missions(start_dates, end_dates, tz='Europe/Paris')
+
+Since 1996 the European Union changes clocks at 01:00 UTC on the last
+Sundays of March and October, 02:00 and 03:00 local time in Paris and
+Brussels.
+"""
+
+import numpy as np
+
+from honorary_gui import kernel
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+# Local hour of the transition, in winter time
+TRANSITION_HOUR = 2
+TIMEZONES = ('Europe/Paris', 'Europe/Brussels')
+
+
+def last_sundays(years, month):
+    """Day numbers of the last Sunday of ``month`` in every year"""
+    years = np.asarray(years)
+    next_month = (years - 1970) * 12 + month
+    last_day = next_month.astype('datetime64[M]').astype('datetime64[D]') \
+        .astype(np.int64) - 1
+    # Day 0, 1970-01-01, was a Thursday; 0 is Monday below
+    weekday = (last_day + 3) % 7
+    return last_day - (weekday - 6) % 7
+
+
+class DstTable(object):
+    """Wall-clock hours skipped and repeated by the clock changes
+
+    Args:
+      start_year (int): first year covered
+      end_year (int): last year covered
+
+    Attributes:
+      skipped (:obj:`numpy.ndarray`): int64, local hour (hours since
+        1970-01-01 in wall-clock time) that does not exist each spring
+      repeated (:obj:`numpy.ndarray`): int64, local hour happening twice
+        each autumn
+    """
+
+    def __init__(self, start_year=1996, end_year=2050):
+        years = np.arange(start_year, end_year + 1)
+        self.skipped = last_sundays(years, 3) * 24 + TRANSITION_HOUR
+        self.repeated = last_sundays(years, 10) * 24 + TRANSITION_HOUR
+
+    @staticmethod
+    def _count(transitions, classes, start_hour, end_hour):
+        """Transitions of every class within each mission, shape (n, 4)"""
+        counts = np.zeros((start_hour.shape[0], kernel.N_CLASSES),
+                          dtype=np.int64)
+        for c in np.unique(classes):
+            hours = transitions[classes == c]
+            counts[:, c] = (np.searchsorted(hours, end_hour)
+                            - np.searchsorted(hours, start_hour))
+        return counts
+
+    def correction(self, start_hour, n_hours, day_type, origin):
+        """Hours of every class to add to each mission
+
+        Args:
+          start_hour (:obj:`numpy.ndarray`): int64, local hour each mission
+            starts in
+          n_hours (:obj:`numpy.ndarray`): int64, wall-clock hours of each
+            mission
+          day_type (:obj:`numpy.ndarray`): see
+            :func:`~honorary_gui.kernel.segment_and_price`
+          origin (int): day number of ``day_type[0]``
+
+        Returns:
+          :obj:`numpy.ndarray`: int64, shape (n, 4), -1 per skipped hour
+          and +1 per repeated hour, in the class of the transition hour
+        """
+        end_hour = start_hour + n_hours
+        correction = np.zeros((start_hour.shape[0], kernel.N_CLASSES),
+                              dtype=np.int64)
+        for transitions, sign in ((self.skipped, -1), (self.repeated, 1)):
+            day = transitions // 24 - origin
+            inside = (day >= 0) & (day < day_type.shape[0])
+            transitions = transitions[inside]
+            classes = kernel.first_hour_class(transitions, day_type, origin)
+            correction += sign * self._count(transitions, classes,
+                                             start_hour, end_hour)
+        return correction
+
+
+_tables = {}
+
+
+def table_for(tz):
+    """Transition table of a supported time zone, built once"""
+    if tz not in TIMEZONES:
+        raise ValueError("Unsupported time zone: " + str(tz))
+    if tz not in _tables:
+        _tables[tz] = DstTable()
+    return _tables[tz]
+
+
+def adjust(tz, start_hour, n_hours, hours, cents, day_type, origin,
+           subsequent, first_hour=None, first=None):
+    """Correct priced missions for the clock changes of ``tz``
+
+    Missing and extra hours are paid at the subsequent hour fare of their
+    class. A mission starting in the hour skipped in spring gets its first
+    hour premium, if any, on the next hour, the first that exists.
+
+    Args:
+      first_hour (:obj:`numpy.ndarray`): bool, missions priced with a first
+        hour premium
+      first (:obj:`numpy.ndarray`): first hour fares in cents, per class
+
+    Returns:
+      tuple: ``(hours, cents)``, new arrays
+    """
+    transitions = table_for(tz)
+    correction = transitions.correction(start_hour, n_hours, day_type,
+                                        origin)
+    cents = cents + correction @ subsequent
+    if first_hour is not None:
+        moved = first_hour & (n_hours > 0) & \
+            np.isin(start_hour, transitions.skipped)
+        if moved.any():
+            premium = first - subsequent
+            skipped = start_hour[moved]
+            cents[moved] -= premium[kernel.first_hour_class(
+                skipped, day_type, origin)]
+            # Kept only if the mission lasts past the skipped hour
+            cents[moved] += np.where(n_hours[moved] > 1, premium[
+                kernel.first_hour_class(skipped + 1, day_type, origin)], 0)
+    return hours + correction, cents
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Per-day earnings of every worker with constant-time range queries.
+
+:class:`DailyEarnings` splits missions by calendar day and keeps, for each
+worker and day, the hours and cents of every hour class (see
+:data:`~honorary_gui.engine.CLASS_LABELS`). Prefix sums over the days answer
+the total of any date window with two lookups, for one worker, a team or
+everybody:
+
+    earnings = DailyEarnings()
+    earnings.add(missions.worker, missions.start_date, missions.end_date,
+                 missions.first_hour)
+    earnings.total(worker=42, start='2020-03-01', end='2020-04-01')
+    earnings.total(worker=[3, 5, 8], start='2020-03-01', end='2020-03-08')
+
+Adding missions only recomputes the prefix sums from their first day on, so
+appending new days costs time proportional to the new days.
+"""
+
+import logging
+
+import numpy as np
+
+from honorary_gui import engine, kernel
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+COLUMNS = [label + '_hours' for label in engine.CLASS_LABELS] + \
+    [label + '_cents' for label in engine.CLASS_LABELS]
+
+
+def _days(dates):
+    return engine.to_seconds(dates) // 86400
+
+
+class DailyEarnings(object):
+    """Hours and cents per worker, day and hour class
+
+    Args:
+      fares (:obj:`~honorary_gui.engine.FareSchedule`): defaults to
+        :func:`~honorary_gui.engine.default_fares`
+      table (:obj:`~honorary_gui.engine.BusinessDayTable`): defaults to
+        :func:`~honorary_gui.engine.default_table`
+
+    Attributes:
+      origin (int): day number of the first day held
+      per_day (:obj:`numpy.ndarray`): int64, shape (workers, days, 8),
+        columns in the order of :data:`COLUMNS`
+      cumulative (:obj:`numpy.ndarray`): prefix sums of ``per_day`` over
+        the days, shape (workers, days + 1, 8)
+    """
+
+    def __init__(self, fares=None, table=None):
+        self.fares = fares if fares is not None else engine.default_fares()
+        self.table = table if table is not None else engine.default_table()
+        self.rows = {}
+        self.origin = None
+        self.n_days = 0
+        self.per_day = np.zeros((0, 0, len(COLUMNS)), dtype=np.int64)
+        self.cumulative = np.zeros((0, 1, len(COLUMNS)), dtype=np.int64)
+
+    @property
+    def workers(self):
+        return list(self.rows)
+
+    def add(self, workers, start_dates, end_dates, first_hour=True):
+        """Add the earnings of missions
+
+        Args:
+          workers: worker of each mission, or one worker for all, known by
+            their text, as in :class:`~honorary_gui.store.ResultsStore`:
+            ``1`` and ``'1'`` are the same worker
+          start_dates: start of each mission, see
+            :func:`~honorary_gui.engine.price_missions`
+          end_dates: end of each mission
+          first_hour (bool or sequence of bool): whether the first hour
+            counts extra
+        """
+        self._apply(workers, start_dates, end_dates, first_hour, 1)
+
+    def remove(self, workers, start_dates, end_dates, first_hour=True):
+        """Withdraw missions added before, e.g. to amend them"""
+        self._apply(workers, start_dates, end_dates, first_hour, -1)
+
+    def _apply(self, workers, start_dates, end_dates, first_hour, sign):
+        start_hour, n_hours = engine.mission_hours(
+            engine.to_seconds(start_dates), engine.to_seconds(end_dates),
+            self.table)
+        mission, day, hours, cents = kernel.segment_by_day(
+            start_hour, n_hours, first_hour, self.table.day_type,
+            self.table.origin, self.fares.subsequent, self.fares.first)
+        if mission.shape[0] == 0:
+            return
+        workers = np.broadcast_to(np.asarray(workers, dtype=object),
+                                  start_hour.shape)
+        ids, inverse = np.unique(workers.astype(str), return_inverse=True)
+        rows = np.array([self._row(worker) for worker in ids.tolist()],
+                        dtype=np.int64)
+        stale = self._grow(day.min(), day.max())
+        values = np.concatenate([hours, cents], axis=1) * sign
+        np.add.at(self.per_day,
+                  (rows[inverse.ravel()[mission]], day - self.origin), values)
+        self._accumulate(min(stale, day.min() - self.origin))
+
+    def _row(self, worker):
+        if worker not in self.rows:
+            self.rows[worker] = len(self.rows)
+        return self.rows[worker]
+
+    def _grow(self, first_day, last_day):
+        """Make room for the workers known and the days up to ``last_day``
+
+        Returns:
+          int: first day whose prefix sums must be recomputed
+        """
+        first_day, last_day = int(first_day), int(last_day)
+        if self.origin is None:
+            self.origin = first_day
+        shift = max(self.origin - first_day, 0)
+        n_days = max(self.n_days, last_day - self.origin + 1) + shift
+        stale = self.n_days if not shift else 0
+        n_workers, capacity = self.per_day.shape[:2]
+        if len(self.rows) > n_workers or n_days > capacity or shift:
+            # Capacities double so that appending costs amortized O(1)
+            rows = max(len(self.rows), 2 * n_workers) \
+                if len(self.rows) > n_workers else n_workers
+            days = max(n_days, 2 * capacity) if n_days > capacity \
+                else capacity
+            per_day = np.zeros((rows, days, len(COLUMNS)), dtype=np.int64)
+            per_day[:n_workers, shift:shift + self.n_days] = \
+                self.per_day[:, :self.n_days]
+            cumulative = np.zeros((rows, days + 1, len(COLUMNS)),
+                                  dtype=np.int64)
+            cumulative[:n_workers, :self.n_days + 1] = \
+                self.cumulative[:, :self.n_days + 1]
+            self.per_day, self.cumulative = per_day, cumulative
+            self.origin -= shift
+        self.n_days = n_days
+        return stale
+
+    def _accumulate(self, since):
+        """Recompute the prefix sums of the days from ``since`` on"""
+        since = max(since, 0)
+        self.cumulative[:, since + 1:self.n_days + 1] = \
+            self.cumulative[:, since:since + 1] + np.cumsum(
+                self.per_day[:, since:self.n_days], axis=1)
+
+    def values(self, workers, start, end):
+        """Totals of every column over ``[start, end)``, vectorized
+
+        Args:
+          workers: worker of each query
+          start: first date of each query, included
+          end: last date of each query, excluded
+
+        Returns:
+          :obj:`numpy.ndarray`: int64, shape (n, 8), zeros for unknown
+          workers
+        """
+        workers = np.atleast_1d(np.asarray(workers, dtype=object))
+        rows = np.array([self.rows.get(str(worker), -1)
+                         for worker in workers.tolist()], dtype=np.int64)
+        origin = self.origin if self.origin is not None else 0
+        first = np.clip(_days(start) - origin, 0, self.n_days)
+        last = np.clip(_days(end) - origin, 0, self.n_days)
+        last = np.maximum(last, first)
+        rows, first, last = np.broadcast_arrays(rows, first, last)
+        known = rows >= 0
+        out = np.zeros((rows.shape[0], len(COLUMNS)), dtype=np.int64)
+        out[known] = (self.cumulative[rows[known], last[known]]
+                      - self.cumulative[rows[known], first[known]])
+        return out
+
+    def total(self, worker=None, start=None, end=None):
+        """Earnings of a worker, a team or everybody over ``[start, end)``
+
+        Args:
+          worker: one worker, a list of workers, or everybody when None
+          start: first date included, everything held when None
+          end: last date excluded, everything held when None
+
+        Returns:
+          dict: hours and honorary in euros per class of
+          :data:`~honorary_gui.engine.CLASS_LABELS`, as ``<class>_hours``
+          and ``<class>_honorary``, with ``hours_worked`` and ``honorary``
+        """
+        if worker is None:
+            workers = self.workers
+        elif isinstance(worker, (list, tuple, set, np.ndarray)):
+            workers = list(worker)
+        else:
+            workers = [worker]
+        origin = self.origin if self.origin is not None else 0
+        start = start if start is not None else \
+            np.datetime64(origin, 'D')
+        end = end if end is not None else \
+            np.datetime64(origin + self.n_days, 'D')
+        values = self.values(workers, [start], [end]).sum(axis=0)
+        n = len(engine.CLASS_LABELS)
+        totals = {}
+        for i, label in enumerate(engine.CLASS_LABELS):
+            totals[label + '_hours'] = int(values[i])
+            totals[label + '_honorary'] = int(values[n + i]) / 100
+        totals['hours_worked'] = int(values[:n].sum())
+        totals['honorary'] = int(values[n:].sum()) / 100
+        return totals
@@ -0,0 +1,461 @@
+# -*- coding: utf-8 -*-
+"""
+Batch pricing engine of the honorary calculator.
+
+The rules are the ones of ``calculate_honorary`` in
+honorary_calc_message_check.py:
+
+ * day is between 0700 and 2200, night is between 2200 and 0700
+ * weekends and French holidays are paid at the holiday fare
+ * the first hour of a mission can be paid at a higher fare
+
+Missions spanning more than two days are segmented per calendar day, each
+day being paid at the fare of its own day type.
+
+Example:
+
+    >>> from honorary_gui.engine import price_missions
+    >>> priced = price_missions(['2020-06-01 08:00:00'],
+    ...                         ['2020-06-01 23:00:00'])
+    >>> priced.honorary.tolist()
+    [469.5]
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.holiday import AbstractHolidayCalendar, Holiday, \
+    EasterMonday
+from pandas.tseries.offsets import Day, Easter
+
+from honorary_gui import dst, kernel, timing
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+
+class FrenchBusinessCalendar(AbstractHolidayCalendar):
+    rules = [
+        Holiday('New Years Day', month=1, day=1),
+        EasterMonday,
+        Holiday('Labour Day', month=5, day=1),
+        Holiday('Victory in Europe Day', month=5, day=8),
+        Holiday('Ascension Day', month=1, day=1, offset=[Easter(), Day(39)]),
+        Holiday('Bastille Day', month=7, day=14),
+        Holiday('Assumption of Mary to Heaven', month=8, day=15),
+        Holiday('All Saints Day', month=11, day=1),
+        Holiday('Armistice Day', month=11, day=11),
+        Holiday('Christmas Day', month=12, day=25)
+    ]
+
+
+# Fares in euros, depending on day time
+NORMAL_DICT = {'day_first_hour_fare': '42',
+               'night_first_hour_fare': '49.50',
+               'day_subsequent_hour_fare': '30',
+               'night_subsequent_hour_fare': '37.50'
+               }
+
+HOLIDAY_DICT = {'day_first_hour_fare': '49.50',
+                'night_first_hour_fare': '57',
+                'day_subsequent_hour_fare': '37.50',
+                'night_subsequent_hour_fare': '45'
+                }
+
+# Days covered by the default business day table
+TABLE_START = '2000-01-01'
+TABLE_END = '2050-12-31'
+
+BUSINESS_DAY = 0
+HOLIDAY = 1
+
+CLASS_LABELS = ['business_day', 'business_night', 'holiday_day',
+                'holiday_night']
+
+# Columns of mission files, first_hour and worker are optional
+MISSION_COLUMNS = ['start_date', 'end_date']
+# Values of the first_hour column, case insensitive
+FIRST_HOUR_VALUES = {'true': True, '1': True, 'yes': True, 'y': True,
+                     'false': False, '0': False, 'no': False, 'n': False}
+
+
+class BusinessDayTable(object):
+    """Business day or holiday flag of every day of a period
+
+    Args:
+      calendar (:obj:`AbstractHolidayCalendar`): holiday calendar, defaults
+        to :class:`FrenchBusinessCalendar`
+      start (str): first day of the table
+      end (str): last day of the table
+    """
+
+    def __init__(self, calendar=None, start=TABLE_START, end=TABLE_END):
+        calendar = calendar if calendar is not None else \
+            FrenchBusinessCalendar()
+        days = pd.date_range(start, end, freq='D')
+        holidays = calendar.holidays(start=days[0], end=days[-1])
+        day_type = np.where(days.dayofweek >= 5, HOLIDAY, BUSINESS_DAY)
+        day_type[days.isin(holidays)] = HOLIDAY
+        self.day_type = day_type.astype(np.uint8)
+        self.origin = int(days[0].value // (86400 * 10 ** 9))
+        self.cumulative = kernel._cumulative_hours(self.day_type)
+
+    @classmethod
+    def from_arrays(cls, day_type, origin, cumulative=None):
+        """Table over precomputed arrays, which are not copied
+
+        Args:
+          day_type (:obj:`numpy.ndarray`): uint8 flag of every day
+          origin (int): day number of ``day_type[0]``
+          cumulative (:obj:`numpy.ndarray`): prefix sums of the table,
+            computed when not given
+        """
+        table = cls.__new__(cls)
+        table.day_type = day_type
+        table.origin = int(origin)
+        table.cumulative = cumulative if cumulative is not None else \
+            kernel._cumulative_hours(day_type)
+        return table
+
+    def __len__(self):
+        return self.day_type.shape[0]
+
+    @property
+    def start(self):
+        return pd.Timestamp(self.origin, unit='D')
+
+    @property
+    def end(self):
+        return pd.Timestamp(self.origin + len(self) - 1, unit='D')
+
+    def check(self, first_day, last_day):
+        """Raise a ValueError if days fall outside of the table
+
+        Args:
+          first_day (:obj:`numpy.ndarray`): first day number of each mission
+          last_day (:obj:`numpy.ndarray`): last day number of each mission
+        """
+        if first_day.shape[0] == 0:
+            return
+        if first_day.min() < self.origin or \
+                last_day.max() >= self.origin + len(self):
+            raise ValueError("Mission outside of the calendar, which covers "
+                             + str(self.start.date()) + ' to '
+                             + str(self.end.date()))
+
+    def is_holiday(self, dates):
+        """Whether dates are weekends or holidays
+
+        Args:
+          dates: anything :func:`pandas.to_datetime` understands
+
+        Returns:
+          :obj:`numpy.ndarray`: bool
+        """
+        day = to_seconds(dates) // 86400
+        self.check(day, day)
+        return self.day_type[day - self.origin] == HOLIDAY
+
+
+class FareSchedule(object):
+    """Hourly fares of every hour class, in cents
+
+    Args:
+      normal_dict (dict): business day fare dictionary
+      holiday_dict (dict): holiday fare dictionary
+    """
+
+    def __init__(self, normal_dict=NORMAL_DICT, holiday_dict=HOLIDAY_DICT):
+        self.normal_dict = dict(normal_dict)
+        self.holiday_dict = dict(holiday_dict)
+        self.subsequent = _to_cents(normal_dict, holiday_dict,
+                                    'subsequent_hour_fare')
+        self.first = _to_cents(normal_dict, holiday_dict, 'first_hour_fare')
+
+    @classmethod
+    def from_cents(cls, subsequent, first):
+        """Schedule over fare arrays in cents, which are not copied"""
+        fares = cls.__new__(cls)
+        fares.subsequent = subsequent
+        fares.first = first
+        fares.normal_dict, fares.holiday_dict = [
+            {shift + '_' + suffix: '{:g}'.format(cents[2 * t + s] / 100)
+             for suffix, cents in (('first_hour_fare', first),
+                                   ('subsequent_hour_fare', subsequent))
+             for s, shift in enumerate(('day', 'night'))}
+            for t in (BUSINESS_DAY, HOLIDAY)]
+        return fares
+
+
+def _to_cents(normal_dict, holiday_dict, suffix):
+    fares = [fare_dict.get(shift + '_' + suffix)
+             for fare_dict in (normal_dict, holiday_dict)
+             for shift in ('day', 'night')]
+    return np.array([int(round(float(fare) * 100)) for fare in fares],
+                    dtype=np.int64)
+
+
+class PricedMissions(object):
+    """Result of :func:`price_missions`
+
+    Attributes:
+      start (:obj:`numpy.ndarray`): start of each mission, datetime64[s]
+      end (:obj:`numpy.ndarray`): end of each mission, datetime64[s]
+      hours (:obj:`numpy.ndarray`): hours worked per class, shape (n, 4),
+        columns in the order of :data:`CLASS_LABELS`
+      cents (:obj:`numpy.ndarray`): honorary of each mission in cents
+      first_hour, fares, table, tz: pricing inputs kept by reference for
+        :attr:`audit`, None when unknown
+    """
+
+    def __init__(self, start, end, hours, cents, first_hour=None,
+                 fares=None, table=None, tz=None):
+        self.start = start
+        self.end = end
+        self.hours = hours
+        self.cents = cents
+        self.first_hour = first_hour
+        self.fares = fares
+        self.table = table
+        self.tz = tz
+
+    def __len__(self):
+        return self.cents.shape[0]
+
+    @property
+    def honorary(self):
+        """Honorary of each mission in euros"""
+        return self.cents / 100
+
+    @property
+    def hours_worked(self):
+        return self.hours.sum(axis=1)
+
+    def table_of(self, index):
+        """Business day table mission ``index`` was priced with"""
+        return self.table
+
+    @property
+    def audit(self):
+        """Per-hour breakdown of each mission, built when indexed
+
+        Returns:
+          :obj:`~honorary_gui.audit.AuditTrail`
+        """
+        from honorary_gui.audit import AuditTrail
+        return AuditTrail(self)
+
+    def to_frame(self):
+        """Results as a :obj:`pandas.DataFrame`, one row per mission"""
+        frame = pd.DataFrame(self.hours, columns=CLASS_LABELS)
+        frame.insert(0, 'start_date', self.start)
+        frame.insert(1, 'end_date', self.end)
+        frame['hours_worked'] = self.hours_worked
+        frame['honorary'] = self.honorary
+        return frame
+
+
+_default_table = None
+_default_fares = None
+
+
+def default_table():
+    """Business day table of :class:`FrenchBusinessCalendar`, built once"""
+    global _default_table
+    if _default_table is None:
+        _default_table = BusinessDayTable()
+    return _default_table
+
+
+def default_fares():
+    """Fare schedule of :data:`NORMAL_DICT` and :data:`HOLIDAY_DICT`"""
+    global _default_fares
+    if _default_fares is None:
+        _default_fares = FareSchedule()
+    return _default_fares
+
+
+def warm_up():
+    """Build the default tables and compile the kernel ahead of first use"""
+    price_missions([default_table().start], [default_table().start])
+
+
+def to_seconds(dates):
+    """Seconds since 1970-01-01 of naive dates
+
+    Args:
+      dates: strings, Timestamps or datetime64 values, a scalar or a
+        sequence
+
+    Returns:
+      :obj:`numpy.ndarray`: int64
+    """
+    values = np.asarray(dates)
+    if values.dtype.kind != 'M':
+        values = np.asarray(pd.to_datetime(values.ravel()))
+    return values.astype('datetime64[s]').astype(np.int64).ravel()
+
+
+def check_first_hour(value):
+    """First hour flag of one mission record, a real boolean
+
+    ``bool('false')`` is True, so strings and other values are rejected
+    rather than converted.
+
+    Raises:
+      ValueError: ``value`` is not a boolean
+    """
+    if not isinstance(value, (bool, np.bool_)):
+        raise ValueError("first_hour must be true or false, not "
+                         + repr(value))
+    return bool(value)
+
+
+def _parse_first_hour(values):
+    # Integer columns read as floats when a cell is empty
+    text = values.astype(str).str.strip().str.lower() \
+        .str.replace(r'\.0$', '', regex=True)
+    parsed = text.map(FIRST_HOUR_VALUES)
+    invalid = parsed.isna()
+    if invalid.any():
+        raise ValueError("Invalid first_hour values in rows: " + ', '.join(
+            str(i) for i in values.index[invalid][:10]))
+    return parsed.astype(bool)
+
+
+def read_missions(path, **kwargs):
+    """Read missions from a CSV file
+
+    The file needs ``start_date`` and ``end_date`` columns in format
+    '%Y-%m-%d %H:%M:%S'. A ``first_hour`` column (True/False, 1/0 or
+    yes/no) tells whether the first hour counts extra, it does for every
+    mission when missing. Other values, empty cells included, are an
+    error.
+
+    Args:
+      path (str): CSV file or buffer
+      **kwargs: passed to :func:`pandas.read_csv`
+
+    Returns:
+      :obj:`pandas.DataFrame`: missions, dates parsed
+    """
+    missions = pd.read_csv(path, **kwargs)
+    missing = [c for c in MISSION_COLUMNS if c not in missions.columns]
+    if missing:
+        raise ValueError("Missing columns in mission file: "
+                         + ', '.join(missing))
+    for column in MISSION_COLUMNS:
+        missions[column] = pd.to_datetime(missions[column])
+    if 'first_hour' in missions.columns:
+        missions['first_hour'] = _parse_first_hour(missions['first_hour'])
+    else:
+        missions['first_hour'] = True
+    return missions
+
+
+def mission_hours(start, end, table):
+    """Start hour and whole hours worked of missions, checked
+
+    Args:
+      start (:obj:`numpy.ndarray`): start of each mission, see
+        :func:`to_seconds`
+      end (:obj:`numpy.ndarray`): end of each mission
+      table (:obj:`BusinessDayTable`): calendar the missions must fit in
+
+    Returns:
+      tuple: int64 arrays ``(start_hour, n_hours)``, hours since 1970-01-01
+    """
+    if start.shape != end.shape:
+        raise ValueError("As many start dates as end dates are required")
+    n_hours = (end - start) // 3600
+    if (n_hours < 0).any():
+        raise ValueError("End date happened before start date")
+    start_hour = start // 3600
+    table.check(start_hour // 24,
+                (start_hour + np.maximum(n_hours - 1, 0)) // 24)
+    return start_hour, n_hours
+
+
+def price_missions(start_dates, end_dates, first_hour=True, fares=None,
+                   table=None, backend=None, tz=None):
+    """Price a batch of missions
+
+    Args:
+      start_dates: start of each mission, strings in format
+        '%Y-%m-%d %H:%M:%S', Timestamps or datetime64 values
+      end_dates: end of each mission, same formats as ``start_dates``
+      first_hour (bool or sequence of bool): whether the first hour counts
+        extra, for all or for each mission
+      fares (:obj:`FareSchedule`): defaults to :func:`default_fares`
+      table (:obj:`BusinessDayTable`): defaults to :func:`default_table`
+      backend (str): kernel backend, see :data:`kernel.BACKENDS`
+      tz (str): time zone of the dates, see :data:`dst.TIMEZONES`, to
+        count the hours gained or lost when clocks change; dates are taken
+        as they are when None
+
+    Returns:
+      :obj:`PricedMissions`: hours and honorary of every mission
+    """
+    fares = fares if fares is not None else default_fares()
+    table = table if table is not None else default_table()
+    with timing.stage('parse'):
+        start = to_seconds(start_dates)
+        end = to_seconds(end_dates)
+    with timing.stage('validate'):
+        start_hour, n_hours = mission_hours(start, end, table)
+        first_hour = np.broadcast_to(np.asarray(first_hour, dtype=np.bool_),
+                                     start.shape)
+    with timing.stage('kernel'):
+        hours, cents = kernel.segment_and_price(
+            start_hour, n_hours, first_hour, table.day_type, table.origin,
+            fares.subsequent, fares.first, backend=backend,
+            cumulative=table.cumulative)
+    if tz is not None:
+        with timing.stage('dst'):
+            hours, cents = dst.adjust(tz, start_hour, n_hours, hours, cents,
+                                      table.day_type, table.origin,
+                                      fares.subsequent, first_hour,
+                                      fares.first)
+    with timing.stage('result'):
+        return PricedMissions(start.astype('datetime64[s]'),
+                              end.astype('datetime64[s]'), hours, cents,
+                              first_hour, fares, table, tz)
+
+
+def calculate_honorary(start_date, end_date, first_hour=True):
+    """Price a single mission and describe the result
+
+    Same message as ``calculate_honorary`` of the GUI.
+
+    Args:
+      start_date (str): start date in format '%Y-%m-%d %H:%M:%S'
+      end_date (str): end date in format '%Y-%m-%d %H:%M:%S'
+      first_hour (bool): whether the first hour counts extra
+
+    Returns:
+      str: summary of the mission
+    """
+    start_date = pd.Timestamp(start_date)
+    end_date = pd.Timestamp(end_date)
+    priced = price_missions([start_date], [end_date], first_hour=first_hour)
+    with timing.stage('holiday_lookup'):
+        holidays = default_table().is_holiday([start_date, end_date])
+    start_date_mess = ('Start date is weekend or holiday' if holidays[0]
+                       else 'Start date is business day.')
+    end_date_mess = ('End date is weekend or holiday.' if holidays[1]
+                     else 'End date is business day.')
+    main_mess = ('You have worked ' + str(int(priced.hours_worked[0]))
+                 + ' hours.')
+    honorary_mess = ('You are owed ' + str(int(priced.honorary[0]))
+                     + ' euros.')
+    _logger.debug("Priced mission %s to %s", start_date, end_date)
+    return ('Start date: ' + str(start_date) + '          '
+            + 'End date: ' + str(end_date) + '          '
+            + start_date_mess + '               '
+            + end_date_mess + '                   '
+            + main_mess + '                    '
+            + honorary_mess)
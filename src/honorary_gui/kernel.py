@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+Segmentation and pricing kernels of the honorary engine.
+
+A mission is reduced to integers before it reaches this module: the absolute
+hour it starts in (hours since 1970-01-01) and the number of whole hours
+worked. Every hour is attributed to the calendar day it starts on and to the
+day shift (0700 to 2200) or the night shift. Hours are counted per class,
+
+    0: business day, day shift
+    1: business day, night shift
+    2: holiday, day shift
+    3: holiday, night shift
+
+and priced in integer cents so that every backend returns exactly the same
+amounts.
+
+Two backends are available:
+
+ * ``numba``: a per-mission loop over calendar days compiled with numba.
+   Used by default when numba is installed.
+ * ``numpy``: a vectorized implementation based on prefix sums over the
+   business day table. Always available.
+"""
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # pragma: no cover - depends on the environment
+    numba = None
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+DAY_START_HOUR = 7
+NIGHT_START_HOUR = 22
+DAY_HOURS = NIGHT_START_HOUR - DAY_START_HOUR
+NIGHT_HOURS = 24 - DAY_HOURS
+N_CLASSES = 4
+
+BACKENDS = ('numba', 'numpy') if numba is not None else ('numpy',)
+DEFAULT_BACKEND = BACKENDS[0]
+
+
+def _segment_loop(start_hour, n_hours, first_hour, day_type, origin,
+                  subsequent, first, hours, cents):
+    """Reference loop over the calendar days of every mission
+
+    Plain Python, compiled with numba when it is available. Fills ``hours``
+    and ``cents`` in place.
+    """
+    for i in range(start_hour.shape[0]):
+        h = start_hour[i]
+        end = h + n_hours[i]
+        while h < end:
+            day = h // 24
+            day_end = min((day + 1) * 24, end)
+            t = day_type[day - origin]
+            lo = h - day * 24
+            hi = day_end - day * 24
+            day_h = max(0, min(hi, NIGHT_START_HOUR) - max(lo, DAY_START_HOUR))
+            hours[i, 2 * t] += day_h
+            hours[i, 2 * t + 1] += (hi - lo) - day_h
+            h = day_end
+        total = 0
+        for c in range(N_CLASSES):
+            total += hours[i, c] * subsequent[c]
+        if first_hour[i] and n_hours[i] > 0:
+            h = start_hour[i]
+            t = day_type[h // 24 - origin]
+            r = h % 24
+            c = 2 * t
+            if r < DAY_START_HOUR or r >= NIGHT_START_HOUR:
+                c += 1
+            total += first[c] - subsequent[c]
+        cents[i] = total
+
+
+if numba is not None:  # pragma: no cover - depends on the environment
+    _segment_loop_jit = numba.njit(cache=True, nogil=True)(_segment_loop)
+else:
+    _segment_loop_jit = None
+
+
+def _cumulative_hours(day_type):
+    """Hours of every class worked on the days before each table entry
+
+    Returns:
+      :obj:`numpy.ndarray`: int64 array of shape ``(len(day_type) + 1, 4)``
+    """
+    per_day = np.zeros((day_type.shape[0], N_CLASSES), dtype=np.int64)
+    rows = np.arange(day_type.shape[0])
+    per_day[rows, 2 * day_type] = DAY_HOURS
+    per_day[rows, 2 * day_type + 1] = NIGHT_HOURS
+    cumulative = np.zeros((day_type.shape[0] + 1, N_CLASSES), dtype=np.int64)
+    np.cumsum(per_day, axis=0, out=cumulative[1:])
+    return cumulative
+
+
+def _hours_before(hour, day_type, origin, cumulative):
+    """Hours of every class between the table origin and ``hour``"""
+    day = hour // 24 - origin
+    r = hour % 24
+    # ``hour`` may sit on the midnight closing the table, its partial day
+    # is empty then
+    t = day_type[np.minimum(day, day_type.shape[0] - 1)].astype(np.int64)
+    day_h = np.clip(r - DAY_START_HOUR, 0, DAY_HOURS)
+    out = cumulative[day].copy()
+    rows = np.arange(hour.shape[0])
+    out[rows, 2 * t] += day_h
+    out[rows, 2 * t + 1] += r - day_h
+    return out
+
+
+def first_hour_class(start_hour, day_type, origin):
+    """Class of the hour each mission starts in"""
+    t = day_type[start_hour // 24 - origin].astype(np.int64)
+    r = start_hour % 24
+    return 2 * t + ((r < DAY_START_HOUR) | (r >= NIGHT_START_HOUR))
+
+
+def _segment_numpy(start_hour, n_hours, first_hour, day_type, origin,
+                   subsequent, first, cumulative=None):
+    """Vectorized counterpart of :func:`_segment_loop`"""
+    if cumulative is None:
+        cumulative = _cumulative_hours(day_type)
+    hours = (_hours_before(start_hour + n_hours, day_type, origin, cumulative)
+             - _hours_before(start_hour, day_type, origin, cumulative))
+    cents = hours @ subsequent
+    premium = (first - subsequent)[
+        first_hour_class(start_hour, day_type, origin)]
+    cents += np.where(first_hour & (n_hours > 0), premium, 0)
+    return hours, cents
+
+
+def segment_and_price(start_hour, n_hours, first_hour, day_type, origin,
+                      subsequent, first, backend=None, cumulative=None):
+    """Count the hours of every class and price each mission
+
+    Args:
+      start_hour (:obj:`numpy.ndarray`): int64, absolute hour each mission
+        starts in
+      n_hours (:obj:`numpy.ndarray`): int64, whole hours worked, >= 0
+      first_hour (:obj:`numpy.ndarray`): bool, whether the first hour is
+        paid at the first hour fare
+      day_type (:obj:`numpy.ndarray`): uint8, 0 for business days and 1 for
+        weekends and holidays, one entry per day from ``origin``
+      origin (int): day number (days since 1970-01-01) of ``day_type[0]``
+      subsequent (:obj:`numpy.ndarray`): int64, hourly fare of every class
+        in cents
+      first (:obj:`numpy.ndarray`): int64, first hour fare of every class
+        in cents
+      backend (str): one of :data:`BACKENDS`, defaults to
+        :data:`DEFAULT_BACKEND`
+      cumulative (:obj:`numpy.ndarray`): prefix sums of the ``numpy``
+        backend, computed from ``day_type`` when not given
+
+    Returns:
+      tuple: ``(hours, cents)``, hours per class with shape ``(n, 4)`` and
+      the honorary of every mission in cents
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError("Unknown or unavailable backend: " + str(backend))
+    start_hour = np.ascontiguousarray(start_hour, dtype=np.int64)
+    n_hours = np.ascontiguousarray(n_hours, dtype=np.int64)
+    first_hour = np.ascontiguousarray(first_hour, dtype=np.bool_)
+    subsequent = np.ascontiguousarray(subsequent, dtype=np.int64)
+    first = np.ascontiguousarray(first, dtype=np.int64)
+    if backend == 'numpy':
+        return _segment_numpy(start_hour, n_hours, first_hour, day_type,
+                              origin, subsequent, first, cumulative)
+    hours = np.zeros((start_hour.shape[0], N_CLASSES), dtype=np.int64)
+    cents = np.zeros(start_hour.shape[0], dtype=np.int64)
+    _segment_loop_jit(start_hour, n_hours, first_hour,
+                      np.ascontiguousarray(day_type, dtype=np.int64),
+                      np.int64(origin), subsequent, first, hours, cents)
+    return hours, cents
+
+
+def segment_by_day(start_hour, n_hours, first_hour, day_type, origin,
+                   subsequent, first):
+    """Hours and cents of every class per mission and calendar day
+
+    Same attribution as :func:`segment_and_price`, kept per day: summing
+    the pieces of a mission gives its hours and cents. The first hour
+    premium is counted on the day and class of the first hour.
+
+    Args:
+      start_hour, n_hours, first_hour, day_type, origin, subsequent,
+        first: see :func:`segment_and_price`
+
+    Returns:
+      tuple: ``(mission, day, hours, cents)``, one entry per piece: index
+      of the mission, day number, hours per class with shape ``(m, 4)`` and
+      cents per class with shape ``(m, 4)``
+    """
+    start_hour = np.asarray(start_hour, dtype=np.int64)
+    n_hours = np.asarray(n_hours, dtype=np.int64)
+    end_hour = start_hour + n_hours
+    first_day = start_hour // 24
+    n_days = np.where(n_hours > 0, (end_hour - 1) // 24 - first_day + 1, 0)
+    mission = np.repeat(np.arange(start_hour.shape[0]), n_days)
+    offsets = np.cumsum(n_days) - n_days
+    day = first_day[mission] + np.arange(mission.shape[0]) - offsets[mission]
+    lo = np.maximum(start_hour[mission] - day * 24, 0)
+    hi = np.minimum(end_hour[mission] - day * 24, 24)
+    t = np.asarray(day_type)[day - origin].astype(np.int64)
+    day_h = np.maximum(0, np.minimum(hi, NIGHT_START_HOUR)
+                       - np.maximum(lo, DAY_START_HOUR))
+    rows = np.arange(mission.shape[0])
+    hours = np.zeros((mission.shape[0], N_CLASSES), dtype=np.int64)
+    hours[rows, 2 * t] = day_h
+    hours[rows, 2 * t + 1] = hi - lo - day_h
+    cents = hours * np.asarray(subsequent, dtype=np.int64)
+    # The first piece of a mission holds its first hour
+    starts = offsets[n_days > 0]
+    premium = np.broadcast_to(np.asarray(first_hour, dtype=np.bool_),
+                              start_hour.shape)[mission[starts]]
+    r = lo[starts]
+    c = 2 * t[starts] + ((r < DAY_START_HOUR) | (r >= NIGHT_START_HOUR))
+    cents[starts[premium], c[premium]] += \
+        (np.asarray(first, dtype=np.int64)
+         - np.asarray(subsequent, dtype=np.int64))[c[premium]]
+    return mission, day, hours, cents
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Overlapping missions of a worker.
+
+Missions logged twice, or overlapping, would be paid twice by
+:func:`~honorary_gui.engine.price_missions`, first hour premium included.
+:func:`find_overlaps` sorts the missions by worker and start once and sweeps
+them with a running maximum of the end dates, which is O(n log n) however
+many missions overlap. :func:`merge_missions` collapses every group of
+overlapping missions into one mission before pricing:
+
+    merged = merge_missions(missions)
+    priced = engine.price_missions(merged.start_date, merged.end_date,
+                                   merged.first_hour)
+
+Missions only touching, one ending when the next starts, do not overlap.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from honorary_gui import engine
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+
+def _columns(missions):
+    """Worker codes, start, end seconds and first hour flags"""
+    n = len(missions)
+    if 'worker' in missions.columns:
+        workers = pd.factorize(missions['worker'])[0].astype(np.int64)
+    else:
+        workers = np.zeros(n, dtype=np.int64)
+    start = engine.to_seconds(missions['start_date'])
+    end = engine.to_seconds(missions['end_date'])
+    if 'first_hour' in missions.columns:
+        first_hour = missions['first_hour'].to_numpy(dtype=np.bool_)
+    else:
+        first_hour = np.ones(n, dtype=np.bool_)
+    return workers, start, end, first_hour
+
+
+def sweep(workers, start, end):
+    """Sort missions and group those overlapping
+
+    Args:
+      workers (:obj:`numpy.ndarray`): int64 code of the worker of each
+        mission, >= 0
+      start (:obj:`numpy.ndarray`): int64 start of each mission, seconds
+      end (:obj:`numpy.ndarray`): int64 end of each mission, seconds
+
+    Returns:
+      tuple: ``(order, group, overlapping)``, the indices sorting the
+      missions by worker and start, the group of every mission in that
+      order, numbered from 0, and whether a mission overlaps one started
+      before it
+    """
+    order = np.lexsort((end, start, workers))
+    workers, start, end = workers[order], start[order], end[order]
+    # Offsetting the dates of each worker past those of the previous one
+    # turns a single running maximum into a running maximum per worker
+    base = start.min() if len(start) else 0
+    span = int(max(end.max() - base, 0)) + 1 if len(end) else 1
+    reach = np.maximum.accumulate(end - base + workers * span)
+    overlapping = np.zeros(len(order), dtype=np.bool_)
+    overlapping[1:] = (workers[1:] == workers[:-1]) & \
+        (start[1:] - base + workers[1:] * span < reach[:-1])
+    group = np.cumsum(~overlapping) - 1
+    return order, group, overlapping
+
+
+def find_overlaps(missions):
+    """Flag the missions overlapping another mission of their worker
+
+    Args:
+      missions (:obj:`pandas.DataFrame`): ``start_date``, ``end_date`` and
+        optionally ``worker`` columns
+
+    Returns:
+      :obj:`pandas.DataFrame`: ``group``, missions of a group overlap each
+      other in chain, and ``overlaps``, indexed like ``missions``
+    """
+    workers, start, end, _ = _columns(missions)
+    order, group, overlapping = sweep(workers, start, end)
+    size = np.bincount(group)
+    result = pd.DataFrame(index=missions.index)
+    result['group'] = np.empty(len(order), dtype=np.int64)
+    result['overlaps'] = False
+    result.iloc[order, 0] = group
+    result.iloc[order, 1] = size[group] > 1
+    return result
+
+
+def merge_missions(missions):
+    """Merge the overlapping missions of each worker
+
+    A merged mission runs from the earliest start to the latest end of its
+    group, and its first hour counts extra if it does for the mission
+    starting first.
+
+    Args:
+      missions (:obj:`pandas.DataFrame`): ``start_date``, ``end_date`` and
+        optionally ``worker`` and ``first_hour`` columns
+
+    Returns:
+      :obj:`pandas.DataFrame`: merged missions by worker, in order of first
+      appearance, and by start, with the ``merged`` count of missions they
+      replace
+    """
+    workers, start, end, first_hour = _columns(missions)
+    order, group, overlapping = sweep(workers, start, end)
+    heads = np.flatnonzero(~overlapping)
+    merged_end = np.maximum.reduceat(end[order], heads) if len(heads) \
+        else end
+    merged = pd.DataFrame({
+        'start_date': start[order][heads].astype('datetime64[s]'),
+        'end_date': merged_end.astype('datetime64[s]'),
+        'first_hour': first_hour[order][heads],
+        'merged': np.diff(np.append(heads, len(order)))})
+    if 'worker' in missions.columns:
+        merged.insert(0, 'worker',
+                      missions['worker'].to_numpy()[order][heads])
+    _logger.debug("Merged %d missions into %d", len(order), len(merged))
+    return merged
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Cheapest placement of a block of hours.
+
+Planners need to cover, say, 40 hours within a week and want the schedule
+costing least given day and night fares and holidays. :func:`plan_shifts`
+considers every schedule of equal shifts starting at the same hour on
+distinct days of the window:
+
+    plan_shifts('2021-05-10', n_days=7, total_hours=40, shift_hours=(8, 10))
+
+returns the cheapest of 21 day choices x 24 start hours for 5 shifts of 8
+hours and 35 x 24 for 4 shifts of 10 hours. The cost of a schedule is a sum
+of shift costs, so every possible shift of the window is priced once, in
+one batch, and the schedules are costed by gathering and summing those
+prices over the day choices.
+"""
+
+import logging
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from honorary_gui import engine
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+TOTAL_HOURS = 40
+SHIFT_HOURS = (8, 10)
+# Hours off between the end of a shift and the start of the next
+MIN_REST = 11
+TOP = 10
+
+
+def plan_shifts(start, n_days=7, total_hours=TOTAL_HOURS,
+                shift_hours=SHIFT_HOURS, start_hours=None, min_rest=MIN_REST,
+                first_hour=True, top=TOP, fares=None, table=None):
+    """Cheapest schedules covering ``total_hours`` within a window
+
+    Args:
+      start: first day of the window
+      n_days (int): days of the window, shifts start on these days
+      total_hours (int): hours to cover
+      shift_hours ([int]): lengths of shift to consider, those not dividing
+        ``total_hours`` are skipped
+      start_hours ([int]): start hours to consider, all by default
+      min_rest (int): hours off required between two shifts
+      first_hour (bool): whether the first hour of each shift counts extra
+      top (int): number of schedules returned
+      fares (:obj:`~honorary_gui.engine.FareSchedule`): defaults to
+        :func:`~honorary_gui.engine.default_fares`
+      table (:obj:`~honorary_gui.engine.BusinessDayTable`): defaults to
+        :func:`~honorary_gui.engine.default_table`
+
+    Returns:
+      :obj:`pandas.DataFrame`: cheapest feasible schedules first, with
+      ``days`` (list of dates), ``start_hour``, ``shift_hours``,
+      ``n_shifts`` and ``honorary``, empty if none is feasible
+    """
+    first_day = engine.to_seconds([start])[0] // 86400
+    start_hours = np.arange(24) if start_hours is None else \
+        np.asarray(start_hours, dtype=np.int64)
+    days = np.arange(n_days)
+    # Every shift of the window: day x start hour x length
+    lengths = [length for length in shift_hours
+               if total_hours % length == 0 and
+               total_hours // length <= n_days]
+    shift_start = (first_day + days[:, None]) * 86400 + \
+        start_hours[None, :] * 3600
+    candidates = []
+    for length in lengths:
+        priced = engine.price_missions(
+            shift_start.ravel().astype('datetime64[s]'),
+            (shift_start.ravel() + length * 3600).astype('datetime64[s]'),
+            first_hour, fares=fares, table=table)
+        cents = priced.cents.reshape(shift_start.shape)
+        n_shifts = total_hours // length
+        choices = np.array(list(combinations(days, n_shifts)),
+                           dtype=np.int64).reshape(-1, n_shifts)
+        # Shifts share their start hour, the shortest rest follows the
+        # closest days
+        gaps = np.diff(choices, axis=1).min(axis=1) if n_shifts > 1 else \
+            np.full(choices.shape[0], n_days)
+        feasible = gaps * 24 - length >= min_rest
+        choices = choices[feasible]
+        cost = cents[choices].sum(axis=1)
+        candidates.append((length, choices, cost))
+    rows = []
+    if candidates:
+        n_hours = len(start_hours)
+        costs = np.concatenate([cost.ravel() for _, _, cost in candidates])
+        order = np.argsort(costs, kind='stable')[:top]
+        sizes = np.cumsum([0] + [cost.size for _, _, cost in candidates])
+        for position in order:
+            k = np.searchsorted(sizes, position, side='right') - 1
+            length, choices, cost = candidates[k]
+            choice, hour = divmod(position - sizes[k], n_hours)
+            rows.append({'days': [np.datetime64(int(first_day + d), 'D')
+                                  for d in choices[choice]],
+                         'start_hour': int(start_hours[hour]),
+                         'shift_hours': length,
+                         'n_shifts': choices.shape[1],
+                         'honorary': int(costs[position]) / 100})
+    _logger.debug("Costed %d schedules",
+                  sum(cost.size for _, _, cost in candidates))
+    return pd.DataFrame(rows, columns=['days', 'start_hour', 'shift_hours',
+                                       'n_shifts', 'honorary'])
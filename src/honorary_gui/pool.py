@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+Warm process pool sharing the compiled calendar and fares.
+
+Building the business day table takes a pandas holiday computation in
+every process. :class:`SharedTables` publishes the compiled table and the
+fare arrays once in a :mod:`multiprocessing.shared_memory` block; the
+workers of :class:`PricingPool` attach to it and wrap the block in numpy
+arrays without copying, so that a new worker costs neither the calendar
+computation nor its memory:
+
+    with PricingPool(processes=4) as pool:
+        priced = pool.price(start_dates, end_dates)
+"""
+
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, resource_tracker, shared_memory
+
+import numpy as np
+
+from honorary_gui import engine
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+ALIGNMENT = 64
+CHUNK_SIZE = 100000
+# Seconds warm_up waits for all the workers to start
+START_TIMEOUT = 60
+
+# Held while resource_tracker.register is patched, see attach
+_register_lock = threading.Lock()
+
+# Tables of the current worker process, see _attach
+_worker = {}
+
+
+class SharedTables(object):
+    """Business day table and fares published in shared memory
+
+    Args:
+      table (:obj:`~honorary_gui.engine.BusinessDayTable`): defaults to
+        :func:`~honorary_gui.engine.default_table`
+      fares (:obj:`~honorary_gui.engine.FareSchedule`): defaults to
+        :func:`~honorary_gui.engine.default_fares`
+
+    Attributes:
+      descriptor (dict): picklable description of the block, enough for
+        :func:`attach` to map the arrays in another process
+      table, fares: the published table and fares, in this process
+    """
+
+    def __init__(self, table=None, fares=None):
+        table = table if table is not None else engine.default_table()
+        fares = fares if fares is not None else engine.default_fares()
+        self.table = table
+        self.fares = fares
+        arrays = {'day_type': table.day_type,
+                  'cumulative': table.cumulative,
+                  'subsequent': fares.subsequent,
+                  'first': fares.first}
+        layout = {}
+        size = 0
+        for key, array in arrays.items():
+            layout[key] = (size, array.shape, array.dtype.str)
+            size += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        for key, array in arrays.items():
+            _view(self.shm, layout[key])[...] = array
+        self.descriptor = {'name': self.shm.name, 'origin': table.origin,
+                           'layout': layout}
+
+    @property
+    def nbytes(self):
+        return self.shm.size
+
+    def close(self):
+        """Release and destroy the block, once no worker uses it"""
+        self.shm.close()
+        self.shm.unlink()
+
+
+def _view(shm, spec):
+    offset, shape, dtype = spec
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf,
+                      offset=offset)
+
+
+def attach(descriptor):
+    """Map shared tables published by :class:`SharedTables`
+
+    Returns:
+      tuple: the shared memory block, which must be kept alive while the
+      tables are used, the :obj:`~honorary_gui.engine.BusinessDayTable` and
+      the :obj:`~honorary_gui.engine.FareSchedule`
+    """
+    if sys.version_info >= (3, 13):
+        shm = shared_memory.SharedMemory(name=descriptor['name'],
+                                         track=False)
+    else:
+        # Before Python 3.13 attaching registers the block for destruction
+        # when this process exits, only the publisher may destroy it
+        with _register_lock:
+            register = resource_tracker.register
+            resource_tracker.register = lambda name, rtype: None
+            try:
+                shm = shared_memory.SharedMemory(name=descriptor['name'])
+            finally:
+                resource_tracker.register = register
+    layout = descriptor['layout']
+    arrays = {key: _view(shm, spec) for key, spec in layout.items()}
+    for array in arrays.values():
+        array.flags.writeable = False
+    table = engine.BusinessDayTable.from_arrays(
+        arrays['day_type'], descriptor['origin'], arrays['cumulative'])
+    fares = engine.FareSchedule.from_cents(arrays['subsequent'],
+                                           arrays['first'])
+    return shm, table, fares
+
+
+def _attach(descriptor, started=None):
+    """Initializer of the pool workers"""
+    _worker['started'] = started
+    _worker['shm'], _worker['table'], _worker['fares'] = attach(descriptor)
+    # Compile the kernel before the first task
+    engine.price_missions([_worker['table'].start],
+                          [_worker['table'].start],
+                          table=_worker['table'], fares=_worker['fares'])
+
+
+def _ready():
+    # A worker waiting here takes no other task: the barrier is passed once
+    # every worker holds one
+    _worker['started'].wait(START_TIMEOUT)
+    return os.getpid()
+
+
+def _price_chunk(start, end, first_hour, backend):
+    priced = engine.price_missions(start, end, first_hour,
+                                   table=_worker['table'],
+                                   fares=_worker['fares'], backend=backend)
+    return priced.hours, priced.cents
+
+
+class PricingPool(object):
+    """Long-lived worker processes pricing over shared tables
+
+    Args:
+      processes (int): number of workers, defaults to the number of CPUs
+      tables (:obj:`SharedTables`): published tables, created from the
+        default table and fares when not given, and then destroyed by
+        :meth:`close`
+      mp_context: multiprocessing context, ``spawn`` by default so that
+        workers do not inherit the memory of the parent
+      backend (str): kernel backend of the workers
+      warm (bool): start all the workers right away rather than on the
+        first batches
+    """
+
+    def __init__(self, processes=None, tables=None, mp_context=None,
+                 backend=None, warm=True):
+        self._own_tables = tables is None
+        self.tables = tables if tables is not None else SharedTables()
+        self.backend = backend
+        mp_context = mp_context if mp_context is not None else \
+            get_context('spawn')
+        self.processes = processes if processes is not None else \
+            os.cpu_count() or 1
+        self._started = mp_context.Barrier(self.processes)
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.processes, mp_context=mp_context,
+            initializer=_attach,
+            initargs=(self.tables.descriptor, self._started))
+        if warm:
+            self.warm_up()
+
+    def warm_up(self):
+        """Start every worker and wait until they are ready
+
+        Returns:
+          [int]: process ids of the workers
+        """
+        futures = [self.executor.submit(_ready)
+                   for _ in range(self.processes)]
+        return sorted(set(future.result() for future in futures))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def price(self, start_dates, end_dates, first_hour=True,
+              chunk_size=CHUNK_SIZE):
+        """Price a batch across the workers
+
+        Args:
+          start_dates: start of each mission, see
+            :func:`~honorary_gui.engine.price_missions`
+          end_dates: end of each mission
+          first_hour (bool or sequence of bool): whether the first hour
+            counts extra
+          chunk_size (int): missions sent to a worker at once
+
+        Returns:
+          :obj:`~honorary_gui.engine.PricedMissions`
+        """
+        # Dates are parsed here, numpy arrays are cheap to send
+        start = engine.to_seconds(start_dates).astype('datetime64[s]')
+        end = engine.to_seconds(end_dates).astype('datetime64[s]')
+        first_hour = np.broadcast_to(np.asarray(first_hour, dtype=np.bool_),
+                                     start.shape)
+        futures = [self.executor.submit(
+            _price_chunk, start[i:i + chunk_size], end[i:i + chunk_size],
+            first_hour[i:i + chunk_size], self.backend)
+            for i in range(0, max(start.shape[0], 1), chunk_size)]
+        results = [future.result() for future in futures]
+        hours = np.concatenate([hours for hours, _ in results])
+        cents = np.concatenate([cents for _, cents in results])
+        return engine.PricedMissions(start, end, hours, cents, first_hour,
+                                     self.tables.fares, self.tables.table)
+
+    def close(self):
+        """Stop the workers and destroy tables created by the pool"""
+        self.executor.shutdown(wait=True)
+        if self._own_tables:
+            self.tables.close()
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Yearly cost of recurring rotas.
+
+A rota repeats the same shift on some weekdays, e.g. nights from Monday to
+Thursday, 21:00 to 06:00:
+
+    rota = Rota(['Mon', 'Tue', 'Wed', 'Thu'], '21:00', '06:00')
+    forecast(rota, '2021-01-01', '2021-12-31')
+
+An occurrence only costs more or less than on an ordinary week when a day
+it touches is a holiday, or a weekend day declared worked. :func:`forecast`
+therefore prices one occurrence per weekday on an ordinary week, counts the
+occurrences of every weekday arithmetically, and prices separately the few
+occurrences touching an exception day. A year costs about as much as a
+week.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from honorary_gui import engine, kernel
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+# Day number of Monday 1970-01-05, day 0 was a Thursday
+_MONDAY = 4
+
+
+def weekday(days):
+    """Weekday of day numbers, 0 for Monday"""
+    return (np.asarray(days) + 3) % 7
+
+
+def _minutes(clock):
+    hours, _, minutes = str(clock).partition(':')
+    return int(hours) * 60 + int(minutes or 0)
+
+
+class Rota(object):
+    """Shift repeated on some weekdays
+
+    Args:
+      weekdays ([str or int]): days the shift starts on, names of
+        :data:`WEEKDAYS` or numbers from 0 for Monday
+      start (str): start time, 'HH:MM'
+      end (str): end time, 'HH:MM', on the next day when not after
+        ``start``
+      first_hour (bool): whether the first hour of each shift counts extra
+      name (str): label of the rota
+    """
+
+    def __init__(self, weekdays, start, end, first_hour=True, name=None):
+        self.weekdays = sorted(set(
+            WEEKDAYS.index(day) if isinstance(day, str) else int(day)
+            for day in weekdays))
+        self.start_minute = _minutes(start)
+        minutes = _minutes(end) - self.start_minute
+        self.duration = (minutes if minutes > 0 else minutes + 24 * 60) * 60
+        self.first_hour = first_hour
+        self.name = name if name is not None else '{} {}-{}'.format(
+            '/'.join(WEEKDAYS[day] for day in self.weekdays), start, end)
+
+    def __repr__(self):
+        return 'Rota({!r})'.format(self.name)
+
+    @property
+    def n_hours(self):
+        return self.duration // 3600
+
+    @property
+    def span(self):
+        """Days a shift touches"""
+        start_hour = self.start_minute // 60
+        return max((start_hour + self.n_hours - 1) // 24 + 1, 1)
+
+    def occurrences(self, days):
+        """Start and end dates of the shifts starting on ``days``
+
+        Returns:
+          tuple: datetime64[s] arrays
+        """
+        start = np.asarray(days, dtype=np.int64) * 86400 + \
+            self.start_minute * 60
+        return (start.astype('datetime64[s]'),
+                (start + self.duration).astype('datetime64[s]'))
+
+
+def count_weekdays(first_day, last_day):
+    """Days of every weekday between two day numbers, both included
+
+    Returns:
+      :obj:`numpy.ndarray`: int64, 7 counts from Monday
+    """
+    first = first_day + (np.arange(7) - weekday(first_day)) % 7
+    return np.where(first <= last_day, (last_day - first) // 7 + 1, 0)
+
+
+def forecast(rota, start, end, fares=None, table=None):
+    """Cost of a rota over a period
+
+    Args:
+      rota (:obj:`Rota`)
+      start: first day shifts may start on
+      end: last day shifts may start on, included
+      fares (:obj:`~honorary_gui.engine.FareSchedule`): defaults to
+        :func:`~honorary_gui.engine.default_fares`
+      table (:obj:`~honorary_gui.engine.BusinessDayTable`): defaults to
+        :func:`~honorary_gui.engine.default_table`
+
+    Returns:
+      dict: ``occurrences``, ``exceptions`` (occurrences touching a
+      holiday), hours per class of
+      :data:`~honorary_gui.engine.CLASS_LABELS`, ``hours_worked`` and
+      ``honorary`` in euros
+    """
+    fares = fares if fares is not None else engine.default_fares()
+    table = table if table is not None else engine.default_table()
+    first_day = int(engine.to_seconds([start])[0] // 86400)
+    last_day = int(engine.to_seconds([end])[0] // 86400)
+    span = rota.span
+    table.check(np.array([first_day]), np.array([last_day + span - 1]))
+    weekdays = np.array(rota.weekdays, dtype=np.int64)
+
+    # One occurrence per weekday on an ordinary week, Monday to Sunday
+    ordinary = (weekday(_MONDAY + np.arange(7 + span)) >= 5) \
+        .astype(np.uint8)
+    start_hour = (_MONDAY + weekdays) * 24 + rota.start_minute // 60
+    n_hours = np.full(weekdays.shape, rota.n_hours, dtype=np.int64)
+    first_hour = np.full(weekdays.shape, rota.first_hour)
+    hours, cents = kernel.segment_and_price(
+        start_hour, n_hours, first_hour, ordinary, _MONDAY,
+        fares.subsequent, fares.first, backend='numpy')
+    counts = count_weekdays(first_day, last_day)[weekdays]
+    total_hours = counts @ hours
+    total_cents = int(counts @ cents)
+
+    # Occurrences touching a day not typed as on an ordinary week
+    days = np.arange(first_day, last_day + span)
+    actual = table.day_type[days - table.origin]
+    odd = days[actual != (weekday(days) >= 5)]
+    candidates = np.unique((odd[:, None] - np.arange(span)).ravel())
+    candidates = candidates[(candidates >= first_day)
+                            & (candidates <= last_day)
+                            & np.isin(weekday(candidates), weekdays)]
+    if candidates.shape[0]:
+        priced = engine.price_missions(*rota.occurrences(candidates),
+                                       first_hour=rota.first_hour,
+                                       fares=fares, table=table)
+        regular = np.searchsorted(weekdays, weekday(candidates))
+        total_hours = total_hours + priced.hours.sum(axis=0) \
+            - hours[regular].sum(axis=0)
+        total_cents += int(priced.cents.sum() - cents[regular].sum())
+
+    result = {'occurrences': int(counts.sum()),
+              'exceptions': int(candidates.shape[0])}
+    result.update(zip(engine.CLASS_LABELS, total_hours.tolist()))
+    result['hours_worked'] = int(total_hours.sum())
+    result['honorary'] = total_cents / 100
+    return result
+
+
+def forecast_rotas(rotas, start, end, **kwargs):
+    """:func:`forecast` of several rotas, one row each
+
+    Returns:
+      :obj:`pandas.DataFrame`: indexed by rota name
+    """
+    return pd.DataFrame([forecast(rota, start, end, **kwargs)
+                         for rota in rotas],
+                        index=[rota.name for rota in rotas])
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming rules depending on the earlier missions of a worker.
+
+Some pay rules cannot be decided mission by mission: overtime starts after
+35 hours in a week, the first hour premium may be paid a limited number of
+times a day. :class:`StreamingRules` reads the missions of every worker in
+time order, in chunks, and keeps only a few integers of state per worker
+and rule, never the history:
+
+    rules = StreamingRules([WeeklyOvertime(), DailyFirstHourCap()])
+    for chunk in chunks:
+        adjustments = rules.feed(chunk.worker, chunk.start_date,
+                                 chunk.end_date, chunk.first_hour)
+
+The state machine of a rule only counts, in a Python loop; what the counts
+are worth is priced afterwards on whole arrays. :func:`evaluate` spreads
+the workers over processes, their states being independent.
+
+Missions are split at the Monday 00:00 boundaries so that each piece
+belongs to one week.
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from honorary_gui import engine, kernel
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+OVERTIME_THRESHOLD = 35
+OVERTIME_PERCENT = 25
+FIRST_HOUR_PREMIUMS_PER_DAY = 1
+WEEK_HOURS = 7 * 24
+# 1970-01-01, day 0, was a Thursday
+_MONDAY_OFFSET = 3
+
+
+class WeeklyOvertime(object):
+    """Overtime supplement on the hours worked past a weekly threshold
+
+    The state of a worker is the current week and its hours so far.
+
+    Args:
+      threshold (int): hours of a week paid without supplement
+      percent (int): supplement on the subsequent hour fare of each
+        overtime hour, in percent
+    """
+
+    name = 'overtime'
+    quantity = 'overtime_hours'
+
+    def __init__(self, threshold=OVERTIME_THRESHOLD,
+                 percent=OVERTIME_PERCENT):
+        self.threshold = threshold
+        self.percent = percent
+
+    def start(self):
+        return (None, 0)
+
+    def step(self, state, week, day, n_hours, first_hour):
+        """New state and overtime hours, the last ones of the piece"""
+        current, hours = state
+        if week != current:
+            hours = 0
+        over = min(max(hours + n_hours - self.threshold, 0), n_hours)
+        return (week, hours + n_hours), over
+
+    def cents(self, start_hour, n_hours, quantity, premium, context):
+        """Supplement of ``quantity`` hours ending each piece"""
+        _, cents = kernel.segment_and_price(
+            start_hour + n_hours - quantity, quantity,
+            np.zeros(quantity.shape, dtype=np.bool_),
+            context.table.day_type, context.table.origin,
+            context.fares.subsequent, context.fares.first,
+            cumulative=context.table.cumulative)
+        return (cents * self.percent + 50) // 100
+
+
+class DailyFirstHourCap(object):
+    """Limit the first hour premiums paid to a worker in a day
+
+    The state of a worker is the current day and its premiums so far.
+
+    Args:
+      max_premiums (int): premiums paid per day at most
+    """
+
+    name = 'first_hour_cap'
+    quantity = 'premiums_capped'
+
+    def __init__(self, max_premiums=FIRST_HOUR_PREMIUMS_PER_DAY):
+        self.max_premiums = max_premiums
+
+    def start(self):
+        return (None, 0)
+
+    def step(self, state, week, day, n_hours, first_hour):
+        """New state and 1 if the premium of the piece is withdrawn"""
+        if not first_hour:
+            return state, 0
+        current, count = state
+        if day != current:
+            count = 0
+        count += 1
+        return (day, count), int(count > self.max_premiums)
+
+    def cents(self, start_hour, n_hours, quantity, premium, context):
+        return -premium * quantity
+
+
+def split_weeks(start_hour, n_hours):
+    """Pieces of missions within one Monday to Sunday week
+
+    Returns:
+      tuple: ``(mission, start_hour, n_hours, week)`` of every piece, the
+      pieces of a mission following each other
+    """
+    end_hour = start_hour + n_hours
+    shift = _MONDAY_OFFSET * 24
+    first_week = (start_hour + shift) // WEEK_HOURS
+    n_weeks = np.where(n_hours > 0,
+                       (end_hour - 1 + shift) // WEEK_HOURS - first_week + 1,
+                       1)
+    mission = np.repeat(np.arange(start_hour.shape[0]), n_weeks)
+    offsets = np.cumsum(n_weeks) - n_weeks
+    week = first_week[mission] + np.arange(mission.shape[0]) \
+        - offsets[mission]
+    lo = np.maximum(start_hour[mission], week * WEEK_HOURS - shift)
+    hi = np.minimum(end_hour[mission], (week + 1) * WEEK_HOURS - shift)
+    return mission, lo, hi - lo, week
+
+
+class StreamingRules(object):
+    """Apply stateful rules to the time-ordered missions of every worker
+
+    Args:
+      rules (list): rule objects, e.g. :class:`WeeklyOvertime` and
+        :class:`DailyFirstHourCap`
+      fares (:obj:`~honorary_gui.engine.FareSchedule`): defaults to
+        :func:`~honorary_gui.engine.default_fares`
+      table (:obj:`~honorary_gui.engine.BusinessDayTable`): defaults to
+        :func:`~honorary_gui.engine.default_table`
+
+    Attributes:
+      states (dict): state of every rule, per worker
+    """
+
+    def __init__(self, rules, fares=None, table=None):
+        self.rules = list(rules)
+        self.fares = fares if fares is not None else engine.default_fares()
+        self.table = table if table is not None else engine.default_table()
+        self.states = {}
+        self._last = {}
+
+    def feed(self, workers, start_dates, end_dates, first_hour=True):
+        """Apply the rules to the next missions
+
+        The missions of a worker must come in start order, within and
+        across calls; workers may interleave.
+
+        Args:
+          workers: worker of each mission
+          start_dates: start of each mission, see
+            :func:`~honorary_gui.engine.price_missions`
+          end_dates: end of each mission
+          first_hour (bool or sequence of bool): whether the first hour
+            counts extra
+
+        Returns:
+          :obj:`pandas.DataFrame`: per mission, the quantity and the cents
+          of every rule and the total ``adjustment`` in cents
+        """
+        start_hour, n_hours = engine.mission_hours(
+            engine.to_seconds(start_dates), engine.to_seconds(end_dates),
+            self.table)
+        first_hour = np.broadcast_to(np.asarray(first_hour, dtype=np.bool_),
+                                     start_hour.shape)
+        workers = np.broadcast_to(np.asarray(workers, dtype=object),
+                                  start_hour.shape)
+        premium = np.where(first_hour & (n_hours > 0), (
+            self.fares.first - self.fares.subsequent)[kernel.first_hour_class(
+                start_hour, self.table.day_type, self.table.origin)], 0)
+        # Checked before any state changes, so that a rejected call can be
+        # fixed and fed again
+        last = self._check_order(workers, start_hour)
+        mission, piece_start, piece_hours, week = split_weeks(start_hour,
+                                                              n_hours)
+        first_piece = np.ones(mission.shape[0], dtype=np.bool_)
+        first_piece[1:] = mission[1:] != mission[:-1]
+        quantities = self._run(workers, mission, piece_hours, week,
+                               piece_start // 24,
+                               first_piece & first_hour[mission])
+        self._last.update(last)
+
+        result = pd.DataFrame(index=np.arange(start_hour.shape[0]))
+        adjustment = np.zeros(start_hour.shape[0], dtype=np.int64)
+        for rule, quantity in zip(self.rules, quantities):
+            cents = rule.cents(piece_start, piece_hours, quantity,
+                               np.where(first_piece, premium[mission], 0),
+                               self)
+            result[rule.quantity] = np.bincount(
+                mission, quantity, start_hour.shape[0]).astype(np.int64)
+            result[rule.name] = np.bincount(
+                mission, cents, start_hour.shape[0]).astype(np.int64)
+            adjustment += result[rule.name].to_numpy()
+        result['adjustment'] = adjustment
+        return result
+
+    def _check_order(self, workers, start_hour):
+        """Last start of every worker of the missions, which must follow
+        the missions fed before in start order"""
+        codes, uniques = pd.factorize(workers)
+        if codes.shape[0] == 0:
+            return {}
+        order = np.argsort(codes, kind='stable')
+        codes, starts = codes[order], start_hour[order]
+        later = (codes[1:] != codes[:-1]) | (starts[1:] >= starts[:-1])
+        ends = np.flatnonzero(np.append(codes[1:] != codes[:-1], True))
+        firsts = np.append(0, ends[:-1] + 1)
+        last = {}
+        for first, end in zip(firsts.tolist(), ends.tolist()):
+            worker = uniques[codes[first]]
+            if not later[first:end].all() or \
+                    int(starts[first]) < self._last.get(worker, starts[first]):
+                raise ValueError("Missions of worker " + str(worker)
+                                 + " are not in start order")
+            last[worker] = int(starts[end])
+        return last
+
+    def _run(self, workers, mission, n_hours, week, day, first_hour):
+        """State machines of the rules over the pieces, in order"""
+        rules = self.rules
+        states = self.states
+        quantities = [[0] * mission.shape[0] for _ in rules]
+        for i, (m, n, w, d, f) in enumerate(zip(
+                mission.tolist(), n_hours.tolist(), week.tolist(),
+                day.tolist(), first_hour.tolist())):
+            worker = workers[m]
+            state = states.get(worker)
+            if state is None:
+                state = states[worker] = [rule.start() for rule in rules]
+            for k, rule in enumerate(rules):
+                state[k], quantities[k][i] = rule.step(state[k], w, d, n, f)
+        return [np.array(q, dtype=np.int64) for q in quantities]
+
+
+def _evaluate_partition(rules, frame, kwargs):
+    evaluator = StreamingRules(rules, **kwargs)
+    frame = frame.sort_values('start_date', kind='stable')
+    result = evaluator.feed(frame['worker'], frame['start_date'],
+                            frame['end_date'], frame['first_hour'])
+    result.index = frame.index
+    return result
+
+
+def evaluate(missions, rules, processes=1, **kwargs):
+    """Apply rules to missions, workers spread over processes
+
+    Args:
+      missions (:obj:`pandas.DataFrame`): ``worker``, ``start_date``,
+        ``end_date`` and optionally ``first_hour`` columns, in any order
+      rules (list): see :class:`StreamingRules`
+      processes (int): worker processes, the rules run in this process
+        when 1
+      **kwargs: ``fares`` and ``table`` of :class:`StreamingRules`
+
+    Returns:
+      :obj:`pandas.DataFrame`: see :meth:`StreamingRules.feed`, indexed
+      like ``missions``
+    """
+    if 'first_hour' not in missions.columns:
+        missions = missions.assign(first_hour=True)
+    if processes <= 1:
+        return _evaluate_partition(rules, missions, kwargs) \
+            .reindex(missions.index)
+    codes = pd.factorize(missions['worker'])[0] % processes
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(_evaluate_partition, rules,
+                                   missions[codes == p], kwargs)
+                   for p in range(processes)]
+        results = [future.result() for future in futures]
+    return pd.concat(results).reindex(missions.index)
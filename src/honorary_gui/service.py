@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+Local HTTP pricing service.
+
+A small asyncio HTTP/1.1 server around the pricing engine, with keep-alive
+connections and two endpoints:
+
+ * ``POST /price`` with ``{"start_date": ..., "end_date": ...,
+   "first_hour": true}`` prices one mission
+ * ``POST /price/bulk`` with ``{"missions": [...]}`` prices a list of
+   missions in one call
+
+Single missions arriving within a few milliseconds of each other are
+coalesced by :class:`MicroBatcher` into one vectorized engine call. Start
+the service with:
+
+    honorary_service --port 8642
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import re
+import sys
+
+from honorary_gui import __version__, engine
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+BATCH_WINDOW = 0.002
+MAX_BATCH = 10000
+MAX_BODY = 64 * 2 ** 20
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 413: 'Payload Too Large',
+           431: 'Request Header Fields Too Large',
+           500: 'Internal Server Error'}
+
+
+def price_records(missions):
+    """Price mission dicts and describe each result as a dict
+
+    Args:
+      missions ([dict]): ``start_date``, ``end_date`` and optionally
+        ``first_hour`` of each mission
+
+    Returns:
+      [dict]: one result per mission
+    """
+    try:
+        priced = engine.price_missions(
+            [m['start_date'] for m in missions],
+            [m['end_date'] for m in missions],
+            [engine.check_first_hour(m.get('first_hour', True))
+             for m in missions])
+    except KeyError as error:
+        raise ValueError("Missing field: " + str(error))
+    start = priced.start.astype(str)
+    end = priced.end.astype(str)
+    return [{'start_date': start[i].replace('T', ' '),
+             'end_date': end[i].replace('T', ' '),
+             'hours': dict(zip(engine.CLASS_LABELS,
+                               priced.hours[i].tolist())),
+             'hours_worked': int(priced.hours[i].sum()),
+             'honorary': int(priced.cents[i]) / 100}
+            for i in range(len(priced))]
+
+
+class MicroBatcher(object):
+    """Coalesce concurrent single-mission requests into batches
+
+    Args:
+      price (callable): prices a list of missions, see
+        :func:`price_records`
+      window (float): seconds to wait for more missions after the first one
+      max_batch (int): flush as soon as this many missions are waiting
+      executor (:obj:`concurrent.futures.Executor`): runs ``price``,
+        defaults to the loop's default executor
+    """
+
+    def __init__(self, price=price_records, window=BATCH_WINDOW,
+                 max_batch=MAX_BATCH, executor=None):
+        self.price = price
+        self.window = window
+        self.max_batch = max_batch
+        self.executor = executor
+        self.pending = []
+        self._timer = None
+        self._tasks = set()
+        self.batches = 0
+
+    async def submit(self, mission):
+        """Price one mission as part of the next batch"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((mission, future))
+        if len(self.pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self.pending = self.pending, []
+        if batch:
+            self.batches += 1
+            task = asyncio.ensure_future(self._run(batch))
+            # Keep a reference until the batch is done
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        loop = asyncio.get_running_loop()
+        missions = [mission for mission, _ in batch]
+        try:
+            results = await loop.run_in_executor(self.executor, self.price,
+                                                 missions)
+        except (ValueError, TypeError):
+            # One invalid mission must not fail the others of its batch
+            results = await loop.run_in_executor(
+                self.executor, self._price_one_by_one, missions)
+        except Exception as error:
+            results = [error] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _price_one_by_one(self, missions):
+        results = []
+        for mission in missions:
+            try:
+                results.append(self.price([mission])[0])
+            except Exception as error:
+                results.append(error)
+        return results
+
+
+class PricingService(object):
+    """HTTP front end of the pricing engine
+
+    Args:
+      batcher (:obj:`MicroBatcher`): coalesces single missions
+      executor (:obj:`concurrent.futures.Executor`): runs bulk requests,
+        defaults to the loop's default executor
+    """
+
+    def __init__(self, batcher=None, executor=None):
+        self.batcher = batcher if batcher is not None else \
+            MicroBatcher(executor=executor)
+        self.executor = executor
+        self.requests = 0
+
+    async def start(self, host='127.0.0.1', port=8642):
+        """Start listening, returns the :obj:`asyncio.Server`"""
+        loop = asyncio.get_running_loop()
+        # Build the calendar before accepting requests
+        await loop.run_in_executor(self.executor, engine.warm_up)
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def handle(self, reader, writer):
+        """Serve the requests of one connection until it is closed"""
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, version, headers, body = request
+                status, payload = await self.dispatch(method, path, body)
+                keep_alive = self._keep_alive(version, headers)
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except _BadRequest as error:
+            self._write_response(writer, error.status,
+                                 {'error': str(error)}, False)
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, path, body):
+        """Status and JSON payload answering a request"""
+        self.requests += 1
+        if path not in ('/price', '/price/bulk'):
+            return 404, {'error': 'Unknown path ' + path}
+        if method != 'POST':
+            return 405, {'error': 'Use POST'}
+        try:
+            data = json.loads(body.decode('utf-8'))
+            if path == '/price':
+                if not isinstance(data, dict):
+                    raise ValueError("Expected a mission object")
+                return 200, await self.batcher.submit(data)
+            missions = data.get('missions') if isinstance(data, dict) \
+                else None
+            if not isinstance(missions, list):
+                raise ValueError("Expected a list of missions")
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(self.executor,
+                                                 price_records, missions)
+            return 200, {'results': results}
+        except (ValueError, TypeError, AttributeError) as error:
+            return 400, {'error': str(error)}
+        except Exception as error:
+            _logger.exception("Pricing failed")
+            return 500, {'error': str(error)}
+
+    @staticmethod
+    async def _readline(reader, status):
+        try:
+            return await reader.readline()
+        except (ValueError, asyncio.LimitOverrunError):
+            # Line longer than the limit of the reader
+            raise _BadRequest(status, "Line too long")
+
+    @classmethod
+    async def _read_request(cls, reader):
+        line = await cls._readline(reader, 400)
+        if not line:
+            return None
+        try:
+            method, path, version = line.decode('latin-1').split()
+        except ValueError:
+            raise _BadRequest(400, "Malformed request line")
+        headers = {}
+        while True:
+            line = await cls._readline(reader, 431)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        length = headers.get('content-length', '') or '0'
+        # Not str.isdigit, which accepts digits int() does not
+        if not re.fullmatch('[0-9]+', length):
+            raise _BadRequest(400, "Invalid Content-Length")
+        length = int(length)
+        if length > MAX_BODY:
+            raise _BadRequest(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b''
+        return method, path, version, headers, body
+
+    @staticmethod
+    def _keep_alive(version, headers):
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+    @staticmethod
+    def _write_response(writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode('utf-8')
+        head = ('HTTP/1.1 {} {}\r\n'
+                'Content-Type: application/json\r\n'
+                'Content-Length: {}\r\n'
+                'Connection: {}\r\n\r\n').format(
+            status, REASONS.get(status, ''), len(body),
+            'keep-alive' if keep_alive else 'close')
+        writer.write(head.encode('latin-1') + body)
+
+
+class _BadRequest(Exception):
+
+    def __init__(self, status, message):
+        Exception.__init__(self, message)
+        self.status = status
+
+
+async def serve(host='127.0.0.1', port=8642, window=BATCH_WINDOW):
+    """Run the service until cancelled"""
+    service = PricingService(batcher=MicroBatcher(window=window))
+    server = await service.start(host, port)
+    _logger.info("Pricing service listening on %s:%d", host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def parse_args(args):
+    """Parse command line parameters
+
+    Args:
+      args ([str]): command line parameters as list of strings
+
+    Returns:
+      :obj:`argparse.Namespace`: command line parameters namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Local HTTP pricing service")
+    parser.add_argument(
+        "--version",
+        action="version",
+        version="honorary_gui {ver}".format(ver=__version__))
+    parser.add_argument(
+        "--host",
+        help="interface to listen on (default: 127.0.0.1)",
+        default='127.0.0.1')
+    parser.add_argument(
+        "--port",
+        help="port to listen on (default: 8642)",
+        type=int,
+        default=8642)
+    parser.add_argument(
+        "--window",
+        help="milliseconds to coalesce single missions (default: 2)",
+        type=float,
+        default=BATCH_WINDOW * 1000)
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        dest="loglevel",
+        help="set loglevel to INFO",
+        action="store_const",
+        const=logging.INFO)
+    return parser.parse_args(args)
+
+
+def main(args):
+    """Main entry point allowing external calls
+
+    Args:
+      args ([str]): command line parameter list
+    """
+    args = parse_args(args)
+    logging.basicConfig(level=args.loglevel, stream=sys.stdout)
+    try:
+        asyncio.run(serve(args.host, args.port, args.window / 1000))
+    except KeyboardInterrupt:
+        pass
+
+
+def run():
+    """Entry point for console_scripts
+    """
+    main(sys.argv[1:])
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+Immutable, hot-reloadable engine snapshots.
+
+An :class:`EngineSnapshot` bundles a compiled business day table and a fare
+schedule whose arrays are read-only. A :class:`SnapshotManager` builds one
+from a JSON configuration file and replaces it with a new snapshot when the
+file changes. Readers take ``manager.current`` once per batch without any
+lock: the swap is a single attribute assignment, and a batch started on a
+snapshot finishes on it even if a new one is published meanwhile.
+
+Configuration file, every section is optional::
+
+    {
+      "version": "2021-01",
+      "fares": {
+        "normal": {"day_first_hour_fare": "42", ...},
+        "holiday": {"day_first_hour_fare": "49.50", ...}
+      },
+      "calendar": {
+        "start": "2000-01-01",
+        "end": "2050-12-31",
+        "holidays": [
+          {"name": "New Years Day", "month": 1, "day": 1},
+          {"name": "Easter Monday", "easter_offset": 1}
+        ],
+        "extra_days": ["2021-05-24"]
+      }
+    }
+
+Without ``holidays`` the rules of
+:class:`~honorary_gui.engine.FrenchBusinessCalendar` apply.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+
+import numpy as np
+from pandas.tseries.holiday import AbstractHolidayCalendar, Holiday
+from pandas.tseries.offsets import Day, Easter
+
+from honorary_gui import engine
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+POLL_SECONDS = 2.0
+
+
+def _holiday(rule):
+    """pandas Holiday of a configuration rule"""
+    if 'easter_offset' in rule:
+        return Holiday(rule['name'], month=1, day=1,
+                       offset=[Easter(), Day(int(rule['easter_offset']))])
+    return Holiday(rule['name'], month=int(rule['month']),
+                   day=int(rule['day']))
+
+
+def build_calendar(rules, name='ConfiguredCalendar'):
+    """Holiday calendar class from configuration rules
+
+    Args:
+      rules ([dict]): ``name`` and either ``month`` and ``day`` or
+        ``easter_offset`` (days after Easter Sunday) of every holiday
+
+    Returns:
+      :obj:`AbstractHolidayCalendar`
+    """
+    calendar = type(name, (AbstractHolidayCalendar,),
+                    {'rules': [_holiday(rule) for rule in rules]})
+    return calendar()
+
+
+def _freeze(array):
+    array = np.array(array)
+    array.flags.writeable = False
+    return array
+
+
+class EngineSnapshot(object):
+    """Compiled calendar and fares, never modified once built
+
+    Args:
+      table (:obj:`~honorary_gui.engine.BusinessDayTable`)
+      fares (:obj:`~honorary_gui.engine.FareSchedule`)
+      version (str): label of the configuration
+    """
+
+    __slots__ = ('table', 'fares', 'version', 'digest')
+
+    def __init__(self, table, fares, version=None, digest=None):
+        table = engine.BusinessDayTable.from_arrays(
+            _freeze(table.day_type), table.origin, _freeze(table.cumulative))
+        fares = engine.FareSchedule.from_cents(_freeze(fares.subsequent),
+                                               _freeze(fares.first))
+        object.__setattr__(self, 'table', table)
+        object.__setattr__(self, 'fares', fares)
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'digest', digest)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Engine snapshots are immutable")
+
+    def __repr__(self):
+        return 'EngineSnapshot(version={!r})'.format(self.version)
+
+    @classmethod
+    def from_config(cls, config, digest=None):
+        """Compile a snapshot from a configuration dict"""
+        if not isinstance(config, dict):
+            raise ValueError("The configuration must be a JSON object")
+        fares = _section(config, 'fares')
+        calendar = _section(config, 'calendar')
+        rules = calendar.get('holidays')
+        table = engine.BusinessDayTable(
+            calendar=build_calendar(rules) if rules is not None else None,
+            start=calendar.get('start', engine.TABLE_START),
+            end=calendar.get('end', engine.TABLE_END))
+        extra_days = calendar.get('extra_days', [])
+        if extra_days:
+            day = engine.to_seconds(extra_days) // 86400 - table.origin
+            day = day[(day >= 0) & (day < len(table))]
+            table.day_type[day] = engine.HOLIDAY
+            table = engine.BusinessDayTable.from_arrays(table.day_type,
+                                                        table.origin)
+        return cls(table,
+                   engine.FareSchedule(fares.get('normal', engine.NORMAL_DICT),
+                                       fares.get('holiday',
+                                                 engine.HOLIDAY_DICT)),
+                   version=config.get('version'), digest=digest)
+
+    @classmethod
+    def from_file(cls, path):
+        """Compile a snapshot from a JSON configuration file"""
+        with open(path, 'rb') as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+        return cls.from_config(json.loads(content.decode('utf-8')),
+                               digest=digest)
+
+    def price(self, start_dates, end_dates, first_hour=True, backend=None):
+        """Price a batch on this snapshot, see
+        :func:`~honorary_gui.engine.price_missions`"""
+        return engine.price_missions(start_dates, end_dates, first_hour,
+                                     fares=self.fares, table=self.table,
+                                     backend=backend)
+
+
+def _section(config, name):
+    section = config.get(name, {})
+    if not isinstance(section, dict):
+        raise ValueError("Section {} must be a JSON object".format(name))
+    return section
+
+
+class SnapshotManager(object):
+    """Publish the snapshot of a configuration file, reloading on change
+
+    Args:
+      path (str): JSON configuration file
+      poll_seconds (float): interval of :meth:`start` checks
+
+    Attributes:
+      current (:obj:`EngineSnapshot`): latest snapshot, read it once per
+        batch
+    """
+
+    def __init__(self, path, poll_seconds=POLL_SECONDS):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self.current = EngineSnapshot.from_file(path)
+        self.errors = 0
+        # Serializes reloads only, readers never take it
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def reload(self):
+        """Reload the configuration if its content changed
+
+        A configuration that fails to compile is logged and the current
+        snapshot kept.
+
+        Returns:
+          bool: whether a new snapshot was published
+        """
+        with self._reload_lock:
+            try:
+                with open(self.path, 'rb') as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+                if digest == self.current.digest:
+                    return False
+                snapshot = EngineSnapshot.from_file(self.path)
+            except (OSError, ValueError, KeyError, TypeError):
+                self.errors += 1
+                _logger.exception("Cannot reload %s, keeping version %s",
+                                  self.path, self.current.version)
+                return False
+            self.current = snapshot
+            _logger.info("Published %r", snapshot)
+            return True
+
+    def price(self, start_dates, end_dates, first_hour=True, backend=None):
+        """Price a batch on the current snapshot"""
+        return self.current.price(start_dates, end_dates, first_hour,
+                                  backend=backend)
+
+    def start(self):
+        """Check the configuration file every ``poll_seconds`` in a thread"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch,
+                                            name='honorary-snapshots',
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.reload()
+            except Exception:
+                # Keep watching, the next version of the file may be valid
+                self.errors += 1
+                _logger.exception("Unexpected error reloading %s", self.path)
+
@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent results store.
+
+Priced missions are kept in an SQLite database, one row per mission with its
+worker, dates, fare version, hours per class and honorary in cents. Rows are
+inserted in bulk within a transaction and indexed on worker, start date and
+fare version, so that payroll questions are index lookups rather than a new
+pricing run:
+
+    store = ResultsStore('results.sqlite')
+    priced = engine.price_missions(missions.start_date, missions.end_date)
+    store.add(priced, workers=missions.worker, fare_version='2021-01')
+    store.earnings(worker='w042', start='2020-03-01', end='2020-04-01')
+
+A mission belongs to the day, and month, on which it starts. Totals per
+worker and day and per worker and month are maintained by triggers as
+missions are added, amended or deleted, so that :meth:`ResultsStore.daily`
+and :meth:`ResultsStore.monthly` cost the same whatever the history.
+"""
+
+import contextlib
+import logging
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from honorary_gui import engine
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_VERSION = 'builtin'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS missions (
+    id INTEGER PRIMARY KEY,
+    worker TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    fare_version TEXT NOT NULL,
+    business_day INTEGER NOT NULL,
+    business_night INTEGER NOT NULL,
+    holiday_day INTEGER NOT NULL,
+    holiday_night INTEGER NOT NULL,
+    cents INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS missions_worker_start ON missions (worker, start);
+CREATE INDEX IF NOT EXISTS missions_start ON missions (start);
+CREATE INDEX IF NOT EXISTS missions_fare_version
+    ON missions (fare_version, start);
+"""
+
+RESULT_COLUMNS = ['worker', 'start', 'end', 'fare_version'] + \
+    engine.CLASS_LABELS + ['cents']
+TOTAL_COLUMNS = ['missions'] + engine.CLASS_LABELS + ['cents']
+
+# Aggregate table, period column and its expression from a mission row
+PERIODS = {'daily_totals': ('day', "date({}.start, 'unixepoch')"),
+           'monthly_totals': ('month',
+                              "strftime('%Y-%m', {}.start, 'unixepoch')")}
+# Aggregate tables and triggers, filled from the missions when created
+_AGGREGATES = list(PERIODS) + ['missions_insert', 'missions_delete',
+                               'missions_update']
+
+
+def _aggregate_schema():
+    """Aggregate tables and the triggers keeping them up to date"""
+    statements = []
+    for table, (period, _) in PERIODS.items():
+        statements.append(
+            'CREATE TABLE IF NOT EXISTS {} (worker TEXT NOT NULL, {} TEXT '
+            'NOT NULL, {}, PRIMARY KEY (worker, {}));'.format(
+                table, period, ', '.join(c + ' INTEGER NOT NULL'
+                                         for c in TOTAL_COLUMNS), period))
+
+    def add(row):
+        sql = []
+        for table, (period, expression) in PERIODS.items():
+            values = ['1'] + [row + '.' + c for c in TOTAL_COLUMNS[1:]]
+            sql.append(
+                'INSERT INTO {0} (worker, {1}, {2}) VALUES ({3}.worker, {4}, '
+                '{5}) ON CONFLICT (worker, {1}) DO UPDATE SET {6};'.format(
+                    table, period, ', '.join(TOTAL_COLUMNS), row,
+                    expression.format(row), ', '.join(values),
+                    ', '.join('{0} = {0} + excluded.{0}'.format(c)
+                              for c in TOTAL_COLUMNS)))
+        return ' '.join(sql)
+
+    def remove(row):
+        sql = []
+        for table, (period, expression) in PERIODS.items():
+            key = 'worker = {}.worker AND {} = {}'.format(
+                row, period, expression.format(row))
+            sql.append('UPDATE {} SET missions = missions - 1, {} '
+                       'WHERE {};'.format(
+                           table, ', '.join('{0} = {0} - {1}.{0}'.format(
+                               c, row) for c in TOTAL_COLUMNS[1:]), key))
+            sql.append('DELETE FROM {} WHERE {} AND missions = 0;'.format(
+                table, key))
+        return ' '.join(sql)
+
+    for event, body in (('INSERT', add('NEW')), ('DELETE', remove('OLD')),
+                        ('UPDATE', remove('OLD') + ' ' + add('NEW'))):
+        statements.append(
+            'CREATE TRIGGER IF NOT EXISTS missions_{} AFTER {} ON missions '
+            'BEGIN {} END;'.format(event.lower(), event, body))
+    return '\n'.join(statements)
+
+
+def _rebuild_totals():
+    """Statements recomputing the aggregate tables from the missions"""
+    statements = []
+    for table, (period, expression) in PERIODS.items():
+        statements.append('DELETE FROM {};'.format(table))
+        statements.append(
+            'INSERT INTO {} (worker, {}, {}) SELECT worker, {}, COUNT(*), '
+            '{} FROM missions GROUP BY 1, 2;'.format(
+                table, period, ', '.join(TOTAL_COLUMNS),
+                expression.format('missions'),
+                ', '.join('SUM({})'.format(c) for c in TOTAL_COLUMNS[1:])))
+    return '\n'.join(statements)
+
+
+def _seconds(date):
+    return int(engine.to_seconds([date])[0])
+
+
+class ResultsStore(object):
+    """SQLite database of priced missions
+
+    Args:
+      path (str): database file, in memory by default
+    """
+
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        # Writes of the threads sharing the connection, one at a time
+        self._lock = threading.Lock()
+        names = {name for name, in self.connection.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', "
+            "'trigger')")}
+        script = _SCHEMA + _aggregate_schema()
+        # Databases written before the aggregates get them filled in the
+        # same transaction the tables and triggers are created in
+        if not names.issuperset(_AGGREGATES):
+            script += _rebuild_totals()
+        self.connection.executescript('BEGIN;\n' + script + '\nCOMMIT;')
+
+    def close(self):
+        self.connection.close()
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """Write transaction holding the database write lock from its start,
+        so that no other connection writes in between its statements"""
+        with self._lock, self.connection:
+            self.connection.execute('BEGIN IMMEDIATE')
+            yield self.connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def __len__(self):
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM missions').fetchone()[0]
+
+    def add(self, priced, workers=None, fare_version=DEFAULT_VERSION):
+        """Insert priced missions in one transaction
+
+        Args:
+          priced (:obj:`~honorary_gui.engine.PricedMissions`): results
+          workers: worker of each mission, or one worker for all, stored as
+            text, ``''`` when not given
+          fare_version (str): label of the fares used, e.g. the
+            :attr:`~honorary_gui.snapshot.EngineSnapshot.version`
+
+        Returns:
+          [int]: ids of the new rows
+        """
+        n = len(priced)
+        workers = np.broadcast_to(
+            np.asarray('' if workers is None else workers).astype(str),
+            (n,))
+        rows = zip(workers.tolist(),
+                   priced.start.astype(np.int64).tolist(),
+                   priced.end.astype(np.int64).tolist(),
+                   [fare_version] * n,
+                   *(priced.hours[:, i].tolist()
+                     for i in range(len(engine.CLASS_LABELS))),
+                   priced.cents.tolist())
+        with self._transaction() as connection:
+            first = connection.execute(
+                'SELECT COALESCE(MAX(id), 0) + 1 FROM missions').fetchone()[0]
+            connection.executemany(
+                'INSERT INTO missions (' + ', '.join(RESULT_COLUMNS)
+                + ') VALUES (' + ', '.join('?' * len(RESULT_COLUMNS)) + ')',
+                rows)
+        _logger.debug("Stored %d missions", n)
+        return list(range(first, first + n))
+
+    def amend(self, ids, priced, workers=None, fare_version=None):
+        """Replace the results of stored missions in one transaction
+
+        Args:
+          ids ([int]): rows to amend
+          priced (:obj:`~honorary_gui.engine.PricedMissions`): new results,
+            one per id
+          workers: new worker of each mission, unchanged when not given
+          fare_version (str): new fare version, unchanged when not given
+
+        Raises:
+          ValueError: an id is not stored, nothing is amended
+        """
+        ids = [int(i) for i in ids]
+        if len(ids) != len(priced):
+            raise ValueError("As many ids as priced missions are required")
+        columns = ['start', 'end'] + engine.CLASS_LABELS + ['cents']
+        values = [priced.start.astype(np.int64).tolist(),
+                  priced.end.astype(np.int64).tolist()] + \
+            [priced.hours[:, i].tolist()
+             for i in range(len(engine.CLASS_LABELS))] + \
+            [priced.cents.tolist()]
+        if workers is not None:
+            columns.append('worker')
+            values.append(np.broadcast_to(
+                np.asarray(workers).astype(str), (len(ids),)).tolist())
+        if fare_version is not None:
+            columns.append('fare_version')
+            values.append([fare_version] * len(ids))
+        with self._transaction() as connection:
+            updated = connection.executemany(
+                'UPDATE missions SET ' + ', '.join(c + ' = ?'
+                                                   for c in columns)
+                + ' WHERE id = ?', zip(*values, ids)).rowcount
+            if updated != len(ids):
+                # Rolled back on leaving the transaction
+                raise ValueError("Unknown mission ids: " + ', '.join(
+                    str(i) for i in self._unknown(connection, ids)))
+
+    @staticmethod
+    def _unknown(connection, ids):
+        known = {i for i, in connection.execute(
+            'SELECT id FROM missions WHERE id IN ('
+            + ', '.join('?' * len(ids)) + ')', ids)}
+        return sorted(set(ids) - known)
+
+    def delete(self, ids):
+        """Remove stored missions in one transaction"""
+        with self._transaction() as connection:
+            connection.executemany('DELETE FROM missions WHERE id = ?',
+                                        ((int(i),) for i in ids))
+
+    def rebuild_totals(self):
+        """Recompute the aggregate tables from the missions
+
+        Done on opening a database written without the aggregate triggers.
+        """
+        with self._lock:
+            self.connection.executescript('BEGIN;\n' + _rebuild_totals()
+                                          + '\nCOMMIT;')
+
+    @staticmethod
+    def _where(worker=None, start=None, end=None, fare_version=None):
+        clauses, params = [], []
+        if worker is not None:
+            clauses.append('worker = ?')
+            params.append(str(worker))
+        if start is not None:
+            clauses.append('start >= ?')
+            params.append(_seconds(start))
+        if end is not None:
+            clauses.append('start < ?')
+            params.append(_seconds(end))
+        if fare_version is not None:
+            clauses.append('fare_version = ?')
+            params.append(fare_version)
+        where = ' WHERE ' + ' AND '.join(clauses) if clauses else ''
+        return where, params
+
+    def earnings(self, worker=None, start=None, end=None, fare_version=None):
+        """Totals of the missions starting in ``[start, end)``
+
+        Args:
+          worker (str): restrict to one worker
+          start: first date included, anything
+            :func:`~honorary_gui.engine.to_seconds` understands
+          end: first date excluded
+          fare_version (str): restrict to one fare version
+
+        Returns:
+          dict: ``missions``, hours per class, ``hours_worked`` and
+          ``honorary`` in euros
+        """
+        where, params = self._where(worker, start, end, fare_version)
+        row = self.connection.execute(
+            'SELECT COUNT(*), '
+            + ', '.join('COALESCE(SUM({}), 0)'.format(c)
+                        for c in engine.CLASS_LABELS + ['cents'])
+            + ' FROM missions' + where, params).fetchone()
+        totals = {'missions': row[0]}
+        totals.update(zip(engine.CLASS_LABELS, row[1:-1]))
+        totals['hours_worked'] = sum(row[1:-1])
+        totals['honorary'] = row[-1] / 100
+        return totals
+
+    def missions(self, worker=None, start=None, end=None, fare_version=None):
+        """Stored missions starting in ``[start, end)``, see :meth:`earnings`
+
+        Returns:
+          :obj:`pandas.DataFrame`: one row per mission, indexed by id
+        """
+        where, params = self._where(worker, start, end, fare_version)
+        frame = pd.read_sql_query(
+            'SELECT id, ' + ', '.join(RESULT_COLUMNS) + ' FROM missions'
+            + where + ' ORDER BY start, id', self.connection, params=params,
+            index_col='id')
+        for column in ('start', 'end'):
+            frame[column] = frame[column].to_numpy().astype('datetime64[s]')
+        frame['honorary'] = frame.pop('cents') / 100
+        return frame
+
+    def _totals(self, table, worker=None, first=None, last=None):
+        period = PERIODS[table][0]
+        clauses, params = [], []
+        if worker is not None:
+            clauses.append('worker = ?')
+            params.append(str(worker))
+        if first is not None:
+            clauses.append(period + ' >= ?')
+            params.append(first)
+        if last is not None:
+            clauses.append(period + ' <= ?')
+            params.append(last)
+        where = ' WHERE ' + ' AND '.join(clauses) if clauses else ''
+        frame = pd.read_sql_query(
+            'SELECT worker, ' + period + ', ' + ', '.join(TOTAL_COLUMNS)
+            + ' FROM ' + table + where + ' ORDER BY worker, ' + period,
+            self.connection, params=params)
+        frame['hours_worked'] = frame[engine.CLASS_LABELS].sum(axis=1)
+        frame['honorary'] = frame.pop('cents') / 100
+        return frame
+
+    def daily(self, worker=None, first=None, last=None):
+        """Totals per worker and day, read from the maintained aggregates
+
+        Args:
+          worker (str): restrict to one worker
+          first (str): first day included, 'YYYY-MM-DD'
+          last (str): last day included, 'YYYY-MM-DD'
+
+        Returns:
+          :obj:`pandas.DataFrame`: ``worker``, ``day``, ``missions``, hours
+          per class, ``hours_worked`` and ``honorary``
+        """
+        return self._totals('daily_totals', worker, first, last)
+
+    def monthly(self, worker=None, first=None, last=None):
+        """Totals per worker and month, read from the maintained aggregates
+
+        Args:
+          worker (str): restrict to one worker
+          first (str): first month included, 'YYYY-MM'
+          last (str): last month included, 'YYYY-MM'
+
+        Returns:
+          :obj:`pandas.DataFrame`: ``worker``, ``month``, ``missions``, hours
+          per class, ``hours_worked`` and ``honorary``
+        """
+        return self._totals('monthly_totals', worker, first, last)
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Background jobs for the Tk calculator.
+
+Tk widgets may only be touched from the thread running the main loop.
+:class:`TkWorker` runs calculations on an executor and polls their futures
+with ``widget.after``, so that completion callbacks run on the Tk thread
+while the window keeps processing events:
+
+    worker = TkWorker(root)
+    job = worker.submit(calculate_honorary, start, end,
+                        on_done=show_result, on_error=show_error)
+    ...
+    job.cancel()
+
+:class:`Debouncer` delays a callback until its trigger stops firing, e.g.
+to recalculate once the user stopped typing.
+"""
+
+import logging
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+POLL_MS = 50
+DEBOUNCE_MS = 250
+
+
+class Job(object):
+    """Calculation submitted to a :class:`TkWorker`
+
+    Attributes:
+      future (:obj:`concurrent.futures.Future`): the running calculation
+      cancelled (:obj:`threading.Event`): set by :meth:`cancel`, long
+        calculations can check it to stop early
+      progress: last value given to :meth:`set_progress`
+    """
+
+    def __init__(self, on_done=None, on_error=None, on_cancel=None,
+                 on_progress=None):
+        self.future = None
+        self.cancelled = threading.Event()
+        self.progress = None
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.on_progress = on_progress
+        self._reported = None
+
+    def set_progress(self, value):
+        """Report progress from the background thread
+
+        Raises:
+          CancelledError: if the job was cancelled, to stop the calculation
+        """
+        if self.cancelled.is_set():
+            raise CancelledError()
+        self.progress = value
+
+    def cancel(self):
+        """Cancel the job, its ``on_done`` callback will not be called
+
+        A calculation that already started runs to its end in the
+        background unless it checks :attr:`cancelled`.
+        """
+        self.cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+
+class TkWorker(object):
+    """Run calculations in the background, report back on the Tk thread
+
+    Args:
+      widget (:obj:`tkinter.Misc`): any widget, used for ``after`` polling
+      executor (:obj:`concurrent.futures.Executor`): defaults to a single
+        worker thread
+      poll_ms (int): polling interval in milliseconds
+    """
+
+    def __init__(self, widget, executor=None, poll_ms=POLL_MS):
+        self.widget = widget
+        self.executor = executor if executor is not None else \
+            ThreadPoolExecutor(max_workers=1,
+                               thread_name_prefix='honorary-worker')
+        self.poll_ms = poll_ms
+        self.jobs = []
+        self._polling = None
+
+    def submit(self, func, *args, **kwargs):
+        """Run ``func(*args, **kwargs)`` in the background
+
+        Keyword Args:
+          on_done (callable): called with the result on the Tk thread
+          on_error (callable): called with the exception on the Tk thread
+          on_cancel (callable): called without argument on the Tk thread
+            once a cancelled job is discarded
+          on_progress (callable): called on the Tk thread with the values
+            given to :meth:`Job.set_progress`
+          pass_job (bool): call ``func(job, *args, **kwargs)`` instead, for
+            calculations reporting progress
+
+        Returns:
+          :obj:`Job`: handle to cancel the calculation
+        """
+        job = Job(on_done=kwargs.pop('on_done', None),
+                  on_error=kwargs.pop('on_error', None),
+                  on_cancel=kwargs.pop('on_cancel', None),
+                  on_progress=kwargs.pop('on_progress', None))
+        if kwargs.pop('pass_job', False):
+            args = (job,) + args
+        job.future = self.executor.submit(func, *args, **kwargs)
+        self.jobs.append(job)
+        if self._polling is None:
+            self._polling = self.widget.after(self.poll_ms, self._poll)
+        return job
+
+    @property
+    def busy(self):
+        return any(not job.cancelled.is_set() for job in self.jobs)
+
+    def cancel_all(self):
+        for job in self.jobs:
+            job.cancel()
+
+    def shutdown(self):
+        """Cancel pending jobs and stop the executor without waiting"""
+        self.cancel_all()
+        if self._polling is not None:
+            self.widget.after_cancel(self._polling)
+            self._polling = None
+        self.executor.shutdown(wait=False)
+
+    def _poll(self):
+        pending = []
+        for job in self.jobs:
+            if job.future.done():
+                self._finish(job)
+            else:
+                self._report(job)
+                pending.append(job)
+        self.jobs = pending
+        self._polling = (self.widget.after(self.poll_ms, self._poll)
+                         if pending else None)
+
+    def _report(self, job):
+        progress = job.progress
+        if job.on_progress is not None and progress != job._reported \
+                and not job.cancelled.is_set():
+            job._reported = progress
+            job.on_progress(progress)
+
+    def _finish(self, job):
+        if job.cancelled.is_set():
+            if job.on_cancel is not None:
+                job.on_cancel()
+            return
+        try:
+            result = job.future.result()
+        except CancelledError:
+            return
+        except Exception as error:
+            _logger.debug("Background job failed", exc_info=True)
+            if job.on_error is None:
+                raise
+            job.on_error(error)
+            return
+        self._report(job)
+        if job.on_done is not None:
+            job.on_done(result)
+
+
+class Debouncer(object):
+    """Call ``func`` once calls to the debouncer stop for ``delay_ms``
+
+    Args:
+      widget (:obj:`tkinter.Misc`): any widget, used for ``after``
+      func (callable): called without argument on the Tk thread
+      delay_ms (int): quiet period in milliseconds
+    """
+
+    def __init__(self, widget, func, delay_ms=DEBOUNCE_MS):
+        self.widget = widget
+        self.func = func
+        self.delay_ms = delay_ms
+        self._pending = None
+
+    def __call__(self, *args):
+        """Restart the quiet period, accepts and ignores event arguments"""
+        self.cancel()
+        self._pending = self.widget.after(self.delay_ms, self._fire)
+
+    def cancel(self):
+        if self._pending is not None:
+            self.widget.after_cancel(self._pending)
+            self._pending = None
+
+    def _fire(self):
+        self._pending = None
+        self.func()
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Per-stage timers of the pricing engine.
+
+Timing is off by default. The engine wraps each of its stages in
+:func:`stage`, which does nothing but a global lookup while no timer is
+active. To collect timings:
+
+    >>> from honorary_gui import engine, timing
+    >>> with timing.StageTimer() as timer:
+    ...     priced = engine.price_missions(['2020-06-02 08:00:00'],
+    ...                                    ['2020-06-02 18:00:00'])
+    >>> sorted(timer.summary())
+    ['kernel', 'parse', 'result', 'validate']
+
+A callback receiving the stage name and its duration in seconds can be
+registered instead, e.g. to forward timings to a metrics system.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+PERCENTILES = (50, 90, 99)
+
+# Callbacks of the active timers, replaced rather than mutated so that
+# readers never need a lock
+_callbacks = ()
+_lock = threading.Lock()
+
+
+class _NullStage(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+@contextmanager
+def _timed(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        for callback in _callbacks:
+            callback(name, duration)
+
+
+def stage(name):
+    """Context manager timing a stage, free when no timer is active
+
+    Args:
+      name (str): name of the stage
+    """
+    if not _callbacks:
+        return _NULL_STAGE
+    return _timed(name)
+
+
+def add_callback(callback):
+    """Call ``callback(name, seconds)`` at the end of every stage
+
+    Args:
+      callback (callable): receives the stage name and its duration
+    """
+    global _callbacks
+    with _lock:
+        _callbacks = _callbacks + (callback,)
+
+
+def remove_callback(callback):
+    """Stop calling a callback registered with :func:`add_callback`"""
+    global _callbacks
+    with _lock:
+        callbacks = list(_callbacks)
+        callbacks.remove(callback)
+        _callbacks = tuple(callbacks)
+
+
+class StageTimer(object):
+    """Collect the durations of every stage while active
+
+    Use as a context manager, or call :meth:`start` and :meth:`stop`.
+    """
+
+    def __init__(self):
+        self.durations = {}
+
+    def record(self, name, duration):
+        self.durations.setdefault(name, []).append(duration)
+
+    def start(self):
+        add_callback(self.record)
+        return self
+
+    def stop(self):
+        remove_callback(self.record)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def reset(self):
+        self.durations = {}
+
+    def summary(self):
+        """Count, cumulative and percentile durations of every stage
+
+        Returns:
+          dict: statistics in seconds, keyed by stage name
+        """
+        summary = {}
+        for name, durations in self.durations.items():
+            durations = np.asarray(durations)
+            stats = {'count': int(durations.shape[0]),
+                     'total': float(durations.sum()),
+                     'mean': float(durations.mean()),
+                     'max': float(durations.max())}
+            for q, value in zip(PERCENTILES,
+                                np.percentile(durations, PERCENTILES)):
+                stats['p{}'.format(q)] = float(value)
+            summary[name] = stats
+        return summary
+
+    def to_frame(self):
+        """:meth:`summary` as a :obj:`pandas.DataFrame`, one row per stage"""
+        return pd.DataFrame.from_dict(self.summary(), orient='index')
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+Watch-folder pricing daemon.
+
+:class:`FolderWatcher` polls an inbox for mission CSV files (see
+:func:`~honorary_gui.engine.read_missions`), prices each new file and
+writes ``<name>.priced.csv`` to an outbox. A checkpoint in the outbox
+records the SHA-256 of every file handled, so that
+
+ * a restarted daemon resumes where it stopped, without pricing again,
+ * a file dropped twice, under any name, is priced once,
+ * a file still being written, its size or date changing between two
+   polls, waits for the next poll.
+
+Results are written before the checkpoint, each through a temporary file
+renamed into place: a crash in between prices the file again on restart
+and overwrites identical results. Start the daemon with:
+
+    honorary_watch inbox/ outbox/ --interval 5
+"""
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+from honorary_gui import __version__, engine
+from honorary_gui.batch import price_batch
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+CHECKPOINT = '.honorary_watch.json'
+PATTERN = '*.csv'
+POLL_SECONDS = 2.0
+SUFFIX = '.priced.csv'
+CHUNK_SIZE = 100000
+
+
+def file_digest(path, block_size=2 ** 20):
+    """SHA-256 of a file, read by blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _replace(path, write):
+    """Write ``path`` through a temporary file renamed into place"""
+    tmp = path + '.tmp'
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def price_file(path, output):
+    """Price a mission file and write the missions with their results
+
+    Returns:
+      int: number of missions
+    """
+    missions = engine.read_missions(path)
+    priced, _ = price_batch(missions.start_date, missions.end_date,
+                            missions.first_hour, chunk_size=CHUNK_SIZE,
+                            trace=False)
+    for i, label in enumerate(engine.CLASS_LABELS):
+        missions[label] = priced.hours[:, i]
+    missions['hours_worked'] = priced.hours_worked
+    missions['honorary'] = priced.honorary
+    _replace(output, lambda tmp: missions.to_csv(
+        tmp, index=False, date_format='%Y-%m-%d %H:%M:%S'))
+    return len(missions)
+
+
+class FolderWatcher(object):
+    """Price the mission files appearing in a directory
+
+    Args:
+      inbox (str): directory watched
+      outbox (str): directory of the results and of the checkpoint
+      pattern (str): file names priced
+      poll_seconds (float): interval of :meth:`run` polls
+
+    Attributes:
+      index (dict): checkpoint entry of every file content handled, by
+        SHA-256
+    """
+
+    def __init__(self, inbox, outbox, pattern=PATTERN,
+                 poll_seconds=POLL_SECONDS):
+        self.inbox = inbox
+        self.outbox = outbox
+        self.pattern = pattern
+        self.poll_seconds = poll_seconds
+        self.checkpoint = os.path.join(outbox, CHECKPOINT)
+        os.makedirs(outbox, exist_ok=True)
+        self.index = {}
+        # Size and date of the files handled, to hash only changed files
+        self.seen = {}
+        self._pending = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.checkpoint) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        self.index = state.get('index', {})
+        self.seen = {name: tuple(value)
+                     for name, value in state.get('seen', {}).items()}
+        _logger.info("Resuming from %s, %d files handled", self.checkpoint,
+                     len(self.index))
+
+    def _save(self):
+        state = {'index': self.index,
+                 'seen': {name: list(value)
+                          for name, value in self.seen.items()}}
+        _replace(self.checkpoint, lambda tmp: _dump(state, tmp))
+
+    def _candidates(self):
+        """Files of the inbox whose size and date did not change since the
+        previous poll, and that were not handled as they are"""
+        ready = []
+        pending = {}
+        for entry in sorted(os.scandir(self.inbox), key=lambda e: e.name):
+            # Results are never priced again, should they land in the inbox
+            if not entry.is_file() or entry.name.endswith(SUFFIX) or \
+                    not fnmatch.fnmatch(entry.name, self.pattern):
+                continue
+            stat = entry.stat()
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if self.seen.get(entry.name, (None, None))[:2] == signature:
+                continue
+            if self._pending.get(entry.name) == signature:
+                ready.append((entry.name, signature))
+            else:
+                pending[entry.name] = signature
+        self._pending = pending
+        return ready
+
+    def poll(self):
+        """Handle the files ready in the inbox
+
+        Returns:
+          [str]: names of the files priced during this poll
+        """
+        priced = []
+        for name, signature in self._candidates():
+            path = os.path.join(self.inbox, name)
+            digest = file_digest(path)
+            if digest in self.index:
+                _logger.info("Skipping %s, same content as %s", name,
+                             self.index[digest]['name'])
+            else:
+                self.index[digest] = self._price(name, path)
+                if 'error' not in self.index[digest]:
+                    priced.append(name)
+            self.seen[name] = signature + (digest,)
+            self._save()
+        return priced
+
+    def _price(self, name, path):
+        output = os.path.join(self.outbox,
+                              os.path.splitext(name)[0] + SUFFIX)
+        begin = time.perf_counter()
+        try:
+            n = price_file(path, output)
+        except (ValueError, KeyError, OSError) as error:
+            # Kept in the index so that the same content is not retried
+            _logger.error("Cannot price %s: %s", name, error)
+            return {'name': name, 'error': str(error)}
+        _logger.info("Priced %d missions of %s in %.3f s", n, name,
+                     time.perf_counter() - begin)
+        return {'name': name, 'output': os.path.basename(output),
+                'missions': n}
+
+    def run(self, stop=None):
+        """Poll until ``stop`` is set
+
+        Args:
+          stop (:obj:`threading.Event`): stops the loop, runs forever when
+            not given
+        """
+        stop = stop if stop is not None else threading.Event()
+        while True:
+            try:
+                self.poll()
+            except OSError:
+                _logger.exception("Cannot read %s", self.inbox)
+            if stop.wait(self.poll_seconds):
+                return
+
+
+def _dump(state, path):
+    with open(path, 'w') as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+
+
+def parse_args(args):
+    """Parse command line parameters
+
+    Args:
+      args ([str]): command line parameters as list of strings
+
+    Returns:
+      :obj:`argparse.Namespace`: command line parameters namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Price the mission files dropped in a directory")
+    parser.add_argument(
+        "--version",
+        action="version",
+        version="honorary_gui {ver}".format(ver=__version__))
+    parser.add_argument(
+        dest="inbox",
+        help="directory watched for mission files",
+        metavar="INBOX")
+    parser.add_argument(
+        dest="outbox",
+        help="directory the results are written to",
+        metavar="OUTBOX")
+    parser.add_argument(
+        "--interval",
+        help="seconds between polls (default: 2)",
+        type=float,
+        default=POLL_SECONDS)
+    parser.add_argument(
+        "--pattern",
+        help="names of the mission files (default: *.csv)",
+        default=PATTERN)
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        dest="loglevel",
+        help="set loglevel to INFO",
+        action="store_const",
+        const=logging.INFO)
+    return parser.parse_args(args)
+
+
+def main(args):
+    """Main entry point allowing external calls
+
+    Args:
+      args ([str]): command line parameter list
+    """
+    args = parse_args(args)
+    logging.basicConfig(level=args.loglevel, stream=sys.stdout)
+    watcher = FolderWatcher(args.inbox, args.outbox, pattern=args.pattern,
+                            poll_seconds=args.interval)
+    engine.warm_up()
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+
+
+def run():
+    """Entry point for console_scripts
+    """
+    main(sys.argv[1:])
+
+
+if __name__ == "__main__":
+    run()
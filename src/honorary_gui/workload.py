@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+Deterministic synthetic missions for load and scaling tests.
+
+Missions are drawn from a mix of kinds:
+
+ * ``day``: day shift starting between 0700 and 1000
+ * ``night``: night shift starting between 2000 and 2300, ending next day
+ * ``weekend``: overnight mission starting on a Friday evening
+ * ``holiday``: overnight mission starting the evening before a holiday of
+   :class:`~honorary_gui.engine.FrenchBusinessCalendar`
+ * ``on_call``: long on-call span starting at any hour
+
+The same arguments always give the same missions. To write a CSV file:
+
+    honorary_workload 1000000 missions.csv --seed 1
+"""
+
+import argparse
+import logging
+import sys
+
+import numpy as np
+import pandas as pd
+
+from honorary_gui import __version__
+from honorary_gui.engine import BUSINESS_DAY, HOLIDAY, default_table
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+_logger = logging.getLogger(__name__)
+
+# Share of each kind of mission
+DEFAULT_MIX = {'day': 0.5,
+               'night': 0.25,
+               'weekend': 0.1,
+               'holiday': 0.05,
+               'on_call': 0.1}
+
+# Range of start hours and of durations in hours of each kind, upper bounds
+# excluded
+START_HOURS = {'day': (7, 11),
+               'night': (20, 24),
+               'weekend': (17, 23),
+               'holiday': (18, 24),
+               'on_call': (0, 24)}
+
+DURATIONS = {'day': (4, 11),
+             'night': (8, 12),
+             'weekend': (12, 64),
+             'holiday': (8, 31),
+             'on_call': (24, 169)}
+
+KINDS = list(DEFAULT_MIX)
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+MAX_DURATION = max(high for _, high in DURATIONS.values())
+
+
+def _anchor_days(kind, first_day, last_day):
+    """Day numbers a mission of this kind can start on"""
+    table = default_table()
+    days = np.arange(first_day, last_day + 1)
+    day_type = table.day_type[days - table.origin]
+    weekday = (days + 3) % 7  # 1970-01-01 was a Thursday
+    if kind == 'weekend':
+        return days[weekday == 4]
+    if kind == 'holiday':
+        # Eve of a holiday falling on a weekday
+        following = table.day_type[days + 1 - table.origin]
+        return days[(following == HOLIDAY) & ((weekday + 1) % 7 < 5)]
+    if kind in ('day', 'night'):
+        return days[day_type == BUSINESS_DAY]
+    return days
+
+
+def generate_missions(n, seed=0, start='2020-01-01', end='2020-12-31',
+                      mix=None, n_workers=100, first_hour_rate=0.5):
+    """Draw synthetic missions
+
+    Args:
+      n (int): number of missions
+      seed (int): seed of the random generator
+      start (str): first day missions can start on
+      end (str): last day missions can start on
+      mix (dict): weight of each kind, defaults to :data:`DEFAULT_MIX`
+      n_workers (int): number of distinct workers
+      first_hour_rate (float): share of missions whose first hour counts
+        extra
+
+    Returns:
+      :obj:`pandas.DataFrame`: columns ``worker``, ``kind``, ``start_date``,
+      ``end_date`` and ``first_hour``, sorted by start date
+    """
+    mix = dict(mix if mix is not None else DEFAULT_MIX)
+    unknown = set(mix) - set(KINDS)
+    if unknown:
+        raise ValueError("Unknown mission kinds: "
+                         + ', '.join(sorted(unknown)))
+    kinds = [kind for kind in KINDS if mix.get(kind, 0) > 0]
+    weights = np.array([mix[kind] for kind in kinds], dtype=float)
+    table = default_table()
+    first_day = pd.Timestamp(start).value // (86400 * 10 ** 9)
+    last_day = pd.Timestamp(end).value // (86400 * 10 ** 9)
+    if first_day < table.origin or \
+            last_day + MAX_DURATION // 24 + 2 >= table.origin + len(table):
+        raise ValueError("Period outside of the calendar")
+
+    rng = np.random.default_rng(seed)
+    kind_index = rng.choice(len(kinds), size=n, p=weights / weights.sum())
+    start_hour = np.empty(n, dtype=np.int64)
+    duration = np.empty(n, dtype=np.int64)
+    for k, kind in enumerate(kinds):
+        selected = np.flatnonzero(kind_index == k)
+        days = _anchor_days(kind, first_day, last_day)
+        if days.shape[0] == 0:
+            raise ValueError("No day to start " + kind + " missions on")
+        low, high = START_HOURS[kind]
+        start_hour[selected] = (
+            days[rng.integers(0, days.shape[0], selected.shape[0])] * 24
+            + rng.integers(low, high, selected.shape[0]))
+        low, high = DURATIONS[kind]
+        duration[selected] = rng.integers(low, high, selected.shape[0])
+    order = np.argsort(start_hour, kind='stable')
+    start_date = start_hour[order].astype('datetime64[h]')
+    missions = pd.DataFrame({
+        'worker': rng.integers(0, n_workers, n),
+        'kind': pd.Categorical.from_codes(kind_index[order], kinds),
+        'start_date': start_date.astype('datetime64[s]'),
+        'end_date': (start_date + duration[order]).astype('datetime64[s]'),
+        'first_hour': rng.random(n) < first_hour_rate})
+    return missions
+
+
+def iter_missions(n, chunk_size=1000000, seed=0, **kwargs):
+    """Draw missions by chunks, for workloads that do not fit in memory
+
+    Args:
+      n (int): total number of missions
+      chunk_size (int): missions per chunk
+      seed (int): seed of the random generator, every chunk is drawn with
+        its own child seed
+      **kwargs: see :func:`generate_missions`
+
+    Yields:
+      :obj:`pandas.DataFrame`: missions of a chunk
+    """
+    n_chunks = -(-n // chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    for i, chunk_seed in enumerate(seeds):
+        size = min(chunk_size, n - i * chunk_size)
+        yield generate_missions(size, seed=chunk_seed, **kwargs)
+
+
+def write_csv(path, n, chunk_size=1000000, seed=0, **kwargs):
+    """Write missions to a CSV file, dates in format '%Y-%m-%d %H:%M:%S'
+
+    Args:
+      path (str): destination file
+      n (int): number of missions
+      chunk_size (int): missions generated at once
+      seed (int): seed of the random generator
+      **kwargs: see :func:`generate_missions`
+    """
+    header = True
+    with open(path, 'w', newline='') as f:
+        for missions in iter_missions(n, chunk_size=chunk_size, seed=seed,
+                                      **kwargs):
+            missions.to_csv(f, index=False, header=header,
+                            date_format=DATE_FORMAT)
+            header = False
+
+
+def parse_args(args):
+    """Parse command line parameters
+
+    Args:
+      args ([str]): command line parameters as list of strings
+
+    Returns:
+      :obj:`argparse.Namespace`: command line parameters namespace
+    """
+    parser = argparse.ArgumentParser(
+        description="Write synthetic missions to a CSV file")
+    parser.add_argument(
+        "--version",
+        action="version",
+        version="honorary_gui {ver}".format(ver=__version__))
+    parser.add_argument(
+        dest="n",
+        help="number of missions",
+        type=int,
+        metavar="INT")
+    parser.add_argument(
+        dest="path",
+        help="destination CSV file",
+        metavar="PATH")
+    parser.add_argument(
+        "--seed",
+        help="seed of the random generator (default: 0)",
+        type=int,
+        default=0)
+    parser.add_argument(
+        "--start",
+        help="first day missions can start on (default: 2020-01-01)",
+        default='2020-01-01')
+    parser.add_argument(
+        "--end",
+        help="last day missions can start on (default: 2020-12-31)",
+        default='2020-12-31')
+    parser.add_argument(
+        "--workers",
+        help="number of distinct workers (default: 100)",
+        type=int,
+        default=100)
+    parser.add_argument(
+        "--mix",
+        help="weight of each kind of mission, e.g. day=3 night=1",
+        nargs="+",
+        metavar="KIND=WEIGHT")
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        dest="loglevel",
+        help="set loglevel to INFO",
+        action="store_const",
+        const=logging.INFO)
+    return parser.parse_args(args)
+
+
+def main(args):
+    """Main entry point allowing external calls
+
+    Args:
+      args ([str]): command line parameter list
+    """
+    args = parse_args(args)
+    logging.basicConfig(level=args.loglevel, stream=sys.stdout)
+    mix = None
+    if args.mix:
+        mix = {kind: float(weight) for kind, weight in
+               (item.split('=', 1) for item in args.mix)}
+    write_csv(args.path, args.n, seed=args.seed, start=args.start,
+              end=args.end, n_workers=args.workers, mix=mix)
+    _logger.info("Wrote %d missions to %s", args.n, args.path)
+
+
+def run():
+    """Entry point for console_scripts
+    """
+    main(sys.argv[1:])
+
+
+if __name__ == "__main__":
+    run()
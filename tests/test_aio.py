@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import numpy as np
+import pytest
+from honorary_gui.aio import AsyncPricer
+from honorary_gui.engine import price_missions
+from honorary_gui.workload import generate_missions
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+
+def test_price():
+    async def scenario():
+        pricer = AsyncPricer()
+        priced = await pricer.price(['2020-06-02 08:00:00'],
+                                    ['2020-06-02 23:00:00'])
+        message = await pricer.calculate_honorary('2020-06-02 08:00:00',
+                                                  '2020-06-02 12:00:00')
+        return priced, message
+
+    priced, message = asyncio.run(scenario())
+    assert priced.honorary.tolist() == [469.5]
+    assert 'You are owed 132 euros.' in message
+
+
+def test_stream_in_order_with_backpressure():
+    missions = generate_missions(2500, seed=5)
+    records = list(zip(missions.start_date, missions.end_date,
+                       missions.first_hour))
+    pulled = []
+
+    async def source():
+        for record in records:
+            pulled.append(record)
+            yield record
+
+    async def scenario():
+        pricer = AsyncPricer(max_in_flight=2)
+        results = []
+        async for priced in pricer.stream(source(), chunk_size=100):
+            # The source is never more than a few chunks ahead
+            assert len(pulled) <= (len(results) + 5) * 100
+            results.append(priced)
+            await asyncio.sleep(0.001)
+        return results
+
+    results = asyncio.run(scenario())
+    expected = price_missions(missions.start_date, missions.end_date,
+                              missions.first_hour)
+    assert len(results) == 25
+    assert np.array_equal(np.concatenate([r.cents for r in results]),
+                          expected.cents)
+
+
+def test_stream_slow_source_and_errors():
+    async def slow():
+        for record in [('2020-06-02 08:00:00', '2020-06-02 12:00:00'),
+                       {'start_date': '2020-06-02 08:00:00',
+                        'end_date': '2020-06-02 12:00:00',
+                        'first_hour': False}]:
+            await asyncio.sleep(0.02)
+            yield record
+
+    async def collect(missions, **kwargs):
+        return [priced async for priced in
+                AsyncPricer().stream(missions, **kwargs)]
+
+    results = asyncio.run(collect(slow(), chunk_size=10, max_delay=0.005))
+    assert [r.honorary.tolist() for r in results] == [[132.0], [120.0]]
+    with pytest.raises(ValueError):
+        asyncio.run(collect([('2020-06-02 08:00:00',
+                              '2020-06-01 12:00:00')]))
+    # Strings are not flags, 'false' would read as true
+    for record in [('2020-06-02 08:00:00', '2020-06-02 12:00:00', 'false'),
+                   {'start_date': '2020-06-02 08:00:00',
+                    'end_date': '2020-06-02 12:00:00', 'first_hour': 'no'}]:
+        with pytest.raises(ValueError, match='first_hour'):
+            asyncio.run(collect([record]))
+
+
+def test_stream_stops_early():
+    async def endless():
+        while True:
+            await asyncio.sleep(0)
+            yield ('2020-06-02 08:00:00', '2020-06-02 12:00:00')
+
+    async def scenario():
+        stream = AsyncPricer().stream(endless(), chunk_size=10)
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first
+
+    assert len(asyncio.run(scenario())) == 10
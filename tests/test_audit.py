@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+from honorary_gui.engine import PricedMissions, price_missions
+from honorary_gui.workload import generate_missions
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+
+def test_audit_adds_up_to_missions():
+    missions = generate_missions(300, seed=12)
+    priced = price_missions(missions.start_date, missions.end_date,
+                            missions.first_hour)
+    for i in range(len(priced)):
+        hours = priced.audit[i]
+        assert len(hours) == priced.hours_worked[i]
+        assert round(hours.honorary.sum(), 2) == priced.cents[i] / 100
+        counts = hours.hour_class.value_counts()
+        assert [counts.get(label, 0) for label in
+                ['business_day', 'business_night', 'holiday_day',
+                 'holiday_night']] == priced.hours[i].tolist()
+    frame = priced.audit.frame([0, 5])
+    assert set(frame.mission) == {0, 5}
+
+
+def test_audit_single_mission():
+    priced = price_missions(['2020-06-01 21:00:00'], ['2020-06-02 00:00:00'])
+    hours = priced.audit[-1]
+    assert hours['shift'].tolist() == ['day', 'night', 'night']
+    assert hours.first_hour.tolist() == [True, False, False]
+    assert hours.honorary.tolist() == [42.0, 37.5, 37.5]
+
+
+def test_audit_across_clock_change():
+    priced = price_missions(['2021-10-30 21:00:00'], ['2021-10-31 06:00:00'],
+                            tz='Europe/Paris')
+    hours = priced.audit[0]
+    assert len(hours) == priced.hours_worked[0] == 10
+    assert round(hours.honorary.sum(), 2) == priced.cents[0] / 100
+
+
+def test_audit_needs_pricing_inputs():
+    priced = PricedMissions(np.zeros(1, 'datetime64[s]'),
+                            np.zeros(1, 'datetime64[s]'),
+                            np.zeros((1, 4), np.int64), np.zeros(1, np.int64))
+    with pytest.raises(ValueError):
+        priced.audit[0]
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+from honorary_gui.batch import price_batch
+from honorary_gui.engine import price_missions
+from honorary_gui.workload import generate_missions
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+
+def test_price_batch_within_budget():
+    missions = generate_missions(50000, seed=2)
+    budget = 2 ** 20
+    priced, report = price_batch(missions.start_date, missions.end_date,
+                                 missions.first_hour, memory_budget=budget)
+    expected = price_missions(missions.start_date, missions.end_date,
+                              missions.first_hour)
+    assert np.array_equal(priced.cents, expected.cents)
+    assert np.array_equal(priced.hours, expected.hours)
+    assert report.n_chunks > 1
+    assert 0 < report.peak_bytes <= budget
+
+
+def test_price_batch_fixed_chunks():
+    missions = generate_missions(2500, seed=2)
+    calls = []
+    priced, report = price_batch(missions.start_date, missions.end_date,
+                                 chunk_size=1000, trace=False,
+                                 progress=lambda *args: calls.append(args))
+    assert calls == [(1000, 2500), (2000, 2500), (2500, 2500)]
+    assert report.n_chunks == 3
+    assert report.peak_bytes == 0
+    assert len(priced) == 2500
+    for chunk_size in (0, -1):
+        with pytest.raises(ValueError, match='chunk_size'):
+            price_batch(missions.start_date, missions.end_date,
+                        chunk_size=chunk_size)
+
+
+def test_price_batch_small_budget():
+    missions = generate_missions(20000, seed=2)
+    budget = 10000
+    priced, report = price_batch(missions.start_date, missions.end_date,
+                                 memory_budget=budget)
+    # Chunks shrink below a thousand missions rather than ignore the budget
+    assert report.chunk_size < 1000
+    # The fixed overhead of the engine alone is over such a budget
+    assert report.over_budget
+    assert len(priced) == 20000
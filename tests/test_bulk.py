@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from honorary_gui.bulk import RowWindow
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+
+def test_rows_in_view():
+    window = RowWindow(height=3)
+    window.reset(100000)
+    data = {'a': np.arange(100000), 'b': np.arange(100000) * 2}
+    assert window.values(data, ['a', 'b']) == [[0, 0], [1, 2], [2, 4]]
+    assert window.scroll('scroll', 2, 'units')
+    assert window.values(data, ['b']) == [[4], [6], [8]]
+    assert window.scroll('scroll', 1, 'pages')
+    assert window.offset == 5
+    assert window.fractions() == (5 / 100000, 8 / 100000)
+
+
+def test_scrolling_stays_in_bounds():
+    window = RowWindow(height=3)
+    window.reset(5)
+    data = {'a': list('vwxyz')}
+    assert not window.scroll('scroll', -1, 'units')
+    assert window.scroll('moveto', '1.0')
+    assert window.offset == window.max_offset() == 2
+    assert not window.scroll('scroll', 1, 'pages')
+    assert window.values(data, ['a']) == [['x'], ['y'], ['z']]
+    assert not window.scroll('unknown')
+
+
+def test_short_and_empty_tables():
+    window = RowWindow(height=4)
+    window.reset(2)
+    # As many rows as lines whatever the data, blank past the end
+    assert window.values({'a': [1, 2]}, ['a']) == [[1], [2], [''], ['']]
+    assert window.fractions() == (0, 1)
+    window.reset(0)
+    assert window.values({'a': []}, ['a']) == [['']] * 4
+    assert window.fractions() == (0, 1)
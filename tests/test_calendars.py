@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+from honorary_gui.calendars import (CALENDARS, CalendarRegistry,
+                                    ClosureOverlay, default_registry,
+                                    price_regions)
+from honorary_gui.engine import BusinessDayTable, price_missions
+from honorary_gui.workload import generate_missions
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+
+def test_regional_holidays():
+    tables = default_registry().tables()
+    days = ['2021-04-02', '2022-12-26', '2021-05-24', '2021-07-21',
+            '2021-07-14']
+    holidays = {calendar: tables.table(calendar).is_holiday(days).tolist()
+                for calendar in tables.ids}
+    assert holidays['fr'] == [False, False, False, False, True]
+    assert holidays['fr-alsace-moselle'] == [True, True, False, False, True]
+    assert holidays['be'] == [False, False, True, True, False]
+
+
+def test_mixed_batch_matches_single_calendars():
+    missions = generate_missions(3000, seed=11)
+    ids = np.array(list(CALENDARS))
+    calendars = ids[np.random.default_rng(0).integers(0, len(ids),
+                                                      len(missions))]
+    priced = price_regions(missions.start_date, missions.end_date,
+                           calendars, missions.first_hour)
+    for calendar_id, calendar in CALENDARS.items():
+        own = calendars == calendar_id
+        expected = price_missions(missions.start_date[own],
+                                  missions.end_date[own],
+                                  missions.first_hour[own],
+                                  table=BusinessDayTable(calendar()))
+        assert np.array_equal(priced.cents[own], expected.cents)
+        assert np.array_equal(priced.hours[own], expected.hours)
+
+
+def test_audit_uses_each_mission_calendar():
+    # Belgian National Day, a business day in France
+    priced = price_regions(['2021-07-21 08:00:00'] * 2,
+                           ['2021-07-21 12:00:00'] * 2, ['fr', 'be'])
+    assert priced.calendars.tolist() == ['fr', 'be']
+    for i, day_type in enumerate(['business', 'holiday']):
+        hours = priced.audit[i]
+        assert set(hours.day_type) == {day_type}
+        assert hours.honorary.sum() * 100 == priced.cents[i]
+
+
+def test_unknown_calendar():
+    with pytest.raises(ValueError):
+        price_regions(['2021-04-02 08:00:00'], ['2021-04-02 10:00:00'],
+                      ['lu'])
+
+
+def test_closure_overlay():
+    registry = CalendarRegistry(CALENDARS)
+    registry.tables()
+    base = registry._holiday_tables['fr']
+    registry.register('client', ClosureOverlay(
+        'fr', added=['2021-06-21'], removed=['2021-07-14', '2021-07-17']))
+    tables = registry.tables()
+    # The holiday calendars are not computed again
+    assert registry._holiday_tables['fr'] is base
+    days = ['2021-06-21', '2021-07-14', '2021-07-17', '2021-07-18',
+            '2021-06-22']
+    assert tables.table('client').is_holiday(days).tolist() == \
+        [True, False, False, True, False]
+    priced = price_regions(['2021-06-21 08:00:00'] * 2,
+                           ['2021-06-21 10:00:00'] * 2, ['fr', 'client'],
+                           registry=registry)
+    assert priced.cents.tolist() == [4200 + 3000, 4950 + 3750]
+    with pytest.raises(ValueError):
+        registry.register('other', ClosureOverlay('lu'))
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+import pytest
+from honorary_gui import dst
+from honorary_gui.engine import price_missions
+from honorary_gui.workload import generate_missions
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+
+@pytest.mark.parametrize('tz', dst.TIMEZONES)
+def test_transitions_match_tz_database(tz):
+    table = dst.DstTable(2000, 2030)
+    hour = pd.Timedelta(hours=1)
+    skipped = pd.to_datetime(table.skipped * 3600, unit='s')
+    repeated = pd.to_datetime(table.repeated * 3600, unit='s')
+    assert skipped.tz_localize(tz, nonexistent='NaT').isna().all()
+    assert repeated.tz_localize(tz, ambiguous='NaT').isna().all()
+    for hours in (skipped - hour, repeated - hour, repeated + hour):
+        assert hours.tz_localize(tz, ambiguous='NaT',
+                                 nonexistent='NaT').notna().all()
+
+
+def test_overnight_missions_across_clock_changes():
+    start = ['2021-03-27 21:00:00', '2021-10-30 21:00:00',
+             '2021-06-05 21:00:00']
+    end = ['2021-03-28 06:00:00', '2021-10-31 06:00:00',
+           '2021-06-06 06:00:00']
+    naive = price_missions(start, end)
+    local = price_missions(start, end, tz='Europe/Paris')
+    assert naive.hours_worked.tolist() == [9, 9, 9]
+    assert local.hours_worked.tolist() == [8, 10, 9]
+    # The hour gained or lost is a weekend night hour, 45 euros
+    assert (local.cents - naive.cents).tolist() == [-4500, 4500, 0]
+
+
+def test_hours_match_tz_aware_durations():
+    missions = generate_missions(2000, seed=10, start='2021-01-01',
+                                 end='2022-12-31')
+    priced = price_missions(missions.start_date, missions.end_date,
+                            tz='Europe/Paris')
+    # Skip the dates that do not exist or happen twice
+    start = missions.start_date.dt.tz_localize(
+        'Europe/Paris', ambiguous='NaT', nonexistent='NaT')
+    end = missions.end_date.dt.tz_localize(
+        'Europe/Paris', ambiguous='NaT', nonexistent='NaT')
+    valid = (start.notna() & end.notna()).to_numpy()
+    real = ((end - start).dt.total_seconds() // 3600).to_numpy()
+    assert np.array_equal(priced.hours_worked[valid], real[valid])
+
+
+def test_unknown_time_zone():
+    with pytest.raises(ValueError):
+        price_missions(['2021-03-27 21:00:00'], ['2021-03-28 06:00:00'],
+                       tz='Mars/Olympus_Mons')
+
+
+def test_mission_starting_in_skipped_hour():
+    start = ['2021-03-28 02:00:00', '2021-03-28 02:00:00']
+    end = ['2021-03-28 03:00:00', '2021-03-28 05:00:00']
+    priced = price_missions(start, end, tz='Europe/Paris')
+    assert priced.hours_worked.tolist() == [0, 2]
+    # The premium goes to 03:00, the first hour that exists
+    assert priced.cents.tolist() == [0, 10200]
+    assert len(priced.audit[0]) == 0
+    audit = priced.audit[1]
+    assert audit.first_hour.tolist() == [True, False]
+    assert audit.honorary.sum() * 100 == priced.cents[1]
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from honorary_gui import kernel
+from honorary_gui.earnings import DailyEarnings
+from honorary_gui.engine import default_fares, default_table, price_missions
+from honorary_gui.workload import generate_missions
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+
+def test_segment_by_day_sums_to_missions():
+    missions = generate_missions(3000, seed=5)
+    table, fares = default_table(), default_fares()
+    start = missions.start_date.to_numpy().astype(np.int64) // 3600
+    n_hours = (missions.end_date - missions.start_date).dt.total_seconds() \
+        .to_numpy().astype(np.int64) // 3600
+    mission, day, hours, cents = kernel.segment_by_day(
+        start, n_hours, missions.first_hour.to_numpy(), table.day_type,
+        table.origin, fares.subsequent, fares.first)
+    expected = price_missions(missions.start_date, missions.end_date,
+                              missions.first_hour)
+    total_hours = np.zeros_like(expected.hours)
+    np.add.at(total_hours, mission, hours)
+    total_cents = np.zeros_like(expected.cents)
+    np.add.at(total_cents, mission, cents.sum(axis=1))
+    assert np.array_equal(total_hours, expected.hours)
+    assert np.array_equal(total_cents, expected.cents)
+    assert (np.diff(day)[np.diff(mission) == 0] == 1).all()
+
+
+def test_range_totals_match_missions():
+    missions = generate_missions(4000, seed=6, n_workers=10)
+    earnings = DailyEarnings()
+    # Out of order chunks exercise growth at both ends of the window
+    order = np.random.default_rng(0).permutation(len(missions))
+    for chunk in np.array_split(order, 4):
+        part = missions.iloc[np.sort(chunk)]
+        earnings.add(part.worker, part.start_date, part.end_date,
+                     part.first_hour)
+    priced = price_missions(missions.start_date, missions.end_date,
+                            missions.first_hour)
+    assert round(earnings.total()['honorary'], 2) == \
+        priced.cents.sum() / 100
+
+    # Only missions within March 2020 for a team that has no other
+    team = [0, 1, 2]
+    in_team = missions.worker.isin(team)
+    in_march = (missions.start_date >= '2020-03-01') & \
+        (missions.end_date <= '2020-04-01')
+    overlaps = (missions.start_date < '2020-04-01') & \
+        (missions.end_date > '2020-03-01')
+    missions = missions[in_team & (in_march | ~overlaps)]
+    earnings = DailyEarnings()
+    earnings.add(missions.worker, missions.start_date, missions.end_date,
+                 missions.first_hour)
+    selected = missions[missions.start_date >= '2020-03-01']
+    selected = selected[selected.end_date <= '2020-04-01']
+    expected = price_missions(selected.start_date, selected.end_date,
+                              selected.first_hour)
+    totals = earnings.total(team, '2020-03-01', '2020-04-01')
+    assert totals['hours_worked'] == expected.hours.sum()
+    assert round(totals['honorary'], 2) == expected.cents.sum() / 100
+
+    earnings.remove(missions.worker, missions.start_date,
+                    missions.end_date, missions.first_hour)
+    assert not earnings.cumulative.any()
+
+
+def test_worker_ids_known_by_their_text():
+    earnings = DailyEarnings()
+    earnings.add([1, '1', 2], ['2020-06-02 08:00'] * 3,
+                 ['2020-06-02 12:00'] * 3)
+    assert earnings.workers == ['1', '2']
+    assert earnings.total(worker='1') == earnings.total(worker=1)
+    assert earnings.total(worker='1')['hours_worked'] == 8
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+import io
+
+import pytest
+from honorary_gui.engine import calculate_honorary, price_missions, \
+    read_missions, warm_up
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+
+def test_same_day_mission():
+    priced = price_missions(['2020-06-02 08:00:00'], ['2020-06-02 23:00:00'])
+    # 42 + 13 * 30 + 37.50
+    assert priced.honorary.tolist() == [469.5]
+    assert priced.hours.tolist() == [[14, 1, 0, 0]]
+
+
+def test_overnight_mission():
+    priced = price_missions(['2020-06-02 21:00:00'], ['2020-06-03 06:00:00'],
+                            first_hour=False)
+    # 30 + 8 * 37.50
+    assert priced.honorary.tolist() == [330.0]
+
+
+def test_holiday_and_multi_day_mission():
+    # Bastille Day is a Tuesday, the 15th of July a business day
+    priced = price_missions(['2020-07-13 22:00:00'], ['2020-07-15 08:00:00'])
+    assert priced.hours.tolist() == [[1, 9, 15, 9]]
+    assert priced.honorary.tolist() == [
+        49.5 + 30 + 8 * 37.5 + 15 * 37.5 + 9 * 45]
+
+
+def test_partial_hours_and_batches():
+    priced = price_missions(['2020-06-02 08:30:00', '2020-06-06 10:00:00'],
+                            ['2020-06-02 09:29:00', '2020-06-06 12:00:00'],
+                            first_hour=[True, False])
+    assert priced.hours_worked.tolist() == [0, 2]
+    assert priced.honorary.tolist() == [0.0, 75.0]
+
+
+def test_invalid_missions():
+    with pytest.raises(ValueError):
+        price_missions(['2020-06-02 08:00:00'], ['2020-06-01 08:00:00'])
+    with pytest.raises(ValueError):
+        price_missions(['1990-06-02 08:00:00'], ['1990-06-02 09:00:00'])
+
+
+def test_calculate_honorary():
+    warm_up()
+    message = calculate_honorary('2020-06-01 8:00:00', '2020-06-01 12:00:00')
+    assert 'You have worked 4 hours.' in message
+    assert 'You are owed 132 euros.' in message
+
+
+def test_read_missions():
+    missions = read_missions(io.StringIO(
+        'start_date,end_date,first_hour\n'
+        '2020-06-02 08:00:00,2020-06-02 12:00:00,1\n'
+        '2020-06-02 08:00:00,2020-06-02 12:00:00,0\n'))
+    priced = price_missions(missions.start_date, missions.end_date,
+                            missions.first_hour)
+    assert priced.honorary.tolist() == [132.0, 120.0]
+    with pytest.raises(ValueError):
+        read_missions(io.StringIO('start,end\n'))
+
+
+def test_read_missions_first_hour():
+    missions = read_missions(io.StringIO(
+        'start_date,end_date,first_hour\n'
+        '2020-06-02 08:00:00,2020-06-02 12:00:00,False\n'
+        '2020-06-02 08:00:00,2020-06-02 12:00:00, yes\n'
+        '2020-06-02 08:00:00,2020-06-02 12:00:00,no\n'))
+    assert missions.first_hour.tolist() == [False, True, False]
+    with pytest.raises(ValueError, match='rows: 1'):
+        read_missions(io.StringIO(
+            'start_date,end_date,first_hour\n'
+            '2020-06-02 08:00:00,2020-06-02 12:00:00,1\n'
+            '2020-06-02 08:00:00,2020-06-02 12:00:00,\n'))
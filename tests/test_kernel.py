@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+from honorary_gui import kernel
+from honorary_gui.engine import default_fares, default_table
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+
+@pytest.fixture
+def missions():
+    table = default_table()
+    rng = np.random.default_rng(42)
+    start_hour = rng.integers(table.origin * 24,
+                              (table.origin + len(table) - 30) * 24, 2000)
+    n_hours = rng.integers(0, 24 * 20, 2000)
+    first_hour = rng.random(2000) < 0.5
+    return start_hour, n_hours, first_hour
+
+
+@pytest.mark.parametrize('backend', kernel.BACKENDS)
+def test_backends_match_reference_loop(missions, backend):
+    table, fares = default_table(), default_fares()
+    hours = np.zeros((missions[0].shape[0], kernel.N_CLASSES), dtype=np.int64)
+    cents = np.zeros(missions[0].shape[0], dtype=np.int64)
+    kernel._segment_loop(*missions, table.day_type, table.origin,
+                         fares.subsequent, fares.first, hours, cents)
+    result = kernel.segment_and_price(*missions, table.day_type, table.origin,
+                                      fares.subsequent, fares.first,
+                                      backend=backend)
+    assert np.array_equal(result[0], hours)
+    assert np.array_equal(result[1], cents)
+
+
+def test_unknown_backend(missions):
+    table, fares = default_table(), default_fares()
+    with pytest.raises(ValueError):
+        kernel.segment_and_price(*missions, table.day_type, table.origin,
+                                 fares.subsequent, fares.first,
+                                 backend='fortran')
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+from honorary_gui.engine import price_missions
+from honorary_gui.overlaps import find_overlaps, merge_missions
+from honorary_gui.workload import generate_missions
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+
+def test_merge_overlapping_missions():
+    missions = pd.DataFrame({
+        'worker': ['a', 'a', 'a', 'b', 'a'],
+        'start_date': pd.to_datetime(['2020-06-01 08:00', '2020-06-01 10:00',
+                                      '2020-06-01 20:00', '2020-06-01 09:00',
+                                      '2020-06-01 18:00']),
+        'end_date': pd.to_datetime(['2020-06-01 12:00', '2020-06-01 11:00',
+                                    '2020-06-01 22:00', '2020-06-01 10:00',
+                                    '2020-06-01 20:00']),
+        'first_hour': [True, True, True, True, False]})
+    flags = find_overlaps(missions)
+    assert flags.overlaps.tolist() == [True, True, False, False, False]
+    assert flags.group[0] == flags.group[1]
+
+    merged = merge_missions(missions)
+    assert merged.worker.tolist() == ['a', 'a', 'a', 'b']
+    assert merged.merged.tolist() == [2, 1, 1, 1]
+    assert merged.end_date[0] == pd.Timestamp('2020-06-01 12:00')
+    assert merged.first_hour.tolist() == [True, False, True, True]
+
+
+def test_merge_matches_pairwise_check():
+    missions = generate_missions(3000, seed=8, n_workers=30)
+    flags = find_overlaps(missions)
+    expected = np.zeros(len(missions), dtype=bool)
+    for _, own in missions.groupby('worker').groups.items():
+        frame = missions.loc[own]
+        start = frame.start_date.to_numpy()
+        end = frame.end_date.to_numpy()
+        pairs = (start[:, None] < end[None, :]) & \
+            (start[None, :] < end[:, None])
+        np.fill_diagonal(pairs, False)
+        expected[missions.index.get_indexer(own)] = pairs.any(axis=1)
+    assert np.array_equal(flags.overlaps.to_numpy(), expected)
+
+    merged = merge_missions(missions)
+    assert merged.merged.sum() == len(missions)
+    assert len(merged) == flags.group.nunique()
+    priced = price_missions(merged.start_date, merged.end_date)
+    assert priced.hours.sum() <= price_missions(
+        missions.start_date, missions.end_date).hours.sum()
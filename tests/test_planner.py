@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+from honorary_gui.engine import price_missions
+from honorary_gui.planner import plan_shifts
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+
+def cost(plan):
+    start = [pd.Timestamp(day) + pd.Timedelta(hours=plan.start_hour)
+             for day in plan.days]
+    end = [s + pd.Timedelta(hours=plan.shift_hours) for s in start]
+    return price_missions(start, end).cents.sum() / 100
+
+
+def test_cheapest_week_avoids_holidays_and_nights():
+    # Week of Ascension Day, Thursday 2021-05-13
+    plans = plan_shifts('2021-05-10', n_days=7, total_hours=40)
+    best = plans.iloc[0]
+    assert best.shift_hours == 10 and best.n_shifts == 4
+    assert np.datetime64('2021-05-13') not in best.days
+    assert 7 <= best.start_hour <= 12
+    assert best.honorary == 4 * (42 + 9 * 30)
+    assert plans.honorary.is_monotonic_increasing
+    for _, plan in plans.iterrows():
+        assert cost(plan) == plan.honorary
+
+
+def test_rest_constraint():
+    plans = plan_shifts('2021-05-10', n_days=5, total_hours=40,
+                        shift_hours=(8,), min_rest=17, top=5)
+    assert plans.empty
+    plans = plan_shifts('2021-05-10', n_days=5, total_hours=40,
+                        shift_hours=(8,), min_rest=16, start_hours=[22])
+    assert len(plans) == 1
+    assert plans.honorary[0] == cost(plans.iloc[0])
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from honorary_gui.engine import price_missions
+from honorary_gui.pool import PricingPool, SharedTables, attach
+from honorary_gui.workload import generate_missions
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+
+def test_attach_maps_the_tables_without_copy():
+    tables = SharedTables()
+    try:
+        shm, table, fares = attach(tables.descriptor)
+        missions = generate_missions(1000, seed=7)
+        priced = price_missions(missions.start_date, missions.end_date,
+                                table=table, fares=fares)
+        expected = price_missions(missions.start_date, missions.end_date)
+        assert np.array_equal(priced.cents, expected.cents)
+        assert not table.day_type.flags.owndata
+        assert fares.normal_dict['day_first_hour_fare'] == '42'
+        del table, fares
+        shm.close()
+    finally:
+        tables.close()
+
+
+def test_pricing_pool():
+    missions = generate_missions(5000, seed=7)
+    with PricingPool(processes=2) as pool:
+        # Every worker is started, each answers once
+        assert len(pool.warm_up()) == 2
+        priced = pool.price(missions.start_date, missions.end_date,
+                            missions.first_hour, chunk_size=1000)
+    expected = price_missions(missions.start_date, missions.end_date,
+                              missions.first_hour)
+    assert np.array_equal(priced.cents, expected.cents)
+    assert np.array_equal(priced.hours, expected.hours)
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+from honorary_gui.engine import CLASS_LABELS, price_missions
+from honorary_gui.rota import Rota, count_weekdays, forecast, forecast_rotas
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+ROTAS = [Rota(['Mon', 'Tue', 'Wed', 'Thu'], '21:00', '06:00'),
+         Rota(['Fri', 'Sat', 'Sun'], '07:30', '19:30', first_hour=False),
+         Rota([0, 2, 4], '22:00', '22:00')]
+
+
+def expand(rota, start, end):
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D')
+                     + 1).astype(np.int64)
+    days = days[np.isin((days + 3) % 7, rota.weekdays)]
+    return price_missions(*rota.occurrences(days), first_hour=rota.first_hour)
+
+
+@pytest.mark.parametrize('rota', ROTAS, ids=lambda rota: rota.name)
+def test_forecast_matches_expansion(rota):
+    result = forecast(rota, '2021-01-01', '2021-12-31')
+    priced = expand(rota, '2021-01-01', '2021-12-31')
+    assert result['occurrences'] == len(priced)
+    assert result['exceptions'] > 0
+    assert result['honorary'] == priced.cents.sum() / 100
+    assert [result[label] for label in CLASS_LABELS] == \
+        priced.hours.sum(axis=0).tolist()
+
+
+def test_count_weekdays():
+    days = np.arange(18628, 18628 + 100)
+    assert count_weekdays(days[0], days[-1]).tolist() == \
+        np.bincount((days + 3) % 7, minlength=7).tolist()
+    assert count_weekdays(10, 9).sum() == 0
+
+
+def test_forecast_rotas():
+    frame = forecast_rotas(ROTAS[:2], '2021-05-01', '2021-05-31')
+    assert frame.index.tolist() == ['Mon/Tue/Wed/Thu 21:00-06:00',
+                                    'Fri/Sat/Sun 07:30-19:30']
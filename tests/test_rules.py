@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+import pandas as pd
+import pytest
+from honorary_gui.rules import (DailyFirstHourCap, StreamingRules,
+                                WeeklyOvertime, evaluate)
+from honorary_gui.workload import generate_missions
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+RULES = [WeeklyOvertime(), DailyFirstHourCap()]
+
+
+def test_rules_across_chunks():
+    rules = StreamingRules(RULES)
+    # 2020-06-01 is a Monday, 10 hours a day
+    days = ['2020-06-01', '2020-06-02', '2020-06-03']
+    first = rules.feed('a', [d + ' 08:00' for d in days],
+                       [d + ' 18:00' for d in days])
+    assert first.adjustment.tolist() == [0, 0, 0]
+    second = rules.feed(['a', 'a', 'b'],
+                        ['2020-06-04 08:00', '2020-06-04 19:00',
+                         '2020-06-04 08:00'],
+                        ['2020-06-04 18:00', '2020-06-04 20:00',
+                         '2020-06-04 18:00'])
+    # 5 hours past 35 at 25% of 30 euros, then a second premium of the day
+    # withdrawn (42 - 30 euros) and 1 more overtime hour
+    assert second.overtime_hours.tolist() == [5, 1, 0]
+    assert second.overtime.tolist() == [3750, 750, 0]
+    assert second.premiums_capped.tolist() == [0, 1, 0]
+    assert second.adjustment.tolist() == [3750, 750 - 1200, 0]
+    with pytest.raises(ValueError):
+        rules.feed('a', ['2020-06-04 07:00'], ['2020-06-04 08:00'])
+
+
+def test_overtime_resets_on_monday():
+    rules = StreamingRules([WeeklyOvertime(threshold=2)])
+    # Sunday 23:00 to Monday 04:00: one hour in the first week, four in
+    # the second
+    result = rules.feed('a', ['2020-06-07 23:00'], ['2020-06-08 04:00'])
+    assert result.overtime_hours.tolist() == [2]
+
+
+def test_rejected_feed_leaves_state_unchanged():
+    rules = StreamingRules([WeeklyOvertime(threshold=35)])
+    rules.feed('a', ['2020-06-08 08:00'], ['2020-06-08 18:00'])
+    with pytest.raises(ValueError):
+        rules.feed(['a', 'a'], ['2020-06-09 08:00', '2020-06-08 07:00'],
+                   ['2020-06-09 18:00', '2020-06-08 08:00'])
+    assert rules.states['a'][0][1] == 10
+    result = rules.feed('a', ['2020-06-09 08:00'], ['2020-06-09 18:00'])
+    assert result.overtime_hours.tolist() == [0]
+
+
+def test_parallel_matches_serial():
+    missions = generate_missions(2000, seed=9, n_workers=8)
+    missions = missions.sample(frac=1, random_state=0)
+    serial = evaluate(missions, RULES)
+    parallel = evaluate(missions, RULES, processes=2)
+    pd.testing.assert_frame_equal(serial, parallel)
+    assert serial.overtime_hours.sum() > 0
+    assert serial.premiums_capped.sum() > 0
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import json
+
+from honorary_gui.service import PricingService
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+
+async def post(reader, writer, path, payload):
+    body = json.dumps(payload).encode('utf-8')
+    writer.write('POST {} HTTP/1.1\r\nHost: localhost\r\n'
+                 'Content-Length: {}\r\n\r\n'.format(path, len(body))
+                 .encode('latin-1') + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line == b'\r\n':
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.lower()] = value.strip()
+    data = await reader.readexactly(int(headers['content-length']))
+    return status, json.loads(data)
+
+
+def run_with_service(client):
+    async def scenario():
+        service = PricingService()
+        server = await service.start('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return service, await client(port)
+    return asyncio.run(scenario())
+
+
+def test_single_requests_are_coalesced():
+    mission = {'start_date': '2020-06-02 08:00:00',
+               'end_date': '2020-06-02 23:00:00'}
+
+    async def client(port):
+        connections = [await asyncio.open_connection('127.0.0.1', port)
+                       for _ in range(20)]
+        # Two requests per connection, the second one on the kept-alive
+        # connection
+        results = []
+        for _ in range(2):
+            results += await asyncio.gather(*[
+                post(reader, writer, '/price', mission)
+                for reader, writer in connections])
+        for _, writer in connections:
+            writer.close()
+        return results
+
+    service, results = run_with_service(client)
+    assert [status for status, _ in results] == [200] * 40
+    assert results[0][1]['honorary'] == 469.5
+    assert results[0][1]['hours']['business_night'] == 1
+    assert service.batcher.batches < 40
+
+
+def test_bulk_and_errors():
+    async def client(port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        bulk = await post(reader, writer, '/price/bulk', {'missions': [
+            {'start_date': '2020-06-02 08:00:00',
+             'end_date': '2020-06-02 12:00:00', 'first_hour': False},
+            {'start_date': '2020-06-02 08:00:00',
+             'end_date': '2020-06-02 12:00:00'}]})
+        invalid = await post(reader, writer, '/price',
+                             {'start_date': '2020-06-02 08:00:00',
+                              'end_date': '2020-06-01 12:00:00'})
+        unknown = await post(reader, writer, '/quote', {})
+        writer.close()
+        return bulk, invalid, unknown
+
+    _, (bulk, invalid, unknown) = run_with_service(client)
+    assert bulk[0] == 200
+    assert [r['honorary'] for r in bulk[1]['results']] == [120.0, 132.0]
+    assert invalid[0] == 400
+    assert 'before start date' in invalid[1]['error']
+    assert unknown[0] == 404
+
+
+def test_invalid_length_and_first_hour():
+    async def client(port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        first_hour = await post(reader, writer, '/price',
+                                {'start_date': '2020-06-02 08:00:00',
+                                 'end_date': '2020-06-02 12:00:00',
+                                 'first_hour': 'false'})
+        writer.close()
+        statuses = []
+        heads = ['Content-Length: {}\r\n'.format(length)
+                 for length in ('abc', '-5', '\u00b2')]
+        heads.append('X-Long: {}\r\n'.format('a' * 2 ** 17))
+        for head in heads:
+            reader, writer = await asyncio.open_connection('127.0.0.1',
+                                                           port)
+            writer.write(('POST /price HTTP/1.1\r\n' + head + '\r\n')
+                         .encode('latin-1'))
+            await writer.drain()
+            statuses.append(int((await reader.readline()).split()[1]))
+            writer.close()
+        return first_hour, statuses
+
+    _, (first_hour, statuses) = run_with_service(client)
+    assert first_hour[0] == 400
+    assert 'first_hour' in first_hour[1]['error']
+    assert statuses == [400, 400, 400, 431]
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import numpy as np
+import pytest
+from honorary_gui.engine import price_missions
+from honorary_gui.snapshot import EngineSnapshot, SnapshotManager
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+MISSION = (['2021-05-24 08:00:00'], ['2021-05-24 10:00:00'])
+
+
+def write(path, config):
+    path.write_text(json.dumps(config))
+
+
+def test_default_config_matches_engine(tmp_path):
+    path = tmp_path / 'engine.json'
+    write(path, {'version': 'v1'})
+    snapshot = EngineSnapshot.from_file(str(path))
+    priced = snapshot.price(*MISSION)
+    assert np.array_equal(priced.cents, price_missions(*MISSION).cents)
+    assert not snapshot.table.day_type.flags.writeable
+    with pytest.raises(AttributeError):
+        snapshot.version = 'v2'
+
+
+def test_reload_swaps_snapshot(tmp_path):
+    path = tmp_path / 'engine.json'
+    write(path, {'version': 'v1'})
+    manager = SnapshotManager(str(path))
+    before = manager.current
+    # 2021-05-24 is Whit Monday, not a holiday of the default calendar
+    assert manager.price(*MISSION).cents[0] == 4200 + 3000
+    assert not manager.reload()
+
+    write(path, {'version': 'v2',
+                 'calendar': {'holidays': [{'name': 'Whit Monday',
+                                            'easter_offset': 50}],
+                              'extra_days': ['2021-07-13']},
+                 'fares': {'holiday': {'day_first_hour_fare': '50',
+                                       'day_subsequent_hour_fare': '40',
+                                       'night_first_hour_fare': '60',
+                                       'night_subsequent_hour_fare': '50'}}})
+    assert manager.reload()
+    assert manager.current.version == 'v2'
+    assert manager.price(*MISSION).cents[0] == 5000 + 4000
+    assert manager.current.table.is_holiday(['2021-07-13', '2021-07-14']) \
+        .tolist() == [True, False]
+    # A batch holding the previous snapshot still prices on it
+    assert before.price(*MISSION).cents[0] == 4200 + 3000
+
+
+def test_invalid_config_keeps_current(tmp_path):
+    path = tmp_path / 'engine.json'
+    write(path, {'version': 'v1'})
+    manager = SnapshotManager(str(path))
+    path.write_text('{not json')
+    assert not manager.reload()
+    assert manager.current.version == 'v1'
+    assert manager.errors == 1
+    for config in ([{'version': 'v2'}], {'version': 'v2', 'fares': [1]}):
+        write(path, config)
+        assert not manager.reload()
+    assert manager.current.version == 'v1'
+    assert manager.errors == 3
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+import numpy as np
+import pytest
+from honorary_gui.engine import price_missions
+from honorary_gui.store import ResultsStore
+from honorary_gui.workload import generate_missions
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+
+def test_store_queries_match_priced_missions(tmp_path):
+    missions = generate_missions(5000, seed=3, n_workers=20)
+    priced = price_missions(missions.start_date, missions.end_date,
+                            missions.first_hour)
+    with ResultsStore(str(tmp_path / 'results.sqlite')) as store:
+        ids = store.add(priced, workers=missions.worker, fare_version='v1')
+        assert ids == list(range(1, 5001))
+        assert len(store) == 5000
+
+        worker = missions.worker.iloc[0]
+        march = ((missions.worker == worker)
+                 & (missions.start_date >= '2020-03-01')
+                 & (missions.start_date < '2020-04-01')).to_numpy()
+        totals = store.earnings(worker=worker, start='2020-03-01',
+                                end='2020-04-01')
+        assert totals['missions'] == march.sum()
+        assert totals['honorary'] == priced.cents[march].sum() / 100
+        assert totals['hours_worked'] == priced.hours[march].sum()
+
+        frame = store.missions(worker=worker, start='2020-03-01',
+                               end='2020-04-01')
+        assert np.array_equal(frame.start.to_numpy(),
+                              np.sort(priced.start[march]))
+        assert store.earnings(fare_version='v2')['missions'] == 0
+
+        monthly = store.monthly()
+        assert monthly.missions.sum() == 5000
+        assert round(monthly.honorary.sum(), 2) == priced.cents.sum() / 100
+
+
+def test_store_plan_uses_indexes():
+    with ResultsStore() as store:
+        plan = store.connection.execute(
+            'EXPLAIN QUERY PLAN SELECT SUM(cents) FROM missions '
+            'WHERE worker = ? AND start >= ?', ('w', 0)).fetchall()
+    assert 'missions_worker_start' in str(plan)
+
+
+def totals_from_scratch(store):
+    frame = store.missions()
+    frame['month'] = frame.start.dt.strftime('%Y-%m')
+    return frame.groupby(['worker', 'month']).honorary.agg(['count', 'sum'])
+
+
+def test_aggregates_follow_amendments_and_deletions():
+    missions = generate_missions(2000, seed=4, n_workers=10)
+    priced = price_missions(missions.start_date, missions.end_date,
+                            missions.first_hour)
+    with ResultsStore() as store:
+        ids = store.add(priced, workers=missions.worker)
+        store.delete(ids[:100])
+        amended = price_missions(missions.start_date[100:200],
+                                 missions.end_date[100:200], False)
+        store.amend(ids[100:200], amended, workers='moved')
+
+        monthly = store.monthly().set_index(['worker', 'month'])
+        expected = totals_from_scratch(store)
+        assert np.array_equal(monthly.missions, expected['count'])
+        assert np.allclose(monthly.honorary, expected['sum'])
+        assert monthly.loc['moved'].missions.sum() == 100
+
+        daily = store.daily(worker='moved')
+        assert daily.missions.sum() == 100
+        assert round(daily.honorary.sum(), 2) == amended.cents.sum() / 100
+
+        store.rebuild_totals()
+        rebuilt = store.monthly().set_index(['worker', 'month'])
+        assert rebuilt.equals(monthly)
+
+
+def test_aggregates_filled_when_opening_older_database(tmp_path):
+    missions = generate_missions(100, seed=5, n_workers=3)
+    priced = price_missions(missions.start_date, missions.end_date,
+                            missions.first_hour)
+    path = str(tmp_path / 'results.sqlite')
+    with ResultsStore(path) as store:
+        store.add(priced, workers=missions.worker)
+        # Back to the schema without aggregates
+        store.connection.executescript(
+            'DROP TRIGGER missions_insert; DROP TRIGGER missions_delete; '
+            'DROP TRIGGER missions_update; DROP TABLE daily_totals; '
+            'DROP TABLE monthly_totals;')
+    with ResultsStore(path) as store:
+        assert store.earnings()['missions'] == 100
+        assert store.monthly().missions.sum() == 100
+        assert store.daily().missions.sum() == 100
+
+
+def test_concurrent_adds_return_their_own_ids(tmp_path):
+    missions = generate_missions(50, seed=6)
+    priced = price_missions(missions.start_date, missions.end_date)
+    path = str(tmp_path / 'results.sqlite')
+    stores = [ResultsStore(path) for _ in range(2)]
+    ids = {}
+
+    def add(k):
+        ids[k] = [i for _ in range(20)
+                  for i in stores[k].add(priced, workers='w{}'.format(k))]
+
+    threads = [threading.Thread(target=add, args=(k,)) for k in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    frame = stores[0].missions()
+    for k in range(2):
+        assert (frame.loc[ids[k], 'worker'] == 'w{}'.format(k)).all()
+    for store in stores:
+        store.close()
+
+
+def test_amend_unknown_ids():
+    missions = generate_missions(10, seed=7)
+    priced = price_missions(missions.start_date, missions.end_date)
+    with ResultsStore() as store:
+        ids = store.add(priced, workers='w')
+        with pytest.raises(ValueError, match='11'):
+            store.amend([ids[0], 11], price_missions(
+                missions.start_date[:2], missions.end_date[:2], False),
+                workers='moved')
+        assert store.earnings(worker='moved')['missions'] == 0
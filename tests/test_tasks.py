@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+from honorary_gui.tasks import Debouncer, TkWorker
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+
+class FakeWidget(object):
+    """Stands in for a Tk widget, ``after`` callbacks run on flush()"""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, ms, func):
+        self.callbacks.append(func)
+        return func
+
+    def after_cancel(self, ident):
+        self.callbacks.remove(ident)
+
+    def flush(self):
+        while self.callbacks:
+            self.callbacks.pop(0)()
+
+
+def test_results_are_delivered_by_polling():
+    widget = FakeWidget()
+    worker = TkWorker(widget)
+    results, errors = [], []
+    worker.submit(sum, [1, 2, 3], on_done=results.append)
+    worker.submit(int, 'x', on_done=results.append, on_error=errors.append)
+    widget.flush()
+    assert results == [6]
+    assert isinstance(errors[0], ValueError)
+    assert not worker.busy
+    worker.shutdown()
+
+
+def test_cancelled_job_is_discarded():
+    widget = FakeWidget()
+    worker = TkWorker(widget)
+    release = threading.Event()
+    results, cancelled = [], []
+    job = worker.submit(release.wait, on_done=results.append,
+                        on_cancel=lambda: cancelled.append(True))
+    assert worker.busy
+    job.cancel()
+    assert not worker.busy
+    release.set()
+    widget.flush()
+    assert results == []
+    assert cancelled == [True]
+    worker.shutdown()
+
+
+def test_progress_is_reported_on_the_tk_thread():
+    widget = FakeWidget()
+    worker = TkWorker(widget)
+    progress = []
+
+    def count(job, n):
+        for i in range(n):
+            job.set_progress(i + 1)
+        return n
+
+    results = []
+    worker.submit(count, 3, pass_job=True, on_done=results.append,
+                  on_progress=progress.append)
+    widget.flush()
+    assert results == [3]
+    assert progress[-1] == 3
+    worker.shutdown()
+
+
+def test_debouncer_fires_once():
+    widget = FakeWidget()
+    calls = []
+    debounce = Debouncer(widget, lambda: calls.append(True))
+    for _ in range(5):
+        debounce('<KeyRelease>')
+    widget.flush()
+    assert calls == [True]
+    debounce()
+    debounce.cancel()
+    widget.flush()
+    assert calls == [True]
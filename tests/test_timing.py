@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+
+from honorary_gui import engine, timing
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+
+def test_stage_timer():
+    with timing.StageTimer() as timer:
+        for _ in range(3):
+            engine.calculate_honorary('2020-06-02 08:00:00',
+                                      '2020-06-02 18:00:00')
+    summary = timer.summary()
+    assert set(summary) == {'parse', 'validate', 'kernel', 'result',
+                            'holiday_lookup'}
+    assert summary['kernel']['count'] == 3
+    assert summary['kernel']['p50'] <= summary['kernel']['max']
+    assert list(timer.to_frame().columns[:2]) == ['count', 'total']
+
+
+def test_disabled_by_default():
+    assert timing.stage('parse') is timing._NULL_STAGE
+    calls = []
+    timing.add_callback(lambda name, duration: calls.append(name))
+    try:
+        with timing.stage('parse'):
+            pass
+    finally:
+        timing.remove_callback(timing._callbacks[-1])
+    assert calls == ['parse']
+    assert timing.stage('parse') is timing._NULL_STAGE
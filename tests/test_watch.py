@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+
+import pandas as pd
+from honorary_gui.engine import price_missions
+from honorary_gui.watch import CHECKPOINT, FolderWatcher
+from honorary_gui.workload import write_csv
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+
+def test_watch_folder(tmp_path):
+    inbox, outbox = tmp_path / 'inbox', tmp_path / 'outbox'
+    inbox.mkdir()
+    write_csv(str(inbox / 'monday.csv'), 500, seed=1)
+    watcher = FolderWatcher(str(inbox), str(outbox))
+    # A new file waits one poll to be sure it is complete
+    assert watcher.poll() == []
+    assert watcher.poll() == ['monday.csv']
+    results = pd.read_csv(outbox / 'monday.priced.csv')
+    expected = price_missions(results.start_date, results.end_date,
+                              results.first_hour)
+    assert (results.honorary == expected.honorary).all()
+
+    # Duplicates are skipped, invalid files recorded once
+    shutil.copy(inbox / 'monday.csv', inbox / 'copy.csv')
+    (inbox / 'broken.csv').write_text('start,end\n1,2\n')
+    watcher.poll()
+    assert watcher.poll() == []
+    assert not (outbox / 'copy.priced.csv').exists()
+    assert len(watcher.index) == 2
+    assert os.path.exists(outbox / CHECKPOINT)
+
+    # A restarted watcher resumes from the checkpoint
+    write_csv(str(inbox / 'tuesday.csv'), 200, seed=2)
+    restarted = FolderWatcher(str(inbox), str(outbox))
+    restarted.poll()
+    assert restarted.poll() == ['tuesday.csv']
+    assert len(restarted.index) == 3
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+import pytest
+from honorary_gui.workload import generate_missions, iter_missions, write_csv
+
+__author__ = "Julien Hernandez Lallement"
+__copyright__ = "Julien Hernandez Lallement"
+__license__ = "mit"
+
+
+def test_generate_missions_is_deterministic():
+    missions = generate_missions(5000, seed=3)
+    assert missions.equals(generate_missions(5000, seed=3))
+    assert not missions.equals(generate_missions(5000, seed=4))
+    assert (missions.end_date > missions.start_date).all()
+    assert missions.start_date.is_monotonic_increasing
+
+
+def test_generate_missions_mix():
+    missions = generate_missions(2000, mix={'weekend': 1, 'holiday': 1})
+    assert set(missions.kind) == {'weekend', 'holiday'}
+    weekend = missions[missions.kind == 'weekend']
+    assert (weekend.start_date.dt.dayofweek == 4).all()
+    with pytest.raises(ValueError):
+        generate_missions(10, mix={'siesta': 1})
+
+
+def test_write_csv(tmpdir):
+    path = str(tmpdir.join('missions.csv'))
+    write_csv(path, 2500, chunk_size=1000, seed=1)
+    missions = pd.read_csv(path, parse_dates=['start_date', 'end_date'])
+    expected = pd.concat(iter_missions(2500, chunk_size=1000, seed=1))
+    assert len(missions) == 2500
+    assert np.array_equal(missions.end_date.values.astype('datetime64[s]'),
+                          expected.end_date.values)